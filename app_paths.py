@@ -0,0 +1,27 @@
+# app_paths.py
+import os
+import sys
+
+APP_NAME = "OutsideTheZone"
+
+
+def resource_path(rel_path: str) -> str:
+    """兼容 PyInstaller 的资源路径"""
+    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
+    return os.path.join(base_path, rel_path)
+
+
+def user_dir(kind: str = "data") -> str:
+    """用户可写目录（缓存、配置、日志），不存在时自动创建。
+
+    可用环境变量 OTZ_HOME 整体改到别处（便于回放与测试）。
+    """
+    base = os.environ.get("OTZ_HOME")
+    if not base:
+        if sys.platform == "win32":
+            base = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), APP_NAME)
+        else:
+            base = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), APP_NAME)
+    path = os.path.join(base, kind)
+    os.makedirs(path, exist_ok=True)
+    return path
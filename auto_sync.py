@@ -0,0 +1,71 @@
+# auto_sync.py
+"""自动同步：截取缩圈倒计时区域 → 识别 MM:SS → 喂给 ZoneTimer。
+
+采集与识别都在采集线程完成，只把识别结果（秒数、置信度、采集时刻）通过信号送回 GUI 线程。
+阶段仍取面板上选择的阶段；连续两次读数与流逝时间吻合才会同步，避免误读。
+同步之后的读数交给面板的 DriftCorrector，持续校正累积偏差。
+
+倒计时区域（config.COUNTDOWN_ROI）与数字模板都必须先按实机画面校准，否则拒绝启动：
+点阵默认模板与占位区域只够跑合成样例，对着真实画面只会误读。
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from config import COUNTDOWN_ROI_CALIBRATED, ZONE_TIMINGS
+from digit_recognizer import DigitRecognizer, is_calibrated
+from screen_capture import CapturePipeline, MssSource, countdown_roi, schedule_interval
+
+MIN_CONFIDENCE = 0.7
+AGREE_TOLERANCE = 1.5   # 两次读数与流逝时间的允许偏差（秒）
+
+
+class AutoSync(QObject):
+    reading = pyqtSignal(int, float, float)     # 秒数, 置信度, 采集时刻（单调时钟）
+
+    def __init__(self, panel, source=None):
+        super().__init__(panel)
+        self.panel = panel
+        res_key = panel.resolution_text
+        if source is None:
+            if not COUNTDOWN_ROI_CALIBRATED:
+                raise RuntimeError("缩圈倒计时区域（config.COUNTDOWN_ROI）尚未按实机画面校准")
+            if not is_calibrated(res_key):
+                raise RuntimeError(f"{res_key} 还没有校准过的数字模板，请先用实机截图运行 DigitRecognizer.calibrate()")
+        self.recognizer = DigitRecognizer(res_key)
+        timer = panel.zone_timer
+        self.pipeline = CapturePipeline(
+            source or MssSource(countdown_roi(panel.capture_geometry())),
+            self._on_frame,
+            interval_fn=lambda t: schedule_interval(timer.timeline, t),
+            clock=timer._clock,
+        )
+        self._last = None       # 上一次读数 (秒数, 采集时刻)
+        self.reading.connect(self._on_reading)
+
+    def start(self):
+        self.pipeline.start()
+
+    def stop(self):
+        self.pipeline.stop()
+
+    # ---- 采集线程 ----
+    def _on_frame(self, frame, t):
+        r = self.recognizer.read(frame)
+        if r is not None and r.confidence >= MIN_CONFIDENCE:
+            self.reading.emit(r.seconds, r.confidence, t)
+
+    # ---- GUI 线程 ----
+    def _on_reading(self, seconds, confidence, t):
+        last, self._last = self._last, (seconds, t)
+        if self.panel.is_synced:
+            # 显示的整秒是向上取整，取区间中点作为真实剩余时间
+            self.panel.drift.observe(seconds - 0.5, t, weight=confidence)
+            return
+        if last is None:
+            return
+        if abs((last[0] - seconds) - (t - last[1])) > AGREE_TOLERANCE:
+            return
+        stage_idx = self.panel.selected_stage()
+        if seconds > ZONE_TIMINGS[stage_idx][1]:
+            return
+        # 读数对应采集时刻，折算到此刻
+        self.panel.apply_sync(stage_idx, seconds - (self.panel.zone_timer._clock() - t))
@@ -0,0 +1,285 @@
+# benchmark.py
+"""无界面基准测试。
+
+    python benchmark.py --out bench.json
+    python benchmark.py --out new.json --baseline bench.json   # 与上次结果比较，退化时返回 1
+
+在 QT_QPA_PLATFORM=offscreen 下运行，测量：
+  tick     ZoneTimer._tick 的单次耗时与真实事件循环下的唤醒抖动
+  paint    各分辨率 × 各阶段 × 各容错模式下 HealthZoneOverlay 的绘制耗时（重建 / 命中缓存）
+  voice    VoiceManager.play 调用到开始播放的延迟（--dummy-audio 时使用空音频后端）
+  startup  main.py 冷启动到面板显示的耗时（子进程）
+tick / paint / voice 整体交错重复 --runs 遍，各项取中位数；与基线比较时，增量须同时超过相对容差
+与 NOISE_FLOOR 中该项的绝对下限才算退化，单次运行里的偶发抖动不会误报。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QObject, QTimer, QEventLoop, pyqtSignal, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from config import RES_GEOMETRY, ZONE_TIMINGS
+from perf_stats import compare, load_baseline, median_of_runs, percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 越大越差的指标，用于和基线比较
+COMPARED = ("mean_us", "p50_us", "p99_us", "mean_ms", "p50_ms", "p99_ms")
+# 各测量项的绝对噪声下限（按指标名或单位后缀）：取同一棵树反复运行时观测到的最大波动。
+# paint 每个组合只有 --repeat 个样本，p99 近乎最大值，偶发的调度停顿可达数毫秒；
+# startup 是子进程冷启动，进程间相差几十毫秒很常见
+NOISE_FLOOR = {
+    "tick": {"us": 25.0, "ms": 2.0},
+    "paint": {"us": 50.0, "p99_us": 3000.0},
+    "voice": {"ms": 2.0},
+    "startup": {"ms": 75.0},
+}
+
+
+def summarize(samples, unit="us"):
+    """样本（秒）→ 统计摘要。"""
+    scale = 1e6 if unit == "us" else 1e3
+    xs = sorted(s * scale for s in samples)
+    if not xs:
+        return {"n": 0}
+    return {
+        "n": len(xs),
+        f"mean_{unit}": round(statistics.fmean(xs), 3),
+        f"p50_{unit}": round(percentile(xs, 50), 3),
+        f"p99_{unit}": round(percentile(xs, 99), 3),
+        f"max_{unit}": round(xs[-1], 3),
+    }
+
+
+def spin(ms):
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec_()
+
+
+class _NullEffect(QObject):
+    """空音频后端：接口与 QSoundEffect 一致，play() 在下一轮事件循环里“开始播放”。"""
+    playingChanged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._playing = False
+
+    def setSource(self, url): pass
+    def setLoopCount(self, n): pass
+    def setVolume(self, v): pass
+    def isPlaying(self): return self._playing
+
+    def play(self):
+        QTimer.singleShot(0, self._start)
+
+    def _start(self):
+        self._playing = True
+        self.playingChanged.emit()
+        self._playing = False
+        self.playingChanged.emit()
+
+    def stop(self):
+        self._playing = False
+
+
+# ---------------- 各项测量 ----------------
+def bench_tick(panel, n, seconds):
+    timer = panel.zone_timer
+    timer.start(0, ZONE_TIMINGS[0][1])
+
+    costs = []
+    for _ in range(n):
+        t = time.perf_counter()
+        timer._tick()
+        costs.append(time.perf_counter() - t)
+
+    # 真实事件循环下的唤醒抖动：实际唤醒时刻 - 计划唤醒时刻
+    lateness = []
+    orig_tick = timer._on_timeout
+
+    def _measured_tick():
+        if timer.next_deadline is not None:
+            lateness.append(timer._clock() - timer.next_deadline)
+        orig_tick()
+
+    timer._qt_timer.timeout.disconnect()
+    timer._qt_timer.timeout.connect(_measured_tick)
+    timer.start(0, ZONE_TIMINGS[0][1])
+    spin(int(seconds * 1000))
+    timer.reset()
+    timer._qt_timer.timeout.disconnect()
+    timer._qt_timer.timeout.connect(orig_tick)
+
+    return {
+        "cost": summarize(costs),
+        "lateness": summarize(lateness, "ms"),
+        "wakeups_per_s": round(len(lateness) / seconds, 3),
+    }
+
+
+def bench_paint(panel, overlay, n):
+    results = {}
+    panel.is_synced = True
+    panel.guides_enabled = True
+    for res, (x, y, w, h) in RES_GEOMETRY.items():
+        overlay.setGeometry(x, y - h, w, h * 2)     # 与 overlay_geometry 一致：血条上方留读数条
+        target = QPixmap(overlay.size())
+        for zl in range(1, 10):
+            for mode in panel.thresholds.modes:
+                panel.zone_level, panel.tolerance_mode = zl, mode
+                cold, warm = [], []
+                for _ in range(n):
+                    overlay._key = None
+                    t = time.perf_counter()
+                    overlay.render(target)
+                    cold.append(time.perf_counter() - t)
+
+                    t = time.perf_counter()
+                    overlay.render(target)
+                    warm.append(time.perf_counter() - t)
+                results[f"{res}|{zl}|{mode}"] = {"rebuild": summarize(cold), "cached": summarize(warm)}
+    panel.is_synced = False
+    return results
+
+
+def bench_voice(panel, n, dummy):
+    voice = panel.voice
+    voice.preload()
+    deadline = time.perf_counter() + 10.0
+    while (voice._worker.bank is None or not voice._worker.bank.loaded) and time.perf_counter() < deadline:
+        spin(10)
+    if voice._worker.bank is None or not voice._worker.bank.has("剩余8秒进入阶段5.wav"):
+        return {"error": "voice asset missing"}
+
+    started = []
+    voice.playback_started.connect(lambda name, t: started.append(t))
+    lags = []
+    for _ in range(n):
+        voice.reset()
+        started.clear()
+        t = time.monotonic()
+        voice.play("剩余8秒进入阶段5.wav")
+        deadline = time.perf_counter() + 2.0
+        while not started and time.perf_counter() < deadline:
+            QApplication.processEvents(QEventLoop.AllEvents, 5)
+        if started:
+            lags.append(started[0] - t)
+    voice.reset()
+    return {"dummy_audio": dummy, "timeouts": n - len(lags), "start_lag": summarize(lags, "ms")}
+
+
+def bench_startup(n):
+    """冷启动 main.py；配置与数据放在临时目录，不读写用户的对局记录与会话，也不会恢复进行中的对局。"""
+    wall, shown, marks = [], [], {}
+    with tempfile.TemporaryDirectory(prefix="otz-bench-") as home:
+        env = dict(os.environ, OTZ_BENCH_STARTUP="1", OTZ_HOME=home)
+        for _ in range(n):
+            t = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, os.path.join(HERE, "main.py"), "--no-history", "--no-resume"],
+                cwd=HERE, env=env, capture_output=True, text=True, timeout=60,
+            ).stdout
+            wall.append(time.perf_counter() - t)
+            for line in out.splitlines():
+                if line.startswith("{"):
+                    data = json.loads(line)
+                    shown.append(data["panel_shown_s"])
+                    marks = data.get("marks", marks)
+    return {"process_wall": summarize(wall, "ms"), "panel_shown": summarize(shown, "ms"), "last_marks_ms": marks}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="抗毒小助手基准测试")
+    ap.add_argument("--out", help="结果 JSON 路径（默认输出到 stdout）")
+    ap.add_argument("--only", nargs="*", choices=("tick", "paint", "voice", "startup"))
+    ap.add_argument("--repeat", type=int, default=50, help="每项重复次数")
+    ap.add_argument("--runs", type=int, default=5, help="tick / paint / voice 整体重复遍数，取中位数")
+    ap.add_argument("--tick-seconds", type=float, default=3.0, help="每遍测量唤醒抖动的时长")
+    ap.add_argument("--startup-runs", type=int, default=5)
+    ap.add_argument("--dummy-audio", action="store_true", help="使用空音频后端")
+    ap.add_argument("--baseline", nargs="+", help="与该 JSON（多个时取中位数）比较，退化超过容差时返回 1")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化")
+    args = ap.parse_args(argv)
+    only = set(args.only or ("tick", "paint", "voice", "startup"))
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    from ui_panel import ControlPanel
+    from draw_overlay import HealthZoneOverlay
+
+    if args.dummy_audio:
+        from sound_bank import SoundBank
+        SoundBank._make_effect = lambda self, url: _NullEffect(self)
+        SoundBank._pack_format = lambda self, pack: True
+        SoundBank._make_pack_effect = lambda self, clip, fmt: _NullEffect(self)
+
+    panel = ControlPanel()
+    panel.show()
+    panel.finish_startup()
+    overlay = HealthZoneOverlay(panel.overlay_geometry(), controller=panel)
+    panel.linked_overlay = overlay
+    spin(50)
+
+    runs = []
+    for _ in range(max(1, args.runs)):
+        r = {}
+        if "tick" in only:
+            r["tick"] = bench_tick(panel, args.repeat * 20, args.tick_seconds)
+        if "paint" in only:
+            r["paint"] = bench_paint(panel, overlay, args.repeat)
+        if "voice" in only:
+            r["voice"] = bench_voice(panel, args.repeat, args.dummy_audio)
+        runs.append(r)
+    results = median_of_runs(runs)
+    if "startup" in only:
+        results["startup"] = bench_startup(args.startup_runs)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    panel.voice.shutdown()
+    overlay.close()
+    panel.close()
+    app.processEvents()
+
+    if args.baseline:
+        old = load_baseline(args.baseline)
+        regressions = []
+        for name, section in results.items():
+            if isinstance(old.get(name), dict):
+                regressions += compare(section, old[name], args.tolerance, COMPARED, NOISE_FLOOR.get(name, {}),
+                                       path=name)
+        for p, a, b in regressions:
+            print(f"退化：{p} {a} → {b}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
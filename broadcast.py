@@ -0,0 +1,199 @@
+# broadcast.py
+"""本机广播：把计时状态推送给副屏、直播叠加层、记录工具等订阅者。
+
+    python main.py --broadcast              # 启用（端口取 OTZ_BROADCAST_PORT，默认 47800）
+    python broadcast.py [端口]              # 简易订阅端，逐行打印收到的消息
+
+协议为按行分隔的 JSON（UTF‑8）：
+    连接后先收到一条快照  {"type": "snapshot", "state": {...}}
+    之后只收到变化的字段  {"type": "diff", "state": {...}}
+state 字段：synced, stage（1‑9）, phase（countdown|shrinking）, remaining（显示秒数）,
+ends_at（本相位结束的 Unix 时间，面板最小化时可据此自行倒数）, zone_level, mode。
+
+服务器运行在独立线程的 asyncio 事件循环里，只监听 127.0.0.1。
+GUI 线程调用 publish() 只做一次 call_soon_threadsafe，比较差异、编码与分发都在事件循环线程完成；
+每个订阅者有定长队列，跟不上的订阅者会被清空队列并重新发送快照，不会拖慢其他人。
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 47800
+QUEUE_SIZE = 64     # 每个订阅者最多积压的消息数
+
+_MISSING = object()
+
+
+def default_port() -> int:
+    try:
+        return int(os.environ.get("OTZ_BROADCAST_PORT", DEFAULT_PORT))
+    except ValueError:
+        return DEFAULT_PORT
+
+
+def encode(kind: str, state: dict) -> bytes:
+    return json.dumps({"type": kind, "state": state}, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class LoopThread:
+    """在后台守护线程里运行的 asyncio 事件循环。"""
+
+    def __init__(self, name="asyncio"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def call(self, fn, *args):
+        """线程安全地在事件循环里调用 fn(*args)，不等待结果。"""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def run(self, coro, timeout=None):
+        """在事件循环里执行协程并等待结果（异常原样抛出）。"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self, timeout=1.0):
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class BroadcastServer:
+    """状态广播服务器。publish() 可在任意线程调用。"""
+
+    def __init__(self, host=HOST, port=None, queue_size=QUEUE_SIZE):
+        self.host = host
+        self.port = default_port() if port is None else port
+        self.queue_size = queue_size
+        self.state = {}             # 最新完整状态，仅在事件循环线程中修改
+        self.wall_offset = time.time() - time.monotonic()   # 单调时钟 → Unix 时间，启动时取一次保证稳定
+        self._clients = set()       # {asyncio.Queue}
+        self._tasks = set()         # 各订阅者的发送协程
+        self._server = None
+        self._loop = LoopThread("broadcast")
+
+    # ---- 对外接口 ----
+    def start(self):
+        """启动事件循环线程并开始监听；端口被占用等错误以 OSError 抛出。"""
+        self._loop.start()
+        try:
+            self._server = self._loop.run(self._listen(), timeout=5)
+        except Exception:
+            self._loop.stop()
+            raise
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        if self._server is not None:
+            self._loop.run(self._close(), timeout=1)
+            self._server = None
+        self._loop.stop()
+
+    def publish(self, changes: dict):
+        """合并部分状态；只有真正变化的字段会发给订阅者。"""
+        if self._server is not None:
+            self._loop.call(self._apply, changes)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ---- 事件循环线程 ----
+    async def _listen(self):
+        return await asyncio.start_server(self._serve, self.host, self.port)
+
+    async def _close(self):
+        self._server.close()
+        for q in list(self._clients):
+            self._offer(q, None)
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=0.5)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def _apply(self, changes):
+        diff = {k: v for k, v in changes.items() if self.state.get(k, _MISSING) != v}
+        if not diff:
+            return
+        self.state.update(diff)
+        msg = encode("diff", diff)
+        for q in list(self._clients):
+            self._offer(q, msg)
+
+    def _offer(self, q, msg):
+        if q.full():
+            # 订阅者跟不上：丢弃积压，改发一份最新快照
+            while not q.empty():
+                q.get_nowait()
+            if msg is not None:
+                msg = encode("snapshot", self.state)
+        q.put_nowait(msg)
+
+    async def _serve(self, reader, writer):
+        q = asyncio.Queue(self.queue_size)
+        q.put_nowait(encode("snapshot", self.state))
+        self._clients.add(q)
+        self._tasks.add(asyncio.current_task())
+        closed = asyncio.ensure_future(reader.read())     # 订阅者不发数据，读到 EOF 即断开
+        try:
+            while True:
+                get = asyncio.ensure_future(q.get())
+                await asyncio.wait((get, closed), return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    break
+                msg = get.result()
+                if msg is None:
+                    break
+                writer.write(msg)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._clients.discard(q)
+            self._tasks.discard(asyncio.current_task())
+            closed.cancel()
+            writer.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    port = int(argv[0]) if argv else default_port()
+
+    async def listen():
+        reader, _ = await asyncio.open_connection(HOST, port)
+        while line := await reader.readline():
+            print(line.decode("utf-8").rstrip(), flush=True)
+
+    try:
+        asyncio.run(listen())
+    except ConnectionError as e:
+        print(f"无法连接 {HOST}:{port}：{e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
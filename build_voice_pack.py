@@ -0,0 +1,219 @@
+# build_voice_pack.py
+"""构建语音包：响度归一、统一重采样为输出设备格式，打包成一个可内存映射的文件。
+
+    python build_voice_pack.py                       # voice/*.wav → voice/voice.pack（48 kHz 立体声 16 位）
+    python build_voice_pack.py --rate device         # 采样率与声道取默认输出设备的首选格式
+    python build_voice_pack.py --check               # 校验已有语音包并列出内容
+
+文件格式见 sound_bank.py。每条语音按 cue_key 建索引（“阶段9锁定开始 .wav”这类带空格的文件名
+索引为“阶段9锁定开始”），数据区整体计算 sha256，运行时打开时校验。
+非 RIFF PCM 的文件（例如扩展名是 .wav、实际是 AAC 的录音）需要 PATH 中有 ffmpeg 才能解码，
+否则跳过该条并返回 1；运行时包里没有的语音回退到散装文件，散装文件也不是 RIFF 时按缺失报告。
+响度按 50 ms 分块、去掉低于 GATE_DB 的静音块后的均方根计算，增益不会使峰值超过 PEAK_DB。
+重采样用线性插值，原始素材与目标采样率一致时不做任何处理。
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import wave
+from array import array
+
+import numpy as np
+
+from app_paths import resource_path
+from sound_bank import (PACK_ALIGN, PACK_FILE, PACK_HEADER, PACK_MAGIC, PACK_VERSION,
+                        PackError, VoicePack, cue_key, pcm_lead_in)
+from voice import VOICE_FILES
+
+DEFAULT_RATE = 48000
+DEFAULT_CHANNELS = 2
+TARGET_DB = -18.0       # 目标响度（dBFS，门限后均方根）
+PEAK_DB = -1.0          # 峰值上限
+GATE_DB = -60.0         # 低于此电平的分块不计入响度
+BLOCK = 0.05            # 响度分块（秒）
+
+
+# ---------------- 解码 ----------------
+def read_wav(path):
+    """RIFF PCM → (float32 数组 (帧, 声道)，采样率)。"""
+    with wave.open(path, "rb") as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        x = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        x = np.frombuffer(raw, "<i2").astype(np.float32) / 32768
+    elif width == 3:
+        b = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        x = (np.where(v >= 1 << 23, v - (1 << 24), v)).astype(np.float32) / (1 << 23)
+    elif width == 4:
+        x = np.frombuffer(raw, "<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f"不支持的位深：{width * 8}")
+    return x.reshape(-1, channels), rate
+
+
+def read_ffmpeg(path, rate, channels):
+    """借助 ffmpeg 解码任意格式，直接输出目标采样率与声道。"""
+    exe = shutil.which("ffmpeg")
+    if exe is None:
+        raise ValueError("不是 RIFF PCM，且 PATH 中没有 ffmpeg")
+    raw = subprocess.run(
+        [exe, "-v", "error", "-i", path, "-f", "s16le", "-ac", str(channels), "-ar", str(rate), "-"],
+        capture_output=True, check=True).stdout
+    return np.frombuffer(raw, "<i2").astype(np.float32).reshape(-1, channels) / 32768, rate
+
+
+def decode(path, rate, channels):
+    try:
+        return read_wav(path)
+    except (wave.Error, EOFError):
+        return read_ffmpeg(path, rate, channels)
+
+
+# ---------------- 处理 ----------------
+def convert_channels(x, channels):
+    if x.shape[1] == channels:
+        return x
+    mono = x.mean(axis=1, keepdims=True)
+    return np.repeat(mono, channels, axis=1)
+
+
+def resample(x, src_rate, rate):
+    if src_rate == rate or not len(x):
+        return x
+    n = int(round(len(x) * rate / src_rate))
+    t = np.arange(n) * (src_rate / rate)
+    src = np.arange(len(x))
+    return np.stack([np.interp(t, src, x[:, c]) for c in range(x.shape[1])], axis=1).astype(np.float32)
+
+
+def loudness_db(x, rate):
+    """门限后均方根电平（dBFS）；整段静音时返回 None。"""
+    block = max(1, int(rate * BLOCK))
+    n = len(x) // block * block
+    if not n:
+        return None
+    power = np.square(x[:n]).reshape(-1, block * x.shape[1]).mean(axis=1)
+    power = power[power > 10 ** (GATE_DB / 10)]
+    if not len(power):
+        return None
+    return 10 * np.log10(power.mean())
+
+
+def normalize(x, rate):
+    level = loudness_db(x, rate)
+    if level is None:
+        return x, 0.0
+    gain = TARGET_DB - level
+    peak = float(np.abs(x).max())
+    gain = min(gain, PEAK_DB - 20 * np.log10(peak))
+    return x * np.float32(10 ** (gain / 20)), gain
+
+
+def to_pcm16(x) -> bytes:
+    return np.clip(np.round(x * 32767), -32768, 32767).astype("<i2").tobytes()
+
+
+# ---------------- 打包 ----------------
+def device_format():
+    """默认输出设备的首选 (采样率, 声道)。"""
+    from PyQt5.QtCore import QCoreApplication
+    from PyQt5.QtMultimedia import QAudioDeviceInfo
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])  # 音频设备查询需要 Qt 应用对象
+    fmt = QAudioDeviceInfo.defaultOutputDevice().preferredFormat()
+    return fmt.sampleRate(), fmt.channelCount()
+
+
+def build(voice_dir, out, rate=DEFAULT_RATE, channels=DEFAULT_CHANNELS):
+    """返回 (索引, 跳过的文件 [(文件名, 原因)])。"""
+    clips, chunks, skipped = {}, [], []
+    offset = 0
+    for name in sorted(os.listdir(voice_dir)):
+        path = os.path.join(voice_dir, name)
+        if not name.lower().endswith(".wav") or not os.path.isfile(path):
+            continue
+        try:
+            x, src_rate = decode(path, rate, channels)
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            skipped.append((name, str(e)))
+            continue
+        x = resample(convert_channels(x, channels), src_rate, rate)
+        x, gain = normalize(x, rate)
+        pcm = to_pcm16(x)
+        pad = -len(pcm) % PACK_ALIGN
+        lead = pcm_lead_in(array("h", pcm[:rate * channels * 2]), rate, channels)
+        clips[cue_key(name)] = {"offset": offset, "length": len(pcm), "lead_in": round(lead, 4),
+                                "gain_db": round(float(gain), 2), "source": name}
+        chunks.append(pcm + b"\0" * pad)
+        offset += len(pcm) + pad
+
+    data = b"".join(chunks)
+    index = {"rate": rate, "channels": channels, "sample_width": 2, "data_size": len(data),
+             "sha256": hashlib.sha256(data).hexdigest(), "clips": clips}
+    blob = json.dumps(index, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    header = PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(blob)) + blob
+    header += b"\0" * (-len(header) % PACK_ALIGN)
+
+    fd, tmp = tempfile.mkstemp(prefix=".voice-", dir=os.path.dirname(os.path.abspath(out)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, out)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return index, skipped
+
+
+def check(path):
+    pack = VoicePack(path)
+    print(f"{path}：{pack.rate} Hz / {pack.channels} 声道 / {pack.sample_width * 8} 位，校验通过")
+    for key in sorted(pack.keys()):
+        seconds = len(pack.clip(key)) / (pack.rate * pack.channels * pack.sample_width)
+        print(f"  {key}  {seconds:.2f}s  开头静音 {pack.lead_in(key):.3f}s")
+    return [f for f in VOICE_FILES if cue_key(f) not in pack]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="构建语音包")
+    ap.add_argument("--voice-dir", default=resource_path("voice"))
+    ap.add_argument("--out", help=f"输出路径（默认 <voice-dir>/{PACK_FILE}）")
+    ap.add_argument("--rate", default=str(DEFAULT_RATE), help="采样率，或 device 取默认输出设备的首选格式")
+    ap.add_argument("--channels", type=int, default=DEFAULT_CHANNELS)
+    ap.add_argument("--check", action="store_true", help="只校验已有语音包")
+    args = ap.parse_args(argv)
+    out = args.out or os.path.join(args.voice_dir, PACK_FILE)
+
+    if args.check:
+        try:
+            missing = check(out)
+        except (OSError, PackError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        for name in missing:
+            print(f"缺少：{name}", file=sys.stderr)
+        return 1 if missing else 0
+
+    rate, channels = (device_format() if args.rate == "device" else (int(args.rate), args.channels))
+    index, skipped = build(args.voice_dir, out, rate, channels)
+    print(f"{out}：{len(index['clips'])} 条，{index['data_size']} 字节，{rate} Hz / {channels} 声道")
+    for name, reason in skipped:
+        print(f"跳过 {name}：{reason}", file=sys.stderr)
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
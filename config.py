@@ -20,9 +20,31 @@ ZONE_TIMINGS = [
     (7, 70, 30), (8, 60, 30), (9, 60, 30)
 ]
 
+# 语音提示表：(阶段, 相位, 偏移秒, 文件)
+# 相位为 "countdown"（等待缩圈）或 "shrinking"（缩圈中）；
+# 偏移 ≥ 0 表示相位开始后若干秒，< 0 表示相位结束前若干秒。
+VOICE_CUES = [
+    (4, "shrinking", -8, "剩余8秒进入阶段5.wav"),
+    (5, "shrinking", -8, "剩余8秒进入阶段6.wav"),
+    (6, "shrinking", -8, "剩余8秒进入阶段7.wav"),
+    (7, "shrinking", -8, "剩余8秒进入阶段8.wav"),
+    (8, "shrinking", -8, "剩余8秒进入阶段9超距锁定.wav"),
+    (9, "countdown", 0, "阶段9锁定开始.wav"),
+    (9, "countdown", 20, "10秒倒计时.wav"),
+]
+
 TOLERANCE_MAP = {
     "老师傅": 0,
     "激进": lambda lvl: ZONE_DAMAGE.get(lvl, 0) + 1,
     "正常": lambda lvl: ZONE_DAMAGE.get(max(1, lvl - 2), 0) + ZONE_DAMAGE.get(lvl, 0) + 2,
     "保守": lambda lvl: ZONE_DAMAGE.get(max(1, lvl - 1), 0) + ZONE_DAMAGE.get(max(1, lvl - 2), 0) + ZONE_DAMAGE.get(lvl, 0) + 3,
 }
+
+# 缩圈倒计时（MM:SS）在画面中的位置，相对血条矩形 (x, y, w, h) 换算：
+#   x = 血条x + fx·血条宽, y = 血条y + fy·血条高, w = fw·血条宽, h = fh·血条高
+# 需按实际画面校准；下面是占位值，校准后把 COUNTDOWN_ROI_CALIBRATED 改为 True，
+# 在此之前 --auto-sync 不会启动（区域不对时只会截到无关画面）。
+COUNTDOWN_ROI = (0.40, -49.0, 0.20, 1.4)
+COUNTDOWN_ROI_CALIBRATED = False
+
+HP_SAMPLE_HZ = 10   # 血条采样频率（次/秒）
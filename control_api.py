@@ -0,0 +1,261 @@
+# control_api.py
+"""本机控制接口：热键工具、Stream Deck 等通过 TCP 发送一行文本指令来驱动小助手。
+
+    python main.py --control                # 启用（端口取 OTZ_CONTROL_PORT，默认 47801）
+    python control_api.py sync 4 50         # 简易客户端，发送一条指令并打印回复
+
+指令（每行一条，可用 ; 连写多条，整行要么全部生效、要么全部不生效）：
+    sync <阶段> <秒数>      同“同步”按钮：距该阶段开始缩圈还剩若干秒（可带小数）
+    resync                 同“重新同步”按钮
+    shift <±秒数>           时间轴整体前移（正）或后退（负），不重放语音
+    observe <秒数> [阶段]    报告“此刻距缩圈开始还剩若干秒”，交给漂移校正平滑追平
+    mode <名称>             切换容错模式（不弹提示框）
+    guides on|off          开关辅助线
+    screen <序号|名称>       把覆盖层移到指定显示器（序号从 1 开始）
+    state                  返回当前状态（JSON）
+    ping                   连通性检查
+回复一行：ok [结果] 或 error <原因>。
+
+网络收发在后台 asyncio 线程完成；整行指令通过排队信号交给 GUI 线程，在一次槽调用里
+先全部解析校验、再依次执行，因此不会与计时器的唤醒交错。
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+import sys
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal, pyqtSlot
+
+from broadcast import HOST, LoopThread
+from config import ZONE_TIMINGS
+
+DEFAULT_PORT = 47801
+MAX_LINE = 1024
+
+
+def default_port() -> int:
+    try:
+        return int(os.environ.get("OTZ_CONTROL_PORT", DEFAULT_PORT))
+    except ValueError:
+        return DEFAULT_PORT
+
+
+class CommandError(ValueError):
+    """指令格式或参数不合法。"""
+
+
+def _number(text, what):
+    try:
+        return float(text)
+    except ValueError:
+        raise CommandError(f"{what}必须是数字：{text!r}") from None
+
+
+class CommandExecutor(QObject):
+    """GUI 线程侧：解析并执行整行指令。"""
+
+    submitted = pyqtSignal(str, object)     # 整行指令, concurrent.futures.Future
+
+    def __init__(self, panel):
+        super().__init__(panel)
+        self.panel = panel
+        self.submitted.connect(self._on_submitted, Qt.QueuedConnection)
+
+    # ---- 解析 ----
+    def parse(self, line: str):
+        """整行 → [(函数, 参数...)]；任何一条不合法都抛出 CommandError。"""
+        actions = []
+        synced = self.panel.zone_timer.timeline.is_synced
+        for part in line.split(";"):
+            words = part.split()
+            if words:
+                action = self._parse_one(words[0].lower(), words[1:], synced)
+                if action[0] == self.panel.apply_sync:
+                    synced = True
+                elif action[0] == self.panel.resync:
+                    synced = False
+                actions.append(action)
+        if not actions:
+            raise CommandError("空指令")
+        return actions
+
+    def _parse_one(self, cmd, args, synced):
+        panel = self.panel
+        if cmd == "sync":
+            if len(args) != 2:
+                raise CommandError("用法：sync <阶段> <秒数>")
+            try:
+                stage = int(args[0])
+            except ValueError:
+                raise CommandError(f"阶段必须是整数：{args[0]!r}") from None
+            if not 1 <= stage <= len(ZONE_TIMINGS):
+                raise CommandError(f"阶段必须在 1‑{len(ZONE_TIMINGS)} 之间")
+            seconds = _number(args[1], "秒数")
+            max_wait = ZONE_TIMINGS[stage - 1][1]
+            if not 0 <= seconds <= max_wait:
+                raise CommandError(f"阶段 {stage} 的倒计时必须在 0‑{max_wait} 秒之间")
+            return panel.apply_sync, stage - 1, seconds
+        if cmd == "resync" and not args:
+            return (panel.resync,)
+        if cmd == "shift" and len(args) == 1:
+            if not synced:
+                raise CommandError("尚未同步")
+            return panel.zone_timer.shift, _number(args[0], "秒数")
+        if cmd == "observe" and len(args) in (1, 2):
+            if not synced:
+                raise CommandError("尚未同步")
+            seconds = _number(args[0], "秒数")
+            stage_idx = None
+            if len(args) == 2:
+                try:
+                    stage_idx = int(args[1]) - 1
+                except ValueError:
+                    raise CommandError(f"阶段必须是整数：{args[1]!r}") from None
+                if not 0 <= stage_idx < len(ZONE_TIMINGS):
+                    raise CommandError(f"阶段必须在 1‑{len(ZONE_TIMINGS)} 之间")
+            return self._observe, seconds, stage_idx
+        if cmd == "mode" and args:
+            name = " ".join(args)
+            if name not in panel.thresholds.modes:
+                raise CommandError(f"未知容错模式：{name}（可选：{'、'.join(panel.thresholds.modes)}）")
+            return panel.set_mode, name
+        if cmd == "guides" and len(args) == 1 and args[0].lower() in ("on", "off"):
+            return panel.set_guides, args[0].lower() == "on"
+        if cmd == "screen" and len(args) == 1:
+            names = [sc.name() for sc in panel.screens.screens()]
+            name = args[0]
+            if name.isdigit() and 1 <= int(name) <= len(names):
+                name = names[int(name) - 1]
+            if name not in names:
+                raise CommandError(f"未知显示器：{args[0]}（可选：{'、'.join(names)}）")
+            return panel.set_overlay_screen, name
+        if cmd == "state" and not args:
+            return (self._state,)
+        if cmd == "ping" and not args:
+            return (lambda: "pong",)
+        raise CommandError(f"无法识别的指令：{' '.join([cmd, *args])}")
+
+    def _observe(self, seconds, stage_idx):
+        if not self.panel.drift.observe(seconds, stage_idx=stage_idx):
+            return "rejected"
+        return f"pending {self.panel.drift.pending():+.3f}"
+
+    def _state(self):
+        st = self.panel.zone_timer.state()
+        state = {"synced": st is not None, "mode": self.panel.tolerance_mode,
+                 "guides": self.panel.guides_enabled, "zone_level": self.panel.zone_level}
+        if st is not None:
+            state.update(stage=st.stage_idx + 1, phase=st.phase, remaining=round(st.remaining, 3))
+        return json.dumps(state, ensure_ascii=False)
+
+    # ---- 执行 ----
+    def execute(self, line: str) -> str:
+        """解析并执行，返回回复文本（不含换行）。"""
+        try:
+            actions = self.parse(line)
+        except CommandError as e:
+            return f"error {e}"
+        result = None
+        for fn, *args in actions:
+            result = fn(*args)
+        return "ok" if result is None else f"ok {result}"
+
+    @pyqtSlot(str, object)
+    def _on_submitted(self, line, future):
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(self.execute(line))
+            except Exception as e:      # 不让异常吞掉回复
+                future.set_result(f"error {type(e).__name__}: {e}")
+
+
+class ControlServer:
+    """本机 TCP 指令服务器。"""
+
+    def __init__(self, panel, host=HOST, port=None):
+        self.host = host
+        self.port = default_port() if port is None else port
+        self.executor = CommandExecutor(panel)
+        self._writers = set()       # 各连接的写端
+        self._server = None
+        self._loop = LoopThread("control")
+
+    def start(self):
+        """开始监听；端口被占用等错误以 OSError 抛出。"""
+        self._loop.start()
+        try:
+            self._server = self._loop.run(self._listen(), timeout=5)
+        except Exception:
+            self._loop.stop()
+            raise
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        if self._server is not None:
+            self._loop.run(self._close(), timeout=1)
+            self._server = None
+        self._loop.stop()
+
+    # ---- 事件循环线程 ----
+    async def _listen(self):
+        return await asyncio.start_server(self._serve, self.host, self.port, limit=MAX_LINE)
+
+    async def _close(self):
+        """停止监听并断开仍连着的客户端，让各连接协程读到 EOF 后正常结束。"""
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    raw = await reader.readline()
+                except ValueError:          # 超过 MAX_LINE
+                    writer.write("error 指令过长\n".encode("utf-8"))
+                    break
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                future = concurrent.futures.Future()
+                self.executor.submitted.emit(line, future)
+                reply = await asyncio.wrap_future(future)
+                writer.write(reply.encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def send(line: str, port=None, timeout=2.0) -> str:
+    """发送一行指令并返回回复（阻塞，供脚本与热键工具使用）。"""
+    import socket
+
+    with socket.create_connection((HOST, port or default_port()), timeout=timeout) as sock:
+        sock.sendall(line.encode("utf-8") + b"\n")
+        return sock.makefile("rb").readline().decode("utf-8").rstrip("\n")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__)
+        return 2
+    try:
+        reply = send(" ".join(argv))
+    except OSError as e:
+        print(f"无法连接控制接口：{e}", file=sys.stderr)
+        return 1
+    print(reply)
+    return 0 if reply.startswith("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# cue_schedule.py
+"""语音提示排程（不依赖 Qt）。
+
+config.VOICE_CUES 在同步时编译成一条按触发时刻排序的队列，计时器每次唤醒只需从队头弹出到期的提示。
+每条提示按其音频的输出延迟提前触发：延迟 = 实测的“投递 → 开始播放”耗时 + 音频开头的静音，
+这样“剩余 8 秒”的语音恰好在第 8 秒响起。
+"""
+from collections import deque, namedtuple
+
+from config import VOICE_CUES
+
+CUE_GRACE = 1.0     # 错过触发时刻不超过此秒数仍然播报，超过则丢弃
+
+# at: 时间轴偏移（秒）；due: 扣除输出延迟后的实际触发偏移
+Cue = namedtuple("Cue", "due at id file")
+
+
+def cue_offset(timeline, stage, phase, offset):
+    """(阶段, 相位, 偏移) → 时间轴偏移；时间轴中不存在该阶段时返回 None。"""
+    for i, (level, ph) in enumerate(zip(timeline.zone_levels, timeline.phases)):
+        if level == stage and ph == phase:
+            base = timeline.starts[i] if offset >= 0 else timeline.ends[i]
+            return base + offset
+    return None
+
+
+def compile_cues(timeline, cues=VOICE_CUES):
+    """提示表 → [(时间轴偏移, 提示序号, 文件)]，按时间排序。"""
+    out = []
+    for cue_id, (stage, phase, offset, fname) in enumerate(cues):
+        at = cue_offset(timeline, stage, phase, offset)
+        if at is not None:
+            out.append((at, cue_id, fname))
+    out.sort()
+    return out
+
+
+class CueQueue:
+    """时间排序的提示队列。弹出过的提示记入 fired，重新排程时不会再次触发。"""
+
+    def __init__(self, timeline, cues=VOICE_CUES, latency=None):
+        self.compiled = compile_cues(timeline, cues)
+        self.latency = latency or (lambda fname: 0.0)
+        self.fired = set()
+        self._queue = deque()
+
+    def arm(self, now_offset):
+        """按当前时间轴偏移重建队列：跳过已触发的，以及已过期超过 CUE_GRACE 的。"""
+        entries = []
+        for at, cue_id, fname in self.compiled:
+            if cue_id in self.fired:
+                continue
+            due = at - self.latency(fname)
+            if due < now_offset - CUE_GRACE:
+                continue
+            entries.append(Cue(due, at, cue_id, fname))
+        entries.sort()
+        self._queue = deque(entries)
+
+    def clear(self):
+        self._queue.clear()
+        self.fired.clear()
+
+    def next_due(self):
+        """队头提示的触发偏移；队列为空时返回 None。"""
+        return self._queue[0].due if self._queue else None
+
+    def pop_due(self, now_offset):
+        """弹出所有已到期的提示；过期太久的直接丢弃。"""
+        due = []
+        q = self._queue
+        while q and q[0].due <= now_offset:
+            cue = q.popleft()
+            self.fired.add(cue.id)
+            if now_offset - cue.due <= CUE_GRACE:
+                due.append(cue)
+        return due
@@ -0,0 +1,330 @@
+# digit_recognizer.py
+"""缩圈倒计时（MM:SS）识别，纯 NumPy，不依赖 OCR 引擎或 GPU。
+
+流程：二值化 → 列投影切分字形 → 按面积平均缩放到模板网格并轻度模糊 → 与 0‑9 模板做一次矩阵相关。
+模板网格最高 MAX_TEMPLATE_H 行，4K 下字形先缩小再匹配，单帧耗时与 1080p 相当；
+模糊让笔画粗细与抗锯齿的差异不至于把相关系数压得太低。
+每个 RES_GEOMETRY 分辨率各有一套模板，首次使用时生成并缓存到磁盘；
+用实机截图调用 calibrate() 可得到更贴合游戏字体的模板，并优先使用。
+
+样例集的局限：make-corpus 用系统无衬线字体经 Qt 抗锯齿渲染，字号、字重、位置随机抖动，
+与默认的点阵模板不同源，准确率反映的是切分与匹配对字体差异的容忍度。默认模板与别的字体的相关系数
+约 0.65，低于 auto_sync.MIN_CONFIDENCE；用同一字体的截图 calibrate() 之后在 0.9 以上，
+这也是实机使用前必须校准、自动同步在校准前拒绝启动的原因。
+样例仍是合成图，不代表实机表现。实机准确率只能用真实截图标注的样例评测
+（目录格式与 make-corpus 相同：<分辨率>/frames.npy + labels.json）。
+
+    python digit_recognizer.py make-corpus DIR     # 生成六种分辨率的样例裁剪图
+    python digit_recognizer.py check DIR           # 在样例上统计准确率与单帧耗时
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from app_paths import user_dir
+from config import RES_GEOMETRY
+from geometry import bar_geometry
+from perf_stats import percentile
+from screen_capture import countdown_roi
+
+# 5×7 点阵字形，仅作默认模板用（样例集另用系统字体渲染，避免自己测自己）
+GLYPHS = {
+    "0": ("01110", "10001", "10011", "10101", "11001", "10001", "01110"),
+    "1": ("00100", "01100", "00100", "00100", "00100", "00100", "01110"),
+    "2": ("01110", "10001", "00001", "00010", "00100", "01000", "11111"),
+    "3": ("11110", "00001", "00001", "01110", "00001", "00001", "11110"),
+    "4": ("00010", "00110", "01010", "10010", "11111", "00010", "00010"),
+    "5": ("11111", "10000", "11110", "00001", "00001", "10001", "01110"),
+    "6": ("00110", "01000", "10000", "11110", "10001", "10001", "01110"),
+    "7": ("11111", "00001", "00010", "00100", "01000", "01000", "01000"),
+    "8": ("01110", "10001", "10001", "01110", "10001", "10001", "01110"),
+    "9": ("01110", "10001", "10001", "01111", "00001", "00010", "01100"),
+    ":": ("0", "1", "1", "0", "1", "1", "0"),
+}
+
+GLYPH_HEIGHT = 0.7      # 字高 / 倒计时区域高
+MAX_TEMPLATE_H = 21     # 模板网格最多的行数，更高分辨率的字形先按面积平均缩小
+SMOOTH_RADIUS = 2       # 缩放后方框模糊的半径（格）
+CORPUS_FONT = "Sans Serif"  # 样例集所用字体族，Qt 按系统字体解析
+CORPUS_SCALE = (0.85, 1.15) # 样例字高相对模板字高的随机范围
+MIN_CONTRAST = 40       # 灰度极差低于此值视为没有文字
+COLON_WIDTH = 0.45      # 宽度低于 字宽×此值 的字形视为冒号
+
+Reading = namedtuple("Reading", "seconds confidence")
+
+# 特征（网格与缩放方式）变了，校准模板也要作废；点阵字形只影响默认模板
+_FEATURES = hashlib.sha1(repr((GLYPH_HEIGHT, MAX_TEMPLATE_H, SMOOTH_RADIUS)).encode()).hexdigest()[:8]
+_VERSION = hashlib.sha1(repr((sorted(GLYPHS.items()), _FEATURES)).encode()).hexdigest()[:8]
+
+
+def res_slug(res_key: str) -> str:
+    return re.sub(r"[^0-9a-zA-Z]+", "_", res_key).strip("_")
+
+
+def glyph_height(res_key: str) -> int:
+    """该分辨率下倒计时数字的像素高度。"""
+    roi_h = countdown_roi(bar_geometry(res_key))[3]
+    return max(7, int(round(roi_h * GLYPH_HEIGHT)))
+
+
+def template_shape(res_key: str):
+    """该分辨率下的模板网格 (高, 宽)。"""
+    th = min(glyph_height(res_key), MAX_TEMPLATE_H)
+    return th, max(5, int(round(th * 5 / 7)))
+
+
+def _bitmap(ch: str) -> np.ndarray:
+    return np.array([[c == "1" for c in row] for row in GLYPHS[ch]], dtype=np.uint8)
+
+
+@functools.lru_cache(maxsize=256)
+def _resample_matrix(n_in: int, n_out: int) -> np.ndarray:
+    """(n_out, n_in) 的线性变换：按面积平均缩放到 n_out 格，再做半径 SMOOTH_RADIUS 的方框模糊。"""
+    edges = np.arange(n_out + 1) * n_in / n_out
+    src = np.arange(n_in)
+    area = np.clip(np.minimum(edges[1:, None], src + 1) - np.maximum(edges[:-1, None], src), 0, None)
+    area /= area.sum(axis=1, keepdims=True)
+    cells = np.arange(n_out)
+    blur = np.abs(cells[:, None] - cells) <= SMOOTH_RADIUS
+    return (blur @ area).astype(np.float32)
+
+
+def _scale(img: np.ndarray, h: int, w: int) -> np.ndarray:
+    """缩放到 h×w 网格（面积平均 + 模糊），两次小矩阵乘法。"""
+    return _resample_matrix(img.shape[0], h) @ img.astype(np.float32) @ _resample_matrix(img.shape[1], w).T
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    """每行去均值并归一化，使点积即为相关系数。"""
+    mat = mat.astype(np.float32)
+    mat -= mat.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return mat / norms
+
+
+# ---------------- 模板缓存 ----------------
+def _cache_path(res_key: str, calibrated=False) -> str:
+    tag = f"calibrated-{_FEATURES}" if calibrated else _VERSION
+    return os.path.join(user_dir("cache"), f"digits-{res_slug(res_key)}-{tag}.npz")
+
+
+def is_calibrated(res_key: str) -> bool:
+    """该分辨率是否已有用实机截图校准的模板。"""
+    return os.path.isfile(_cache_path(res_key, calibrated=True))
+
+
+def build_templates(res_key: str) -> np.ndarray:
+    th, tw = template_shape(res_key)
+    return _normalize(np.stack([_scale(_bitmap(str(d)), th, tw).ravel() for d in range(10)]))
+
+
+def load_templates(res_key: str) -> np.ndarray:
+    """优先读校准模板，其次读缓存，都没有时生成并写入缓存。"""
+    for path in (_cache_path(res_key, calibrated=True), _cache_path(res_key)):
+        if os.path.isfile(path):
+            with np.load(path) as data:
+                tpl = data["templates"]
+            if tpl.shape[1] == np.prod(template_shape(res_key)):
+                return tpl
+    tpl = build_templates(res_key)
+    np.savez(_cache_path(res_key), templates=tpl)
+    return tpl
+
+
+# ---------------- 识别 ----------------
+class DigitRecognizer:
+    def __init__(self, res_key: str, bright_text=True):
+        self.res_key = res_key
+        self.bright_text = bright_text
+        self.shape = template_shape(res_key)
+        self.templates = load_templates(res_key)
+
+    def _gray(self, crop: np.ndarray) -> np.ndarray:
+        if crop.ndim == 3:
+            # 对长度为 3 的末轴做 max 归约很慢（4K 下约 0.4 ms），逐通道两两取大要快几十倍
+            crop = np.maximum(np.maximum(crop[..., 0], crop[..., 1]), crop[..., 2])
+        return crop if self.bright_text else 255 - crop
+
+    def segment(self, crop: np.ndarray):
+        """二值化并按列投影切分，返回 [(字形二值图, 是否冒号)]；没有文字时返回 []。"""
+        gray = self._gray(crop)
+        lo, hi = int(gray.min()), int(gray.max())
+        if hi - lo < MIN_CONTRAST:
+            return []
+        ink = gray > (lo + hi) // 2
+
+        cols = ink.any(axis=0).astype(np.int8)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], cols, [0]))))
+        starts, ends = edges[::2], edges[1::2]
+
+        rows = np.flatnonzero(ink.any(axis=1))
+        height = rows[-1] - rows[0] + 1
+        glyphs = []
+        for a, b in zip(starts, ends):
+            g = ink[:, a:b]
+            r = np.flatnonzero(g.any(axis=1))
+            glyphs.append((g[r[0]:r[-1] + 1], (b - a) < height * 5 / 7 * COLON_WIDTH))
+        return glyphs
+
+    def classify(self, glyphs):
+        """字形列表 → (数字列表, 各自相关系数)。"""
+        th, tw = self.shape
+        vecs = np.stack([_scale(g, th, tw).ravel() for g in glyphs])
+        scores = _normalize(vecs) @ self.templates.T
+        best = scores.argmax(axis=1)
+        return best, scores[np.arange(len(best)), best]
+
+    def read(self, crop: np.ndarray):
+        """识别一帧 MM:SS，返回 Reading(总秒数, 置信度 0‑1)；无法识别时返回 None。"""
+        glyphs = self.segment(crop)
+        digits = [g for g, colon in glyphs if not colon]
+        if len(digits) != 4 or len(glyphs) != 5 or not glyphs[2][1]:
+            return None
+        best, score = self.classify(digits)
+        m = best[0] * 10 + best[1]
+        s = best[2] * 10 + best[3]
+        if s >= 60:
+            return None
+        return Reading(int(m * 60 + s), float(max(0.0, score.min())))
+
+    def calibrate(self, crops, labels):
+        """用带标注的实机裁剪图（labels 为总秒数）求平均模板并写入校准缓存。"""
+        th, tw = self.shape
+        acc = np.zeros((10, th * tw), dtype=np.float32)
+        cnt = np.zeros(10, dtype=np.int64)
+        for crop, secs in zip(crops, labels):
+            digits = [g for g, colon in self.segment(crop) if not colon]
+            m, s = divmod(int(secs), 60)
+            text = f"{m:02d}{s:02d}"
+            if len(digits) != 4:
+                continue
+            for ch, g in zip(text, digits):
+                acc[int(ch)] += _scale(g, th, tw).ravel()
+                cnt[int(ch)] += 1
+        missing = [d for d in range(10) if not cnt[d]]
+        fallback = build_templates(self.res_key)
+        tpl = _normalize(acc / np.maximum(cnt, 1)[:, None])
+        tpl[missing] = fallback[missing]
+        np.savez(_cache_path(self.res_key, calibrated=True), templates=tpl)
+        self.templates = tpl
+        return missing
+
+
+# ---------------- 样例集 ----------------
+def _ensure_gui_app():
+    """Qt 渲染字体需要 QGuiApplication；命令行单独运行时创建一个离屏的。"""
+    from PyQt5.QtGui import QGuiApplication
+
+    app = QGuiApplication.instance()
+    if app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = _ensure_gui_app.app = QGuiApplication(sys.argv[:1])
+    return app
+
+
+def render_crop(res_key: str, seconds: int, rng=None, noise=12) -> np.ndarray:
+    """用系统字体合成一张倒计时裁剪图 (H, W, 3)：字高、字重、水平位置随机抖动，抗锯齿后叠加噪声。"""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter
+
+    _ensure_gui_app()
+    rng = rng or np.random.default_rng()
+    _, _, w, h = countdown_roi(bar_geometry(res_key))
+    th = glyph_height(res_key)
+    m, s = divmod(int(seconds), 60)
+    text = f"{m:02d}:{s:02d}"
+
+    font = QFont(CORPUS_FONT)
+    font.setBold(bool(rng.integers(0, 2)))
+    font.setPixelSize(th)
+    digit_h = max(1, QFontMetrics(font).tightBoundingRect("0").height())
+    size = max(1, round(th * th / digit_h * rng.uniform(*CORPUS_SCALE)))
+    while True:
+        font.setPixelSize(size)
+        box = QFontMetrics(font).tightBoundingRect(text)
+        if box.width() <= w - 2 or size == 1:     # 整串须放得下，否则两端被裁掉
+            break
+        size -= 1
+
+    ink = QImage(w, h, QImage.Format_Grayscale8)
+    ink.fill(0)
+    painter = QPainter(ink)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    painter.setFont(font)
+    painter.setPen(QColor(Qt.white))
+    slack = (w - box.width()) // 2
+    x = slack - box.x() + int(rng.integers(-min(2, slack), min(2, slack) + 1))
+    y = (h - box.height()) // 2 - box.y()
+    painter.drawText(x, y, text)
+    painter.end()
+    coverage = np.frombuffer(ink.constBits().asstring(ink.bytesPerLine() * h), np.uint8)
+    coverage = coverage.reshape(h, ink.bytesPerLine())[:, :w].astype(np.int32)
+
+    bg = rng.integers(20, 60, size=(h, w), dtype=np.int32)
+    fg = int(rng.integers(210, 255))
+    img = bg + (fg - bg) * coverage // 255
+    img += rng.integers(-noise, noise + 1, size=img.shape, dtype=np.int32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    return np.repeat(img[..., None], 3, axis=2)
+
+
+def make_corpus(dest: str, per_res=30, seed=0):
+    """每种分辨率生成 per_res 张样例：dest/<分辨率>/frames.npy + labels.json。"""
+    rng = np.random.default_rng(seed)
+    for res_key in RES_GEOMETRY:
+        labels = [int(v) for v in rng.integers(0, 270, size=per_res)]
+        frames = np.stack([render_crop(res_key, v, rng) for v in labels])
+        out = os.path.join(dest, res_slug(res_key))
+        os.makedirs(out, exist_ok=True)
+        np.save(os.path.join(out, "frames.npy"), frames)
+        with open(os.path.join(out, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump({"resolution": res_key, "labels": labels}, f, ensure_ascii=False)
+
+
+def check_corpus(src: str):
+    report = {}
+    for res_key in RES_GEOMETRY:
+        d = os.path.join(src, res_slug(res_key))
+        if not os.path.isdir(d):
+            continue
+        frames = np.load(os.path.join(d, "frames.npy"), mmap_mode="r")
+        with open(os.path.join(d, "labels.json"), encoding="utf-8") as f:
+            labels = json.load(f)["labels"]
+        rec = DigitRecognizer(res_key)
+        ok, times, confs = 0, [], []
+        for frame, label in zip(frames, labels):
+            t = time.perf_counter()
+            r = rec.read(frame)
+            times.append(time.perf_counter() - t)
+            if r is not None:
+                confs.append(r.confidence)
+                ok += r.seconds == label
+        times.sort()
+        report[res_key] = {
+            "accuracy": round(ok / len(labels), 4),
+            "mean_conf": round(float(np.mean(confs)), 4) if confs else 0.0,
+            "p50_ms": round(percentile(times, 50) * 1000, 3),
+            "p99_ms": round(percentile(times, 99) * 1000, 3),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="缩圈倒计时识别")
+    ap.add_argument("command", choices=("make-corpus", "check"))
+    ap.add_argument("dir")
+    ap.add_argument("--per-res", type=int, default=30)
+    args = ap.parse_args()
+    if args.command == "make-corpus":
+        make_corpus(args.dir, args.per_res)
+    else:
+        json.dump(check_corpus(args.dir), sys.stdout, ensure_ascii=False, indent=2)
@@ -1,76 +1,424 @@
 # draw_overlay.py
+import logging
+import sys
+import time
+
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QPen, QColor, QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter, QPen, QColor, QFont, QFontMetrics, QPixmap, QRegion, QStaticText, QTransform
+from PyQt5.QtCore import Qt, QPointF, QRect, QTimer
+
+from perf_stats import STATS
+from survival import FOREVER
+from timeline import COUNTDOWN, SHRINKING
+
+LINE_MARGIN = 3     # 描边线宽的一半再留 1px
+HIGHLIGHT_MARGIN = 5
+LABEL_X = 6
+HUD_GAP = 4
+WDA_NONE = 0x00                 # SetWindowDisplayAffinity：恢复默认，截屏与录屏照常拍到该窗口
+WDA_EXCLUDEFROMCAPTURE = 0x11   # 截屏中不出现该窗口（Windows 10 2004+）
+
+log = logging.getLogger(__name__)
+
 
-from config import ZONE_DAMAGE, TOLERANCE_MAP
+class CountdownHud:
+    """覆盖层里的倒计时：[阶段标签][分][:][秒十位][秒个位]。
+
+    字形预先排版成 QStaticText 并缓存；数字格宽度固定为最宽数字的宽度，
+    秒数变化时只有变了的那一两格需要重绘。
+    """
+    PHASE_LABELS = {COUNTDOWN: "倒计时", SHRINKING: "缩圈"}
+
+    def __init__(self):
+        self.font = QFont("微软雅黑")
+        self.font.setBold(True)
+        self.rects = []             # 各格矩形
+        self.texts = [None] * 5     # 各格当前文字，None 表示不显示
+        self._glyphs = {}           # {文字: QStaticText}
+        self._size = None
+        self._bg = QColor(0, 0, 0, 150)
+        self._fg = QColor(255, 255, 255)
+
+    @classmethod
+    def label(cls, zone_level, phase):
+        return f"阶段{zone_level} {cls.PHASE_LABELS[phase]}"
+
+    def layout(self, right: int, height: int):
+        """以 right 为右边界排版；尺寸不变时不做任何事。"""
+        if (right, height) == self._size:
+            return
+        self._size = (right, height)
+        self.font.setPixelSize(max(9, int(height * 0.7)))
+        self._glyphs.clear()
+        fm = QFontMetrics(self.font)
+        digit = max(fm.horizontalAdvance(d) for d in "0123456789")
+        label = max(fm.horizontalAdvance(self.label(zl, ph)) for zl in range(1, 10) for ph in self.PHASE_LABELS)
+        widths = (label + HUD_GAP * 2, digit, fm.horizontalAdvance(":"), digit, digit)
+        x = right - sum(widths)
+        self.rects = []
+        for w in widths:
+            self.rects.append(QRect(x, 1, w, height - 2))
+            x += w
+
+    def set(self, value) -> QRegion:
+        """value 为 (圈等级, 相位, 剩余整秒) 或 None；返回需要重绘的区域。"""
+        if value is None:
+            texts = [None] * 5
+        else:
+            zone_level, phase, secs = value
+            m, s = divmod(secs, 60)
+            texts = [self.label(zone_level, phase), str(min(m, 9)), ":", str(s // 10), str(s % 10)]
+        dirty = QRegion()
+        for rect, old, new in zip(self.rects, self.texts, texts):
+            if old != new:
+                dirty += rect
+        self.texts = texts
+        return dirty
+
+    def _glyph(self, text) -> QStaticText:
+        st = self._glyphs.get(text)
+        if st is None:
+            st = self._glyphs[text] = QStaticText(text)
+            st.setTextFormat(Qt.PlainText)
+            st.prepare(QTransform(), self.font)
+        return st
+
+    def draw(self, painter, clip: QRect):
+        painter.setFont(self.font)
+        painter.setPen(self._fg)
+        for i, (rect, text) in enumerate(zip(self.rects, self.texts)):
+            if text is None or not rect.intersects(clip):
+                continue
+            painter.fillRect(rect, self._bg)
+            st = self._glyph(text)
+            size = st.size()
+            # 标签靠右贴近数字，数字与冒号居中
+            x = rect.right() - HUD_GAP - size.width() if i == 0 else rect.x() + (rect.width() - size.width()) / 2
+            painter.drawStaticText(QPointF(x, rect.y() + (rect.height() - size.height()) / 2), st)
 
 
 class HealthZoneOverlay(QWidget):
+    """血条辅助线覆盖层。
+
+    辅助线预先绘制进一张透明 pixmap，仅在 (尺寸, 圈等级, 容错模式, 是否显示) 变化时重建；
+    变化时也只让移动了的线条所在的矩形失效。外部状态变化后调用 refresh() 而不是 update()。
+    若控制器提供了 hp_percent（血条采样），当前血量之上最近的一条线会加粗高亮。
+
+    窗口下半部分与血条重合，只画辅助线；上半部分是等高的文字条，放线标签、倒计时与可坚持时间读数，
+    这样血条采样读的中间一行不会被文字盖住。辅助线本身则靠排除截屏或 mask_sampler() 处理；
+    排除截屏只在血条采样运行期间生效，否则 OBS、录屏与截图也会拍不到覆盖层。
+    """
+
     def __init__(self, geometry, controller):
         super().__init__()
         self.controller = controller
 
+        self._label_font = QFont("微软雅黑")
+        self._label_font.setBold(True)
+        self._label_metrics = QFontMetrics(self._label_font)
+        self._outline_pen = QPen(QColor(0, 0, 0), 4)
+        self._highlight_outline_pen = QPen(QColor(255, 255, 255), 7)
+        self._pens = {}             # {(QColor.rgba(), 宽度): QPen}
+
+        self._base_key = None       # 不含血量的渲染键
+        self._base_items = ()       # 该键对应的线条
+
+        self._key = None            # 当前已呈现的渲染键
+        self._items = ()            # 当前键对应的 ((x, color, label), ...)
+        self._layer = None          # 预绘制的辅助线层
+
+        # 圈外可坚持时间读数：已同步且有血量数据时每秒查表一次，只重绘读数所在的小矩形
+        self._readout = None
+        self._readout_font = QFont("微软雅黑")
+        self._readout_font.setBold(True)
+        self._readout_timer = QTimer(self)
+        self._readout_timer.setInterval(1000)
+        self._readout_timer.timeout.connect(self.update_readout)
+
+        # 倒计时 HUD：由 ZoneTimer 每秒调用 set_countdown()
+        self._hud = CountdownHud()
+
+        # 调试 HUD：仅在开启统计时每秒刷新一次
+        self._hud_font = QFont("Consolas", 7)
+        self._hud_timer = None
+        if STATS.enabled:
+            self._hud_timer = QTimer(self)
+            self._hud_timer.timeout.connect(lambda: self.update(self._hud_rect()))
+            self._hud_timer.start(1000)
+
         self.setGeometry(*geometry)
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setAttribute(Qt.WA_ShowWithoutActivating)
         self.show()
+        self.capture_excluded = False
+        if getattr(controller, "hp_monitor", None) is not None:
+            self.set_capture_excluded(True)
+
+    def set_capture_excluded(self, excluded: bool):
+        """血条采样期间让截屏（包括采样用的 mss）看不到本窗口，停止采样后恢复。
+
+        仅 Windows 10 2004 及以上支持；不支持时血条采样改为跳过辅助线所在的列。
+        """
+        if excluded != self.capture_excluded:
+            if self._set_display_affinity(WDA_EXCLUDEFROMCAPTURE if excluded else WDA_NONE):
+                self.capture_excluded = excluded
+            elif excluded:
+                log.info("覆盖层无法排除在截屏之外，血条采样改为跳过辅助线所在的列")
+        self.mask_sampler()
+
+    def _set_display_affinity(self, affinity) -> bool:
+        if sys.platform != "win32":
+            return False
+        import ctypes
+
+        try:
+            return bool(ctypes.windll.user32.SetWindowDisplayAffinity(int(self.winId()), affinity))
+        except (AttributeError, OSError):
+            return False
+
+    def _bar_top(self) -> int:
+        """血条在窗口中的上边缘：窗口上半部分是文字条。"""
+        return self.height() // 2
+
+    def mask_sampler(self):
+        """把辅助线所在的列告诉血条采样（覆盖层已排除在截屏之外时不需要，清空即可）。"""
+        monitor = getattr(self.controller, "hp_monitor", None)
+        if monitor is None or not self.width():
+            return
+        w = self.width()
+        spans = []
+        if not self.capture_excluded:
+            for xpos, _, _, highlighted in self._items:
+                margin = HIGHLIGHT_MARGIN if highlighted else LINE_MARGIN
+                spans.append(((xpos - margin) / w, (xpos + margin + 1) / w))
+        monitor.sampler.set_ignored(spans)
 
 
     def calculate_thresholds(self, zl, mode_name):
-        base = ZONE_DAMAGE.get(zl, 0)
-        p1 = ZONE_DAMAGE.get(max(1, zl - 1), 0)
-        p2 = ZONE_DAMAGE.get(max(1, zl - 2), 0)
-        x = TOLERANCE_MAP[mode_name]
-        x = x(zl) if callable(x) else x
-        return (
-            base * 6 + x,                      
-            (base + p2) * 6 + x,               
-            (base + p1 + p2) * 6 + x if zl < 8 else None,  
-            x                                  
+        """从控制器的预编译阈值表中读取，O(1)。"""
+        return self.controller.thresholds.lookup(zl, mode_name)
+
+
+    # -------- 渲染缓存 --------
+    def _render_key(self):
+        """(尺寸, 圈等级, 容错模式, 是否显示, 阈值表版本, 高亮线序号)；高亮只随“处于哪两条线之间”变化。"""
+        c = self.controller
+        visible = getattr(c, "is_synced", False) and getattr(c, "guides_enabled", True)
+        base = (
+            self.width(), self.height(), self.devicePixelRatioF(),
+            c.zone_level if visible else None,
+            c.tolerance_mode if visible else None,
+            visible,
+            c.thresholds.version if visible else None,
         )
+        if base != self._base_key:
+            self._base_key, self._base_items = base, self._guide_items(base)
+        return base + (self._highlight_index(getattr(c, "hp_percent", None)),)
 
+    def _highlight_index(self, hp):
+        """当前血量之上最近的一条线的序号；没有血量数据或已在所有线之上时为 None。"""
+        if hp is None:
+            return None
+        hp_x = self.width() * hp / 100
+        above = [(x, i) for i, (x, _, _) in enumerate(self._base_items) if x > hp_x]
+        return min(above)[1] if above else None
 
-    @staticmethod
-    def draw_colored_line(painter, xpos, top, bottom, color):
-        painter.setPen(QPen(QColor(0, 0, 0), 4))
-        painter.drawLine(xpos, top, xpos, bottom)
-        painter.setPen(QPen(color, 2))
-        painter.drawLine(xpos, top, xpos, bottom)
+    def _items_for(self, key):
+        """渲染键 → ((x, QColor, label|None, 高亮), ...)"""
+        hl = key[-1]
+        return tuple((x, color, label, i == hl) for i, (x, color, label) in enumerate(self._base_items))
 
+    def _guide_items(self, key):
+        """基础渲染键 → ((x, QColor, label|None), ...)，按绘制顺序排列。"""
+        w, h, _, zl, mode, visible, _ = key
+        self._label_font.setPixelSize(max(9, int(h // 2 * 0.7)))
+        self._label_metrics = QFontMetrics(self._label_font)
+        if not visible:
+            return ()
 
-    def paintEvent(self, event):
-        if not getattr(self.controller, "is_synced", False) or not getattr(self.controller, "guides_enabled", True):
+        if zl == 9:
+            return (
+                (int(w * 0.25), QColor(255, 0, 0), "急救包"),
+                (int(w * 0.50), QColor(0, 255, 0), "医疗箱"),
+            )
+
+        thresholds = self.calculate_thresholds(zl, mode)
+        if thresholds is None:
+            return ()
+        no, l1, l2, x = thresholds
+        items = [(int(w * min(1.0, no / 100)), QColor(128, 0, 128), None)]
+        if zl >= 3:
+            items.append((int(w * min(1.0, l1 / 100)), QColor(0, 128, 255), None))
+            if l2:
+                items.append((int(w * min(1.0, l2 / 100)), QColor(0, 255, 0), None))
+        items.append((int(w * min(1.0, x / 100)), QColor(0, 0, 0), None))
+        return tuple(items)
+
+    def _item_rect(self, item) -> QRect:
+        xpos, _, label, highlighted = item
+        margin = HIGHLIGHT_MARGIN if highlighted else LINE_MARGIN
+        rect = QRect(xpos - margin, 0, margin * 2 + 1, self.height())
+        if label:
+            rect = rect.united(self._label_metrics.boundingRect(label).translated(xpos + LABEL_X, self._label_y()))
+        return rect
+
+    def _label_y(self) -> int:
+        """线标签的基线：文字条内，贴近血条上缘。"""
+        return self._bar_top() - self._label_metrics.descent() - 1
+
+    def _set_items(self, key):
+        self._key, self._items, self._layer = key, self._items_for(key), None
+        self.mask_sampler()
+
+    def refresh(self):
+        """状态可能变化后调用：键不变时什么都不做，否则只重绘变化的线条区域。"""
+        self.update_readout()
+        if not self.countdown_visible:
+            self.set_countdown(None)
+        key = self._render_key()
+        if key == self._key:
             return
 
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+        old_key, old_items = self._key, self._items
+        self._set_items(key)
+        if old_key is None or old_key[:3] != key[:3]:
+            self.update()
+            return
 
-        w, h = self.width(), self.height()
-        top, bot = -4, h + 4
-        zl = self.controller.zone_level
-        mode = self.controller.tolerance_mode
+        def _sig(item):
+            return item[0], item[1].rgba(), item[2], item[3]
 
-        if zl == 9:
-            painter.setFont(QFont("微软雅黑", 12, QFont.Bold))
-            specials = [
-                (0.25, "急救包", QColor(255, 0, 0)),    
-                (0.50, "医疗箱", QColor(0, 255, 0)),    
-            ]
-            for ratio, label, color in specials:
-                xpos = int(w * ratio)
-                self.draw_colored_line(painter, xpos, top, bot, color)
+        old_sigs = {_sig(i) for i in old_items}
+        new_sigs = {_sig(i) for i in self._items}
+        dirty = QRegion()
+        for item in old_items:
+            if _sig(item) not in new_sigs:
+                dirty += self._item_rect(item)
+        for item in self._items:
+            if _sig(item) not in old_sigs:
+                dirty += self._item_rect(item)
+        if not dirty.isEmpty():
+            self.update(dirty)
+
+    def _pen(self, color: QColor, width=2) -> QPen:
+        pen = self._pens.get((color.rgba(), width))
+        if pen is None:
+            pen = self._pens[(color.rgba(), width)] = QPen(color, width)
+        return pen
+
+    def _build_layer(self):
+        dpr = self.devicePixelRatioF()
+        layer = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.transparent)
+
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self._label_font)
+        top, bot = self._bar_top(), self.height() + 4
+        label_y = self._label_y()
+        for xpos, color, label, highlighted in self._items:
+            self.draw_colored_line(painter, xpos, top, bot, color, highlighted)
+            if label:
                 painter.setPen(color)
-                painter.drawText(xpos + 6, 22, label)
-            return
+                painter.drawText(xpos + LABEL_X, label_y, label)
+        painter.end()
+        return layer
 
 
-        no, l1, l2, x = self.calculate_thresholds(zl, mode)
+    def draw_colored_line(self, painter, xpos, top, bottom, color, highlighted=False):
+        painter.setPen(self._highlight_outline_pen if highlighted else self._outline_pen)
+        painter.drawLine(xpos, top, xpos, bottom)
+        painter.setPen(self._pen(color, 4 if highlighted else 2))
+        painter.drawLine(xpos, top, xpos, bottom)
 
-        self.draw_colored_line(painter, int(w * min(1.0, no / 100)), top, bot, QColor(128, 0, 128))
-        if zl >= 3:
-            self.draw_colored_line(painter, int(w * min(1.0, l1 / 100)), top, bot, QColor(0, 128, 255))
-            if l2:
-                self.draw_colored_line(painter, int(w * min(1.0, l2 / 100)), top, bot, QColor(0, 255, 0))
-        self.draw_colored_line(painter, int(w * min(1.0, x / 100)), top, bot, QColor(0, 0, 0))
+
+    # -------- 可坚持时间读数 --------
+    def _readout_text(self):
+        c = self.controller
+        survival = getattr(c, "survival", None)
+        hp = getattr(c, "hp_percent", None)
+        if survival is None or hp is None or not getattr(c, "is_synced", False):
+            return None
+        st = c.zone_timer.state()
+        if st is None:
+            return None
+        survival.prepare(c.tolerance_mode, st.index)     # 已就绪时只是一次比较
+        v = survival.seconds(st, hp)
+        if v is None:
+            return None
+        return "∞" if v == FOREVER else f"{v}s"
+
+    def _readout_rect(self) -> QRect:
+        h = self._bar_top()
+        self._readout_font.setPixelSize(max(9, int(h * 0.7)))
+        w = QFontMetrics(self._readout_font).horizontalAdvance("0000s") + 6
+        return QRect(self.width() - w - 1, 1, w, h - 2)
+
+    def update_readout(self):
+        text = self._readout_text()
+        if text is None:
+            self._readout_timer.stop()
+        elif not self._readout_timer.isActive():
+            self._readout_timer.start()
+        if text != self._readout:
+            self._readout = text
+            self.update(self._readout_rect())
+
+    def _draw_readout(self, painter):
+        rect = self._readout_rect()
+        painter.fillRect(rect, QColor(0, 0, 0, 150))
+        painter.setFont(self._readout_font)
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(rect, Qt.AlignCenter, self._readout)
+
+    # -------- 倒计时 HUD --------
+    @property
+    def countdown_visible(self) -> bool:
+        return getattr(self.controller, "countdown_hud", True)
+
+    def set_countdown(self, value):
+        """value 为 (圈等级, 相位, 剩余整秒) 或 None；只重绘变化了的字格。"""
+        if not self.countdown_visible:
+            value = None
+        self._hud.layout(self._readout_rect().left() - HUD_GAP, self._bar_top())
+        dirty = self._hud.set(value)
+        if not dirty.isEmpty():
+            self.update(dirty)
+
+    def _hud_rect(self) -> QRect:
+        return QRect(0, 0, self.width(), QFontMetrics(self._hud_font).height() + 2)
+
+    def _draw_hud(self, painter):
+        rect = self._hud_rect()
+        painter.fillRect(rect, QColor(0, 0, 0, 160))
+        painter.setFont(self._hud_font)
+        painter.setPen(QColor(255, 255, 0))
+        painter.drawText(rect.adjusted(2, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter, STATS.hud_text())
+
+    def paintEvent(self, event):
+        t0 = time.perf_counter() if STATS.enabled else None
+
+        key = self._render_key()
+        if key != self._key:
+            # 尺寸等变化未经 refresh() 时在这里补齐
+            self._set_items(key)
+
+        painter = None
+        if self._items:
+            if self._layer is None:
+                self._layer = self._build_layer()
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, self._layer)
+        if self._readout is not None:
+            painter = painter or QPainter(self)
+            self._draw_readout(painter)
+        if self._hud.texts[0] is not None:
+            painter = painter or QPainter(self)
+            self._hud.layout(self._readout_rect().left() - HUD_GAP, self._bar_top())
+            self._hud.draw(painter, event.rect())
+
+        if t0 is not None:
+            self._draw_hud(painter or QPainter(self))
+            STATS.paint.append((time.perf_counter() - t0) * 1000)
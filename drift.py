@@ -0,0 +1,163 @@
+# drift.py
+"""同步漂移校正。
+
+手动同步只确定一次时间轴零点（anchor），输入延迟与游戏端的偏差会随阶段累积。
+这里把之后得到的每一次“此刻真实剩余时间”观测（屏幕识别、控制接口、手动输入）
+换算成它所暗示的零点，用带遗忘因子的加权最小二乘拟合 零点(t) = a + b·t，
+再把当前零点平滑地推向拟合值：小偏差按 SLEW_RATE 缓慢追平，大偏差直接跳过去。
+校正只调用 ZoneTimer.shift，已播报过的语音记录在 CueQueue.fired 中，不会重播；
+平滑校正每 SLEW_INTERVAL 平移一次，会话文件按 SAVE_INTERVAL 节流重写。
+"""
+from PyQt5.QtCore import QObject, QTimer
+
+from timeline import COUNTDOWN
+
+FORGET = 0.9        # 每来一次新观测，旧观测的权重乘以此系数
+OUTLIER = 2.0       # 已有 MIN_FIT 次观测后，偏离拟合超过此秒数的观测视为误读
+MIN_FIT = 3
+MIN_SPAN = 30.0     # 观测跨度不足此秒数时只估计偏移、不估计速率
+SLEW_RATE = 0.1     # 平滑校正速度（秒/秒），显示的秒数仍单调跳变
+SNAP = 2.0          # 待校正量超过此秒数时直接跳变
+DEADBAND = 0.02     # 小于此秒数的偏差忽略
+SLEW_INTERVAL = 0.2
+SAVE_INTERVAL = 1.0  # 平滑校正期间会话文件至多每秒重写一次，校正结束时再写一次
+
+
+class DriftEstimator:
+    """零点估计（不依赖 Qt）：y = a + b·x，x 为观测时刻，y 为该观测暗示的零点。
+
+    只维护加权累加和，每次观测 O(1)，旧数据按 FORGET 指数衰减。
+    """
+
+    def __init__(self, forget=FORGET):
+        self.forget = forget
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self._x0 = self._y0 = None     # 以首个观测为原点，避免大数相减损失精度
+        self._first = self._last = None
+        self._sw = self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def add(self, t: float, anchor: float, weight: float = 1.0) -> bool:
+        """加入一次观测；被判为离群值时返回 False。"""
+        if self._x0 is None:
+            self._x0, self._y0, self._first = t, anchor, t
+        elif self.n >= MIN_FIT and abs(self.predict(t) - anchor) > OUTLIER:
+            return False
+        x, y, k = t - self._x0, anchor - self._y0, self.forget
+        self._sw = self._sw * k + weight
+        self._sx = self._sx * k + weight * x
+        self._sy = self._sy * k + weight * y
+        self._sxx = self._sxx * k + weight * x * x
+        self._sxy = self._sxy * k + weight * x * y
+        self._last = t
+        self.n += 1
+        return True
+
+    @property
+    def rate(self) -> float:
+        """零点随时间的变化率（秒/秒）；观测跨度不足时为 0。"""
+        if self.n < 2 or self._last - self._first < MIN_SPAN:
+            return 0.0
+        det = self._sw * self._sxx - self._sx * self._sx
+        if det <= 1e-9:
+            return 0.0
+        return (self._sw * self._sxy - self._sx * self._sy) / det
+
+    def predict(self, t: float):
+        """t 时刻的零点估计；没有观测时返回 None。"""
+        if self.n == 0:
+            return None
+        b = self.rate
+        a = (self._sy - b * self._sx) / self._sw
+        return self._y0 + a + b * (t - self._x0)
+
+
+class DriftCorrector(QObject):
+    """接收观测并平滑校正 ZoneTimer 的时间轴。"""
+
+    def __init__(self, zone_timer):
+        super().__init__(zone_timer)
+        self.timer = zone_timer
+        self.estimator = DriftEstimator()
+        self.rejected = 0
+        self._anchor = None         # 最近一次由本对象设置的零点；与实际不符说明有外部同步/平移
+        self._saved_at = None       # 上次重写会话文件的时钟读数
+        self._unsaved = False       # 有尚未写入会话文件的校正
+
+        self._slew = QTimer(self)
+        self._slew.setInterval(int(SLEW_INTERVAL * 1000))
+        self._slew.timeout.connect(self._step)
+
+    # ---- 对外接口 ----
+    def observe(self, remaining: float, t: float = None, stage_idx: int = None, weight: float = 1.0) -> bool:
+        """“t 时刻距缩圈开始还剩 remaining 秒”。
+
+        stage_idx 省略时取与当前时间轴最吻合的阶段（屏幕识别只能读到秒数）。
+        返回该观测是否被采纳。
+        """
+        timeline = self.timer.timeline
+        if not timeline.is_synced:
+            return False
+        t = self.timer._clock() if t is None else t
+        self._check_external()
+
+        if stage_idx is None:
+            predicted = timeline.offset(t) + remaining
+            candidates = range(0, len(timeline), 2)     # 各阶段的倒计时相位
+            end = min((timeline.ends[i] for i in candidates), key=lambda e: abs(e - predicted))
+        else:
+            end = timeline.ends[timeline.index_of(stage_idx, COUNTDOWN)]
+
+        if not self.estimator.add(t, t - (end - remaining), weight):
+            self.rejected += 1
+            return False
+        if self._anchor is None:
+            self._anchor = timeline.anchor
+        self._step()
+        return True
+
+    def reset(self):
+        self.estimator.reset()
+        self._slew.stop()
+        self._anchor = None
+
+    def pending(self) -> float:
+        """尚未校正的量（秒，正数表示时间轴需要前移）。"""
+        target = self.estimator.predict(self.timer._clock())
+        if target is None or not self.timer.timeline.is_synced:
+            return 0.0
+        return self.timer.timeline.anchor - target
+
+    # ---- 内部 ----
+    def _check_external(self):
+        """重新同步或手动平移后，旧观测不再适用。"""
+        if self._anchor is not None and self.timer.timeline.anchor != self._anchor:
+            self.reset()
+
+    def _step(self):
+        self._check_external()
+        delta = self.pending()
+        if abs(delta) < DEADBAND:
+            self._slew.stop()
+            self._save()
+            return
+        snap = abs(delta) >= SNAP
+        if not snap:
+            limit = SLEW_RATE * SLEW_INTERVAL
+            delta = max(-limit, min(limit, delta))
+        self.timer.shift(delta, save=False)
+        self._anchor = self.timer.timeline.anchor
+        self._unsaved = True
+        if snap or self._saved_at is None or self.timer._clock() - self._saved_at >= SAVE_INTERVAL:
+            self._save()
+        if not self._slew.isActive():
+            self._slew.start()
+
+    def _save(self):
+        """把尚未写入的校正写进会话文件。"""
+        if self._unsaved:
+            self._unsaved = False
+            self._saved_at = self.timer._clock()
+            self.timer._save_session()
@@ -0,0 +1,121 @@
+# geometry.py
+"""血条矩形：任意分辨率、DPI 缩放与多显示器。
+
+RES_GEOMETRY 中的实测值优先；其它分辨率按拟合公式计算（以 1920x1080 为基准、按短边等比缩放，
+水平居中、距底边固定距离），与表中 16:9 与 21:9 各项误差不超过 1 像素：
+    s = min(W / 1920, H / 1080)
+    w = 414·s, h = 20·s, x = W/2 − w/2, y = H − 50·s
+
+矩形以游戏画面的物理像素表示；放置覆盖层时再按屏幕的 devicePixelRatio 换算为 Qt 逻辑坐标，
+并加上该屏幕在虚拟桌面中的位置。截屏（mss）用的是虚拟桌面的物理像素，见 capture_rect。结果按 (屏幕, 尺寸, DPR, 分辨率) 缓存，
+只有 Qt 报告屏幕增减或几何/DPI 变化时才清空。
+"""
+import re
+
+from PyQt5.QtCore import QObject, QRect, pyqtSignal
+from PyQt5.QtGui import QGuiApplication
+
+from config import RES_GEOMETRY
+
+BASE_W, BASE_H = 1920, 1080
+BAR_W, BAR_H, BAR_BOTTOM = 414, 20, 50
+
+
+def fitted_geometry(width: int, height: int):
+    """按拟合公式计算 (x, y, w, h)。"""
+    s = min(width / BASE_W, height / BASE_H)
+    w, h = round(BAR_W * s), round(BAR_H * s)
+    return round(width / 2 - w / 2), round(height - BAR_BOTTOM * s), w, h
+
+
+def resolution_key(width: int, height: int) -> str:
+    """物理分辨率 → RES_GEOMETRY 中的键；表中没有时返回 "WxH"。"""
+    wanted = f"{width}x{height}"
+    for key in RES_GEOMETRY:
+        if key.split(" ")[0] == wanted:
+            return key
+    return wanted
+
+
+def bar_geometry(res_key: str):
+    """分辨率键（表中的键或 "WxH"）→ 血条矩形 (x, y, w, h)，物理像素。"""
+    geo = RES_GEOMETRY.get(res_key)
+    if geo is not None:
+        return geo
+    m = re.match(r"\s*(\d+)\s*[xX×]\s*(\d+)", res_key)
+    if not m:
+        raise ValueError(f"无法识别的分辨率：{res_key!r}")
+    return fitted_geometry(int(m.group(1)), int(m.group(2)))
+
+
+def screen_resolution(screen) -> str:
+    """QScreen 的物理分辨率键。"""
+    g, dpr = screen.geometry(), screen.devicePixelRatio()
+    return resolution_key(round(g.width() * dpr), round(g.height() * dpr))
+
+
+class ScreenGeometry(QObject):
+    """各屏幕上覆盖层的逻辑坐标矩形（带缓存）。屏幕变化时发出 changed。"""
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cache = {}
+        app = QGuiApplication.instance()
+        app.screenAdded.connect(self._on_screen_added)
+        app.screenRemoved.connect(self._invalidate)
+        app.primaryScreenChanged.connect(self._invalidate)
+        for screen in app.screens():
+            self._watch(screen)
+
+    def _watch(self, screen):
+        screen.geometryChanged.connect(self._invalidate)
+        screen.logicalDotsPerInchChanged.connect(self._invalidate)
+        screen.physicalDotsPerInchChanged.connect(self._invalidate)
+
+    def _on_screen_added(self, screen):
+        self._watch(screen)
+        self._invalidate()
+
+    def _invalidate(self, *_):
+        self._cache.clear()
+        self.changed.emit()
+
+    # ---- 查询 ----
+    @staticmethod
+    def screens():
+        return QGuiApplication.screens()
+
+    @staticmethod
+    def find(name=None):
+        """按名称找屏幕；找不到或 name 为空时返回主屏。"""
+        if name:
+            for screen in QGuiApplication.screens():
+                if screen.name() == name:
+                    return screen
+        return QGuiApplication.primaryScreen()
+
+    def overlay_rect(self, screen, res_key=None) -> QRect:
+        """血条的逻辑坐标矩形（覆盖层据此放置）。res_key 为空时按该屏幕的物理分辨率计算。"""
+        g, dpr = screen.geometry(), screen.devicePixelRatio()
+        key = (screen.name(), g.x(), g.y(), g.width(), g.height(), dpr, res_key)
+        rect = self._cache.get(key)
+        if rect is None:
+            x, y, w, h = bar_geometry(res_key or screen_resolution(screen))
+            rect = self._cache[key] = QRect(
+                g.x() + round(x / dpr), g.y() + round(y / dpr),
+                max(1, round(w / dpr)), max(1, round(h / dpr)),
+            )
+        return QRect(rect)
+
+    @staticmethod
+    def capture_rect(screen, res_key=None):
+        """血条在虚拟桌面中的物理像素矩形 (x, y, w, h)，供 mss 截图。
+
+        Qt5 按屏幕缩放时，屏幕左上角保持原生（物理）坐标，只有宽高按 DPR 缩放，
+        所以原点直接取 geometry() 的左上角，血条偏移不再除以 DPR。
+        """
+        g = screen.geometry()
+        x, y, w, h = bar_geometry(res_key or screen_resolution(screen))
+        return g.x() + x, g.y() + y, w, h
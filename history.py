@@ -0,0 +1,171 @@
+# history.py
+"""对局记录：同步、相位切换、语音触发、模式切换、血量采样，追加写入 SQLite。
+
+    python history.py summary [--db 路径]     # 各阶段低于无药线的时间占比、语音播报延迟
+
+GUI 线程上的 record() 只把一个元组放进队列；后台写线程每 FLUSH_INTERVAL 秒或攒满 BATCH 条
+一次性 executemany + commit，计时与绘制路径不会因磁盘 IO 阻塞。
+事件类型与相位存为小整数，每条事件一行，表结构固定，汇总全部用 SQL 聚合完成。
+每条 "sync" 开启一局（sessions 中一行）；崩溃后恢复的对局也记一条 "sync"，extra 为 1。
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from app_paths import user_dir
+from timeline import COUNTDOWN, SHRINKING
+
+DB_FILE = "history.sqlite"
+BATCH = 256
+FLUSH_INTERVAL = 1.0
+HP_GAP_CAP = 30.0   # 两次血量采样间隔的计入上限（秒），避免暂停或切屏拉高权重
+
+# 事件类型（存为序号）
+KINDS = ("sync", "resync", "phase", "cue", "mode", "hp")
+KIND = {name: i for i, name in enumerate(KINDS)}
+PHASES = (COUNTDOWN, SHRINKING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY, started REAL, stage INTEGER, countdown REAL, mode TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    session INTEGER, t REAL, kind INTEGER, stage INTEGER, phase INTEGER,
+    value REAL, extra REAL, text TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind ON events (kind, session, t);
+"""
+
+
+def default_path() -> str:
+    return os.path.join(user_dir("data"), DB_FILE)
+
+
+def connect(path=None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or default_path())
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class MatchHistory:
+    """对局记录器。record() 可在任意线程调用，写库在后台线程完成。"""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            connect(self.path).close()      # 在调用方线程里建表，路径错误立即以 sqlite3.Error 抛出
+            self._thread = threading.Thread(target=self._run, name="history", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """写完队列里剩余的记录后结束写线程。"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---- 记录 ----
+    def record(self, kind: str, stage=None, phase=None, value=None, extra=None, text=None):
+        """stage 为 0‑based 阶段索引，phase 为 COUNTDOWN/SHRINKING。"""
+        self._queue.put((time.time(), KIND[kind], stage,
+                         None if phase is None else PHASES.index(phase), value, extra, text))
+
+    # ---- 写线程 ----
+    def _run(self):
+        conn = connect(self.path)
+        session = None
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if not batch:
+                continue
+            rows = []
+            for t, kind, stage, phase, value, extra, text in batch:
+                if kind == KIND["sync"]:
+                    # 每次同步开启一局新记录；text 为当时的容错模式
+                    session = conn.execute(
+                        "INSERT INTO sessions (started, stage, countdown, mode) VALUES (?, ?, ?, ?)",
+                        (t, stage, value, text)).lastrowid
+                rows.append((session, t, kind, stage, phase, value, extra, text))
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        conn.close()
+
+
+# ---- 汇总 ----
+def below_threshold(conn):
+    """各阶段血量低于无药线的时间占比（按采样间隔加权）。"""
+    sql = """
+        WITH s AS (
+            SELECT stage, t, value AS hp, extra AS line,
+                   LEAD(t) OVER (PARTITION BY session ORDER BY t) AS t_next
+            FROM events WHERE kind = ? AND stage IS NOT NULL
+        )
+        SELECT stage, COUNT(*), SUM(MIN(t_next - t, ?)),
+               SUM(MIN(t_next - t, ?) * (hp < line)), MIN(hp)
+        FROM s WHERE t_next IS NOT NULL
+        GROUP BY stage ORDER BY stage
+    """
+    out = []
+    for stage, n, total, below, min_hp in conn.execute(sql, (KIND["hp"], HP_GAP_CAP, HP_GAP_CAP)):
+        out.append({"stage": stage + 1, "samples": n, "seconds": round(total, 1),
+                    "below_fraction": round(below / total, 4) if total else None,
+                    "min_hp": min_hp})
+    return out
+
+
+def cue_lateness(conn):
+    """各条语音的播报延迟：语音内容实际响起比计划晚多少毫秒（负数为提前）。
+
+    在音频开始播放时记录，包含计时器唤醒、音频线程排队、设备启动与开头静音；静音时不播放也就不记录。
+    """
+    sql = """
+        SELECT text, COUNT(*), AVG(value), MAX(value)
+        FROM events WHERE kind = ? GROUP BY text ORDER BY text
+    """
+    return [{"cue": text, "n": n, "avg_ms": round(avg, 2), "max_ms": round(mx, 2)}
+            for text, n, avg, mx in conn.execute(sql, (KIND["cue"],))]
+
+
+def summary(conn):
+    sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    return {"sessions": sessions, "below_threshold": below_threshold(conn), "cues": cue_lateness(conn)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="对局记录汇总")
+    ap.add_argument("command", choices=["summary"])
+    ap.add_argument("--db", help=f"数据库路径（默认 {default_path()}）")
+    args = ap.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        print(json.dumps(summary(conn), ensure_ascii=False, indent=1))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# hp_sampler.py
+"""血条实时采样（可选功能，依赖 numpy；实时采集另需 mss）。
+
+只需读取血条中间的一行像素：按通道取最大值得到亮度，阈值化后找最后一个“有血”的像素即为血量边缘。
+采样在工作线程中按固定频率进行，中间数组预先分配，每次采样不分配任何随血条宽度增长的内存，
+只剩 numpy 调用本身几百字节的临时对象。
+
+截屏会拍到覆盖层画在血条上的辅助线。Windows 10 2004 起覆盖层把自己排除在截屏之外；
+其他情况下覆盖层通过 set_ignored() 告知辅助线所在的列，这些列按两侧像素推断。
+"""
+import math
+import threading
+import time
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from screen_capture import MssSource
+
+FILL_THRESHOLD = 150    # 亮度高于此值视为血条填充部分
+
+
+def hp_row_region(geometry):
+    """血条矩形 → 中间一行像素的区域 (x, y, w, 1)。"""
+    x, y, w, h = geometry
+    return x, y + h // 2, w, 1
+
+
+class HealthBarSampler:
+    """从一行像素求血量百分比。frame 形状为 (1, W, C) 或 (W, C)。
+
+    亮度与阈值化结果按从右到左的顺序存放，“最后一个有血的像素”就是缓冲区里第一个 True，
+    argmax 在连续内存上向前查找即可。调用方每次传入同一块帧缓冲区时（HpMonitor、回放评测），
+    各通道的视图也只建一次。
+    """
+
+    def __init__(self, width, threshold=FILL_THRESHOLD):
+        self.width = width
+        self.threshold = np.uint8(threshold)
+        self._lum = np.zeros(width, dtype=np.uint8)
+        self._mask = np.zeros(width, dtype=bool)
+        self._ignored = ()                      # ((起始, 结束), ...)，反向缓冲区中的下标，已合并、互不相邻
+        self._frame = None                      # 上次传入的帧及其反向的 B、G、R 通道视图
+        self._channels = ()
+
+    def set_ignored(self, spans):
+        """忽略覆盖层自己画上去的列。spans 为 ((左, 右), ...)，按血条宽度的比例 0‑1 给出；可在任意线程调用。"""
+        w = self.width
+        eps = 1e-6                              # (x / w) * w 可能略小于 x，换回列号时不应多算一列
+        cols = sorted((w - min(w, math.ceil(b * w - eps)), w - max(0, math.floor(a * w + eps))) for a, b in spans)
+        merged = []
+        for lo, hi in cols:
+            if lo >= hi:
+                continue
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        self._ignored = tuple((lo, hi) for lo, hi in merged)
+
+    def measure(self, frame) -> float:
+        if frame is not self._frame:
+            row = frame.reshape(self.width, -1)[::-1]
+            self._frame, self._channels = frame, (row[:, 0], row[:, 1], row[:, 2])
+        c0, c1, c2 = self._channels
+        lum, mask, w = self._lum, self._mask, self.width
+        np.maximum(c0, c1, out=lum)
+        np.maximum(lum, c2, out=lum)
+        np.greater(lum, self.threshold, out=mask)
+        for lo, hi in self._ignored:
+            # 被辅助线挡住的列：两侧都有血才算有血，血量边缘落在线下时读数取线的左缘
+            mask[lo:hi] = (lo == 0 or mask[lo - 1]) and (hi == w or mask[hi])
+        i = int(mask.argmax())
+        if not mask[i]:
+            return 0.0
+        return (w - i) * 100.0 / w
+
+
+class HpMonitor(QObject):
+    """后台按 rate_hz 采样血条；整数百分比变化时通过 changed 信号通知 GUI 线程。"""
+
+    changed = pyqtSignal(float)
+
+    def __init__(self, geometry, rate_hz=10.0, source=None, parent=None):
+        super().__init__(parent)
+        region = hp_row_region(geometry)
+        self.source = source or MssSource(region)
+        self.sampler = HealthBarSampler(region[2])
+        self.interval = 1.0 / max(0.1, float(rate_hz))
+
+        self._frame = np.zeros(self.source.shape, dtype=np.uint8)
+        self.hp_percent = None
+        self._last_bucket = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_rate(self, rate_hz: float):
+        self.interval = 1.0 / max(0.1, float(rate_hz))
+
+    def sample(self):
+        """采样一次（工作线程或同步调用均可）。来源耗尽时返回 None。"""
+        if not self.source.read(self._frame):
+            return None
+        hp = self.hp_percent = self.sampler.measure(self._frame)
+        bucket = int(hp)
+        if bucket != self._last_bucket:
+            self._last_bucket = bucket
+            self.changed.emit(hp)
+        return hp
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hp-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.source.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if self.sample() is None:
+                break
+            wait = self.interval - (time.monotonic() - started)
+            if wait > 0:
+                self._stop.wait(wait)
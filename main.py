@@ -1,20 +1,21 @@
 # main.py
-import sys, os
+import startup_timing
+
+import sys, os, json
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import QTimer
+startup_timing.mark("导入 PyQt5")
 
+from app_paths import resource_path
 from ui_panel import ControlPanel
-from draw_overlay import HealthZoneOverlay
-from config import RES_GEOMETRY
-
-
-def resource_path(rel_path: str) -> str:
-    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
-    return os.path.join(base_path, rel_path)
+from perf_stats import STATS
+startup_timing.mark("导入 ui_panel")
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    startup_timing.mark("创建 QApplication")
 
     # 兼容打包后的图标路径
     icon_path = resource_path("assets/app.ico")
@@ -24,14 +25,97 @@ if __name__ == "__main__":
     else:
         icon = QIcon()
 
-    panel = ControlPanel()
-    if not icon.isNull():
-        panel.setWindowIcon(icon)
-    panel.show()
+    overlay_only = "--overlay-only" in sys.argv
+    if overlay_only:
+        # 纯覆盖层模式：不创建控制面板（设置见 overlay_mode.py）
+        from overlay_mode import OverlayController, load_settings
+        try:
+            panel = OverlayController(load_settings(sys.argv[1:]))
+        except ValueError as e:
+            print(f"纯覆盖层模式设置无效：{e}", file=sys.stderr)
+            sys.exit(2)
+    else:
+        panel = ControlPanel()
+        if not icon.isNull():
+            panel.setWindowIcon(icon)
+
+    # 上次异常退出时对局仍在进行：显示面板前直接恢复计时（纯覆盖层模式在设置中指定了同步时除外）
+    if "--no-resume" not in sys.argv:
+        from session_store import SessionStore
+        panel.session = SessionStore()
+        session = panel.session.load() if getattr(panel, "initial_sync", None) is None else None
+        if session is not None and not panel.restore_session(session):
+            panel.session.clear()
+        startup_timing.mark("恢复会话")
+
+    if not overlay_only:
+        panel.show()
+        startup_timing.mark("面板显示")
+
+    def _after_first_frame():
+        """首帧之后：补齐面板选项、创建覆盖层、后台加载语音。"""
+        startup_timing.mark("首帧")
+        if overlay_only:
+            panel.start()
+        else:
+            from draw_overlay import HealthZoneOverlay
+
+            panel.finish_startup()
+            overlay = HealthZoneOverlay(panel.overlay_geometry(), controller=panel)
+            panel.linked_overlay = overlay
+        startup_timing.mark("覆盖层就绪")
+
+        if "--hp-sample" in sys.argv:
+            try:
+                panel.enable_hp_sampling()
+            except (ImportError, RuntimeError) as e:
+                print(f"血条采样不可用：{e}", file=sys.stderr)
+            else:
+                app.aboutToQuit.connect(panel.disable_hp_sampling)
+
+        if "--auto-sync" in sys.argv:
+            try:
+                panel.enable_auto_sync()
+            except (ImportError, RuntimeError) as e:
+                print(f"自动同步不可用：{e}", file=sys.stderr)
+
+        if "--no-history" not in sys.argv:
+            import sqlite3
+            from history import MatchHistory
+            try:
+                history = MatchHistory()
+                history.start()
+            except sqlite3.Error as e:
+                print(f"对局记录不可用：{e}", file=sys.stderr)
+            else:
+                panel.attach_history(history)
+                app.aboutToQuit.connect(history.stop)
+
+        if "--broadcast" in sys.argv:
+            try:
+                panel.enable_broadcast()
+            except OSError as e:
+                print(f"状态广播不可用：{e}", file=sys.stderr)
+
+        if "--control" in sys.argv:
+            try:
+                panel.enable_control()
+            except OSError as e:
+                print(f"控制接口不可用：{e}", file=sys.stderr)
+
+        if STATS.enabled and os.environ.get("OTZ_PERF_EXPORT"):
+            app.aboutToQuit.connect(lambda: STATS.export(os.environ["OTZ_PERF_EXPORT"]))
+
+        if startup_timing.enabled():
+            startup_timing.report()
+        # 基准测试（benchmark.py）：报告启动耗时并退出
+        if os.environ.get("OTZ_BENCH_STARTUP"):
+            shown = dict(startup_timing.marks())["面板显示"]
+            print(json.dumps({"panel_shown_s": shown, "marks": startup_timing.as_dict()},
+                             ensure_ascii=False), flush=True)
+            app.quit()
 
-    geo = RES_GEOMETRY[panel.resolution_text]
-    overlay = HealthZoneOverlay(geo, controller=panel)
-    panel.linked_overlay = overlay
+    QTimer.singleShot(0, _after_first_frame)
 
     panel.destroyed.connect(app.quit)
     sys.exit(app.exec_())
@@ -0,0 +1,361 @@
+# match_state.py
+"""对局状态与计时核心（控制面板与纯覆盖层模式共用）。
+
+ZoneTimer、HealthZoneOverlay、控制接口、自动同步都通过这里的属性与方法访问“面板”：
+圈等级、容错模式、同步状态、血量，以及 apply_sync / set_mode 等操作。
+ControlPanel 在此之上建控件，OverlayController（overlay_mode.py）不建任何控件；
+带控件的宿主通过 _show_option / _show_synced / _show_unsynced 把状态反映到界面上。
+"""
+import logging
+import math
+
+from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtGui import QGuiApplication
+
+from config import HP_SAMPLE_HZ
+from drift import DriftCorrector
+from geometry import ScreenGeometry, bar_geometry, screen_resolution
+from survival import SurvivalTable
+from thresholds import ThresholdStore
+from timeline import COUNTDOWN
+from voice import VoiceManager
+from zone_timer import ZoneTimer
+
+log = logging.getLogger(__name__)
+
+
+class MatchState:
+    """混入类，宿主须是 QObject（各组件以宿主为父对象），并提供 isVisible() / isMinimized()。"""
+
+    def _init_match_state(self):
+        # --- 状态 ---
+        self.is_synced = False
+        self.zone_level = 1
+        self.tolerance_mode = "正常"
+        self.resolution_text = "2560x1440 (2K)"
+        self.screen_name = ""       # 覆盖层所在屏幕，空为主屏
+        self.guides_enabled = True
+        self.countdown_hud = True   # 覆盖层内显示倒计时
+        self.hp_percent = None      # 血条采样得到的当前血量，未启用时为 None
+        self.hp_monitor = None
+        self.auto_sync = None       # AutoSync，启用 --auto-sync 时创建
+        self.broadcast = None       # BroadcastServer，启用 --broadcast 时创建
+        self.control = None         # ControlServer，启用 --control 时创建
+        self.history = None         # MatchHistory，由 main.py 在首帧之后创建
+        self.session = None         # SessionStore，由 main.py 在显示面板前设置
+
+        # --- 组件 ---
+        self.thresholds = ThresholdStore(parent=self)
+        self.screens = ScreenGeometry(self)
+        self.screens.changed.connect(self._place_overlay)
+        self.screens.changed.connect(self._refresh_capture)
+        self.voice = VoiceManager(self)
+        self.zone_timer = ZoneTimer(self)
+        self.voice.latency_changed.connect(self.zone_timer.rearm)
+        self.voice.cue_started.connect(self._record_cue)
+        self.drift = DriftCorrector(self.zone_timer)
+        self.survival = SurvivalTable(self.zone_timer.timeline, self.thresholds)
+
+        # 启动时自动检测分辨率
+        autodetected = self.auto_detect_resolution()
+        if autodetected:
+            self.resolution_text = autodetected
+
+    # -------- 界面钩子（无界面时什么都不做）--------
+    def _show_option(self, name: str, value):
+        """选项（"mode" / "modes" / "guides" / "screen"）在界面之外被修改。"""
+
+    def _show_synced(self):
+        pass
+
+    def _show_unsynced(self):
+        pass
+
+    def set_status_text(self, text: str):
+        """状态文字（计时器只在宿主可见时调用）。"""
+
+    def selected_stage(self) -> int:
+        """自动同步时采用的 0‑based 阶段索引。"""
+        return 0
+
+    # -------- 自动分辨率检测 --------
+    def auto_detect_resolution(self) -> str:
+        """主屏的物理分辨率：RES_GEOMETRY 中有则返回其键，否则返回 "WxH"（按公式计算血条）。"""
+        screen = QGuiApplication.primaryScreen()
+        if not screen:
+            return ""
+        return screen_resolution(screen)
+
+    # -------- 覆盖层位置 --------
+    def overlay_geometry(self):
+        """覆盖层的逻辑坐标矩形 (x, y, w, h)：所选屏幕 + 所选分辨率。
+
+        血条上方再留一条等高的区域放倒计时与可坚持时间读数，血条本身只画辅助线，
+        血条采样读的那一行不会被文字盖住（见 HealthZoneOverlay）。
+        """
+        r = self.screens.overlay_rect(self.screens.find(self.screen_name), self.resolution_text)
+        return r.x(), r.y() - r.height(), r.width(), r.height() * 2
+
+    def capture_geometry(self):
+        """同一血条在虚拟桌面中的物理像素矩形 (x, y, w, h)，血条采样与自动同步据此截屏。"""
+        return self.screens.capture_rect(self.screens.find(self.screen_name), self.resolution_text)
+
+    def _place_overlay(self):
+        """只移动/缩放现有覆盖层窗口，不重建控件。"""
+        if hasattr(self, "linked_overlay"):
+            geo = self.overlay_geometry()
+            g = self.linked_overlay.geometry()
+            if geo != (g.x(), g.y(), g.width(), g.height()):
+                self.linked_overlay.setGeometry(*geo)
+
+    def set_overlay_screen(self, name: str):
+        """把覆盖层移到指定屏幕（如游戏所在的显示器）。"""
+        self.screen_name = name
+        self._show_option("screen", name)
+        self._place_overlay()
+        self._refresh_capture()
+        if self.is_synced:
+            self.save_session()
+
+    def update_resolution(self, text: str):
+        self.resolution_text = text
+        self._place_overlay()
+        self._refresh_capture()
+
+    def _refresh_capture(self):
+        """屏幕或分辨率变化后，按新的截屏区域重建已启用的采集。"""
+        if self.hp_monitor is not None:
+            self.enable_hp_sampling(1.0 / self.hp_monitor.interval)
+        if self.auto_sync is not None:
+            try:
+                self.enable_auto_sync()
+            except RuntimeError as e:
+                log.warning("自动同步已停止：%s", e)
+
+    # -------- 屏幕采集 --------
+    def enable_hp_sampling(self, rate_hz: float = HP_SAMPLE_HZ):
+        """在后台按 rate_hz 采样所选屏幕上的血条。"""
+        from hp_sampler import HpMonitor
+
+        if self.hp_monitor is not None:
+            self.hp_monitor.stop()
+        self.hp_monitor = HpMonitor(self.capture_geometry(), rate_hz, parent=self)
+        self.hp_monitor.changed.connect(self.set_hp)
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.set_capture_excluded(True)
+        self.hp_monitor.start()
+
+    def disable_hp_sampling(self):
+        """停止血条采样；覆盖层重新出现在截屏与录屏中。"""
+        if self.hp_monitor is None:
+            return
+        self.hp_monitor.stop()
+        self.hp_monitor = None
+        self.hp_percent = None
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.set_capture_excluded(False)
+            self.linked_overlay.refresh()
+
+    def enable_auto_sync(self):
+        """在后台识别所选屏幕上的缩圈倒计时并自动同步；区域或模板未校准时抛出 RuntimeError。"""
+        from auto_sync import AutoSync
+
+        old, self.auto_sync = self.auto_sync, None
+        if old is not None:
+            old.stop()
+            old.deleteLater()
+        self.auto_sync = AutoSync(self)
+        self.auto_sync.start()
+
+    def set_hp(self, hp_percent):
+        self.hp_percent = hp_percent
+        if self.history is not None and self.is_synced:
+            st = self.zone_timer.state()
+            lines = self.thresholds.lookup(self.zone_level, self.tolerance_mode)
+            if st is not None and lines is not None:
+                self.history.record("hp", st.stage_idx, st.phase, hp_percent, lines[0])
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
+
+    # -------- 选项 --------
+    def set_mode(self, name: str):
+        """切换容错模式（不弹提示框，供控制接口等调用）。"""
+        self.tolerance_mode = name
+        if self.history is not None:
+            self.history.record("mode", text=name)
+        self._show_option("mode", name)
+        if self.broadcast is not None:
+            self.broadcast.publish({"mode": name})
+        if self.is_synced:
+            self._prepare_survival()
+            self.save_session()
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
+
+    def on_thresholds_changed(self):
+        """容错方案文件被修改：更新模式列表，只重绘变化的辅助线。"""
+        modes = self.thresholds.modes
+        if self.tolerance_mode not in modes:
+            self.tolerance_mode = modes[0]
+            if self.broadcast is not None:
+                self.broadcast.publish({"mode": self.tolerance_mode})
+        self._show_option("modes", modes)
+        if self.is_synced:
+            self._prepare_survival()
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
+
+    def set_guides(self, enabled: bool):
+        """开关辅助线。"""
+        self.guides_enabled = bool(enabled)
+        self._show_option("guides", self.guides_enabled)
+        if self.is_synced:
+            self.save_session()
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
+
+    def set_countdown_hud(self, enabled: bool):
+        self.countdown_hud = bool(enabled)
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
+        # 最小化时是否需要按秒唤醒取决于 HUD 是否显示
+        self.zone_timer.wake()
+
+    # -------- 会话恢复 --------
+    def save_session(self):
+        """写入会话文件；未同步或整局已结束时删除。写入失败只影响崩溃恢复，不打断计时。"""
+        if self.session is None:
+            return
+        timer = self.zone_timer
+        try:
+            if self.is_synced and timer.state() is not None:
+                self.session.save(timer.timeline.anchor, timer.cues.fired, mode=self.tolerance_mode,
+                                  guides=self.guides_enabled, resolution=self.resolution_text,
+                                  screen=self.screen_name)
+            else:
+                self.session.clear()
+        except OSError as e:
+            log.warning("会话保存失败：%s", e)
+
+    def restore_session(self, data) -> bool:
+        """按 SessionStore.load() 的结果恢复到同步后的状态；整局已结束时返回 False。"""
+        timer = self.zone_timer
+        if not 0 <= timer._clock() - data["anchor"] < timer.timeline.duration:
+            return False
+        if data.get("mode") in self.thresholds.modes:
+            self.tolerance_mode = data["mode"]
+        try:
+            bar_geometry(data.get("resolution") or "")
+        except ValueError:
+            pass
+        else:
+            self.resolution_text = data["resolution"]
+        self.screen_name = data.get("screen") or ""
+        self.guides_enabled = bool(data.get("guides", True))
+
+        # resume() 会立即跑一次 _tick，其中的 save_session() 要看到已同步，否则会把会话文件删掉
+        self.is_synced = True
+        timer.resume(data["anchor"], data.get("fired", ()))
+        self._show_synced()
+        self._prepare_survival()
+        self.save_session()
+        self._record_resume()
+        return True
+
+    def attach_history(self, history):
+        """接上对局记录器；会话已在此之前恢复时补记一次同步，使之后的事件归入同一局。"""
+        self.history = history
+        if self.is_synced:
+            self._record_resume()
+
+    def _record_resume(self):
+        st = self.zone_timer.state()
+        if self.history is not None and st is not None:
+            # extra=1 标记为崩溃恢复；value 为恢复时当前相位的剩余秒数
+            self.history.record("sync", st.stage_idx, st.phase, round(st.remaining, 2), 1.0,
+                                text=self.tolerance_mode)
+
+    def _record_cue(self, filename, late_ms):
+        if self.history is not None:
+            self.history.record("cue", value=round(late_ms, 2), text=filename)
+
+    # -------- 广播与控制接口 --------
+    def enable_broadcast(self, port=None):
+        """在本机启动状态广播服务器；端口被占用时抛出 OSError。"""
+        from broadcast import BroadcastServer
+
+        server = BroadcastServer(port=port)
+        server.start()
+        self.broadcast = server
+        QCoreApplication.instance().aboutToQuit.connect(server.stop)
+        self.publish_state()
+        return server
+
+    def enable_control(self, port=None):
+        """在本机启动指令接口（见 control_api.py）；端口被占用时抛出 OSError。"""
+        from control_api import ControlServer
+
+        server = ControlServer(self, port=port)
+        server.start()
+        self.control = server
+        QCoreApplication.instance().aboutToQuit.connect(server.stop)
+        return server
+
+    def publish_state(self, st=None):
+        """发布完整计时状态；st 为 ZoneTimer 刚算出的 TimelineState，省略时现算。"""
+        timer = self.zone_timer
+        synced = timer.timeline.is_synced
+        if st is None and synced:
+            st = timer.state()
+        state = {"synced": synced and st is not None, "mode": self.tolerance_mode}
+        if state["synced"]:
+            state.update(
+                stage=st.stage_idx + 1,
+                phase=st.phase,
+                remaining=max(0, math.ceil(st.remaining)),
+                ends_at=round(self.broadcast.wall_offset + timer.timeline.time_at(timer.timeline.ends[st.index]), 2),
+                zone_level=st.zone_level,
+            )
+        else:
+            state.update(stage=None, phase=None, remaining=None, ends_at=None, zone_level=self.zone_level)
+        self.broadcast.publish(state)
+
+    # -------- 同步 --------
+    def apply_sync(self, stage_idx: int, countdown_seconds: float):
+        """按给定阶段与倒计时开始计时（输入框、自动识别、控制接口等入口共用）。"""
+        # 开始前先清理任何遗留的语音排程，避免串音
+        self.voice.reset()
+        self.drift.reset()
+        if self.history is not None:
+            self.history.record("sync", stage_idx, COUNTDOWN, countdown_seconds, text=self.tolerance_mode)
+        self.zone_timer.start(stage_idx, countdown_seconds)
+        self._show_synced()
+
+        self.is_synced = True
+        self._prepare_survival()
+        self.save_session()
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
+
+    def _prepare_survival(self):
+        """预先编译当前容错模式下的可坚持时间表（含当前相位）。"""
+        st = self.zone_timer.state()
+        self.survival.prepare(self.tolerance_mode, st.index if st is not None else None)
+
+    def resync(self):
+        # 立刻停止计时与所有语音内部倒计时
+        self.zone_timer.reset()
+        self.drift.reset()
+        self.voice.reset()
+        if self.history is not None:
+            self.history.record("resync")
+
+        self._show_unsynced()
+        self.set_status_text("当前阶段：未同步")
+
+        self.is_synced = False
+        self.save_session()
+        if self.broadcast is not None:
+            self.publish_state()
+        if hasattr(self, "linked_overlay"):
+            self.linked_overlay.refresh()
@@ -0,0 +1,194 @@
+# overlay_mode.py
+"""纯覆盖层模式：不创建控制面板，只运行计时核心、语音与覆盖层。
+
+    python main.py --overlay-only --stage 4 --countdown 1:30
+    python main.py --overlay-only --settings overlay.json --control
+
+对局中面板多半一直最小化，这个模式省掉整棵控件树与样式表，计时器也始终按“面板已最小化”排程。
+设置来自命令行或 JSON 设置文件（默认读取 <配置目录>/overlay.json，存在时），命令行优先：
+    stage / countdown   阶段 1‑9 与距缩圈开始的秒数（或 "M:SS"）；给出时启动即同步，不再恢复上次会话
+    mode                容错模式
+    resolution          分辨率键或 "WxH"
+    screen              覆盖层所在显示器名称
+    guides              是否显示辅助线（--no-guides）
+    countdown_hud       覆盖层内是否显示倒计时（--no-hud）
+    voice / volume      是否播报语音（--mute）、音量 0‑100
+    exit_on_end         整局结束后自动退出，默认 true（--keep-open）
+未给出阶段时可配合 --auto-sync（屏幕识别）或 --control（指令接口）同步；Ctrl+C 退出。
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+
+from PyQt5.QtCore import QCoreApplication, QObject, QSocketNotifier, QTimer
+
+from app_paths import user_dir
+from config import ZONE_TIMINGS
+from geometry import bar_geometry
+from match_state import MatchState
+
+SETTINGS_FILE = "overlay.json"
+EXIT_DELAY = 5.0        # 整局结束后多久退出（秒），留出最后一条语音的播放时间
+
+DEFAULTS = {
+    "stage": None, "countdown": None, "mode": None, "resolution": None, "screen": None,
+    "guides": True, "countdown_hud": True, "voice": True, "volume": 100, "exit_on_end": True,
+}
+
+# 各设置项允许的 JSON 类型（None 表示可省略）；bool 是 int 的子类，数值项单独排除
+TYPES = {
+    "stage": (int, type(None)), "countdown": (int, float, str, type(None)),
+    "mode": (str, type(None)), "resolution": (str, type(None)), "screen": (str, type(None)),
+    "guides": (bool,), "countdown_hud": (bool,), "voice": (bool,), "volume": (int, float),
+    "exit_on_end": (bool,),
+}
+NUMERIC = ("stage", "countdown", "volume")
+
+
+def default_settings_path() -> str:
+    return os.path.join(user_dir("config"), SETTINGS_FILE)
+
+
+def parse_countdown(value) -> float:
+    """秒数或 "M:SS" → 秒数；格式不对时抛出 ValueError。"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if ":" in text:
+        m, s = text.split(":", 1)
+        return int(m) * 60 + float(s)
+    return float(text)
+
+
+def load_settings(argv):
+    """命令行 + 设置文件 → 设置字典；不合法时抛出 ValueError。其余参数（--control 等）忽略。"""
+    ap = argparse.ArgumentParser(prog="main.py --overlay-only", add_help=False)
+    ap.add_argument("--settings")
+    ap.add_argument("--stage", type=int)
+    ap.add_argument("--countdown")
+    ap.add_argument("--mode")
+    ap.add_argument("--resolution")
+    ap.add_argument("--screen")
+    ap.add_argument("--volume", type=int)
+    ap.add_argument("--no-guides", dest="guides", action="store_false", default=None)
+    ap.add_argument("--no-hud", dest="countdown_hud", action="store_false", default=None)
+    ap.add_argument("--mute", dest="voice", action="store_false", default=None)
+    ap.add_argument("--keep-open", dest="exit_on_end", action="store_false", default=None)
+    args, _ = ap.parse_known_args(argv)
+
+    path = args.settings or default_settings_path()
+    from_file = {}
+    if args.settings or os.path.isfile(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                from_file = json.load(f)
+        except OSError as e:
+            raise ValueError(f"无法读取设置文件 {path}：{e}") from None
+        except json.JSONDecodeError as e:
+            raise ValueError(f"设置文件 {path} 不是合法的 JSON：{e}") from None
+        if not isinstance(from_file, dict):
+            raise ValueError(f"设置文件 {path} 应为 JSON 对象")
+        unknown = sorted(set(from_file) - set(DEFAULTS))
+        if unknown:
+            raise ValueError(f"设置文件 {path} 中有未知设置项：{'、'.join(unknown)}")
+
+    cli = {k: v for k, v in vars(args).items() if k != "settings" and v is not None}
+    settings = {**DEFAULTS, **from_file, **cli}
+    for key, value in settings.items():
+        if not isinstance(value, TYPES[key]) or (key in NUMERIC and isinstance(value, bool)):
+            raise ValueError(f"设置项 {key} 的类型不对：{value!r}")
+
+    stage, countdown = settings["stage"], settings["countdown"]
+    if (stage is None) != (countdown is None):
+        raise ValueError("stage 与 countdown 需同时给出")
+    if stage is not None:
+        if not 1 <= stage <= len(ZONE_TIMINGS):
+            raise ValueError(f"阶段必须在 1‑{len(ZONE_TIMINGS)} 之间")
+        try:
+            settings["countdown"] = countdown = parse_countdown(countdown)
+        except ValueError:
+            raise ValueError(f"无法识别的倒计时：{countdown!r}") from None
+        max_wait = ZONE_TIMINGS[stage - 1][1]
+        if not 0 <= countdown <= max_wait:
+            raise ValueError(f"阶段 {stage} 的倒计时必须在 0‑{max_wait} 秒之间")
+    if settings["resolution"] is not None:
+        bar_geometry(settings["resolution"])
+    if not 0 <= settings["volume"] <= 100:
+        raise ValueError("音量必须在 0‑100 之间")
+    return settings
+
+
+class OverlayController(QObject, MatchState):
+    """无界面的宿主：ZoneTimer、覆盖层、控制接口等照常通过它读写对局状态。"""
+
+    def __init__(self, settings):
+        super().__init__()
+        self.settings = settings
+        self.status_text = ""
+        self._init_match_state()
+
+        mode = settings["mode"]
+        if mode is not None:
+            if mode not in self.thresholds.modes:
+                raise ValueError(f"未知容错模式：{mode}（可选：{'、'.join(self.thresholds.modes)}）")
+            self.tolerance_mode = mode
+        if settings["resolution"]:
+            self.resolution_text = settings["resolution"]
+        if settings["screen"]:
+            self.screen_name = settings["screen"]
+        self.guides_enabled = bool(settings["guides"])
+        self.countdown_hud = bool(settings["countdown_hud"])
+        self.voice.set_enabled(bool(settings["voice"]))
+        self.voice.set_volume(settings["volume"] / 100.0)
+        if settings["exit_on_end"]:
+            self.zone_timer.finished.connect(
+                lambda: QTimer.singleShot(int(EXIT_DELAY * 1000), QCoreApplication.quit))
+
+    @property
+    def initial_sync(self):
+        """设置中给出的 (0‑based 阶段, 倒计时秒数)；没有时为 None。"""
+        if self.settings["stage"] is None:
+            return None
+        return self.settings["stage"] - 1, self.settings["countdown"]
+
+    # -------- ZoneTimer 查询的窗口状态：始终视为已最小化 --------
+    def isVisible(self):
+        return False
+
+    def isMinimized(self):
+        return True
+
+    def set_status_text(self, text: str):
+        self.status_text = text
+
+    def selected_stage(self) -> int:
+        return self.settings["stage"] - 1 if self.settings["stage"] else 0
+
+    # -------- 启动 --------
+    def start(self):
+        """首帧之后：创建覆盖层、监视容错方案文件、后台加载语音，并按设置同步。"""
+        from draw_overlay import HealthZoneOverlay
+
+        self.linked_overlay = HealthZoneOverlay(self.overlay_geometry(), controller=self)
+        self.thresholds.changed.connect(self.on_thresholds_changed)
+        self.thresholds.watch()
+        self.voice.preload()
+        if self.initial_sync is not None:
+            self.apply_sync(*self.initial_sync)
+
+        self._quit_on_sigint()
+
+    def _quit_on_sigint(self):
+        """没有窗口可关：Ctrl+C 退出。
+
+        Qt 事件循环阻塞时 Python 的信号处理函数得不到执行；用 set_wakeup_fd 让信号往套接字里写一个字节，
+        事件循环被唤醒后处理函数随即运行，不需要定时轮询。
+        """
+        self._sig_r, self._sig_w = socket.socketpair()
+        self._sig_w.setblocking(False)
+        signal.set_wakeup_fd(self._sig_w.fileno())
+        signal.signal(signal.SIGINT, lambda *_: QCoreApplication.quit())
+        self._sig_notifier = QSocketNotifier(self._sig_r.fileno(), QSocketNotifier.Read, self)
+        self._sig_notifier.activated.connect(lambda: self._sig_r.recv(64))
@@ -0,0 +1,147 @@
+# perf_stats.py
+"""热路径计时统计（默认关闭）。
+
+    OTZ_PERF=1 或 --perf              开启统计，覆盖层左上角显示调试 HUD
+    OTZ_PERF_EXPORT=stats.json|.csv   退出时导出全部样本
+
+记录三类数据，均为毫秒，存放在定长环形缓冲区中：
+  tick   计时器实际唤醒时刻 - 计划唤醒时刻
+  paint  覆盖层 paintEvent 耗时
+  cue    语音计划触发时刻 → 实际开始播放的间隔
+关闭时各处只多一次属性判断。
+
+模块末尾的 percentile / median_of_runs / load_baseline / compare 是 benchmark.py、replay.py 与识别样例评测共用的
+统计与基线比较工具。
+"""
+import csv
+import json
+import os
+import statistics
+import sys
+from array import array
+
+RING_SIZE = 1024
+
+
+class RingBuffer:
+    """定长环形缓冲区，写满后覆盖最旧的样本。"""
+
+    def __init__(self, size=RING_SIZE):
+        self._buf = array("d", bytes(8 * size))
+        self._size = size
+        self._pos = 0
+        self.count = 0
+
+    def append(self, value: float):
+        self._buf[self._pos] = value
+        self._pos = (self._pos + 1) % self._size
+        if self.count < self._size:
+            self.count += 1
+
+    def values(self):
+        """按时间先后返回全部样本。"""
+        if self.count < self._size:
+            return self._buf[:self.count].tolist()
+        return (self._buf[self._pos:] + self._buf[:self._pos]).tolist()
+
+    def clear(self):
+        self._pos = self.count = 0
+
+    def summary(self):
+        xs = sorted(self.values())
+        if not xs:
+            return {"n": 0}
+        return {"n": len(xs), "p50": round(percentile(xs, 50), 3), "p99": round(percentile(xs, 99), 3),
+                "max": round(xs[-1], 3)}
+
+
+class PerfStats:
+    METRICS = ("tick", "paint", "cue")
+
+    def __init__(self, size=RING_SIZE):
+        self.enabled = False
+        self.tick = RingBuffer(size)
+        self.paint = RingBuffer(size)
+        self.cue = RingBuffer(size)
+
+    def summary(self):
+        return {name: getattr(self, name).summary() for name in self.METRICS}
+
+    def hud_text(self) -> str:
+        parts = []
+        for name in self.METRICS:
+            s = getattr(self, name).summary()
+            parts.append(f"{name} p50 {s['p50']:.1f} p99 {s['p99']:.1f}" if s["n"] else f"{name} -")
+        return " | ".join(parts) + " ms"
+
+    def export(self, path: str):
+        """按扩展名导出为 CSV（metric,index,ms）或 JSON（摘要 + 样本）。"""
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(("metric", "index", "ms"))
+                for name in self.METRICS:
+                    for i, v in enumerate(getattr(self, name).values()):
+                        w.writerow((name, i, round(v, 4)))
+        else:
+            data = {
+                "summary": self.summary(),
+                "samples": {name: getattr(self, name).values() for name in self.METRICS},
+            }
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+
+
+STATS = PerfStats()
+STATS.enabled = bool(os.environ.get("OTZ_PERF")) or "--perf" in sys.argv
+
+
+# ---- 统计与基线比较 ----
+def percentile(xs, p):
+    """已排序样本的第 p 百分位（最近秩，不插值）。"""
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+def median_of_runs(runs):
+    """多次运行的结果（结构相同的嵌套 dict）→ 各数值项取中位数；其余项取第一次的值。"""
+    first = runs[0]
+    if isinstance(first, dict):
+        return {k: median_of_runs([r[k] for r in runs if isinstance(r, dict) and k in r]) for k in first}
+    if isinstance(first, (int, float)) and not isinstance(first, bool):
+        m = statistics.median(runs)
+        return round(m, 4) if isinstance(m, float) else m
+    return first
+
+
+def load_baseline(paths):
+    """读取一个或多个结果 JSON 的 results 部分；多个时逐项取中位数。"""
+    runs = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            runs.append(json.load(f)["results"])
+    return median_of_runs(runs)
+
+
+def compare(new, old, tolerance, metrics, floors, drops=None, path=""):
+    """逐项比较两份结果（可嵌套的 dict），返回退化项 [(路径, 旧值, 新值)]。
+
+    metrics 中的指标越大越差：增量须同时超过 旧值×tolerance 与绝对下限才算退化，
+    两次运行之间的计时抖动不会误报。下限先按指标名、再按单位后缀查 floors（如 p99_us → "p99_us" / "us"）。
+    drops 为 {越大越好的指标: 允许的绝对下降}。
+    """
+    drops = drops or {}
+    regressions = []
+    for k, v in new.items():
+        p = f"{path}.{k}" if path else k
+        if isinstance(v, dict) and isinstance(old.get(k), dict):
+            regressions += compare(v, old[k], tolerance, metrics, floors, drops, p)
+        elif not isinstance(old.get(k), (int, float)) or not isinstance(v, (int, float)):
+            continue
+        elif k in drops:
+            if v < old[k] - drops[k]:
+                regressions.append((p, old[k], v))
+        elif k in metrics and old[k] > 0:
+            floor = floors.get(k, floors.get(k.rsplit("_", 1)[-1], 0.0))
+            if v - old[k] > max(old[k] * tolerance, floor):
+                regressions.append((p, old[k], v))
+    return regressions
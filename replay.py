@@ -0,0 +1,292 @@
+# replay.py
+"""录制帧回放评测：不开游戏，重复测量屏幕识别的准确率与开销。
+
+    python replay.py make-corpus DIR                     # 生成倒计时与血条两类样例
+    python replay.py run DIR --out replay.json
+    python replay.py run DIR --baseline replay.json      # 与上次结果比较，退化时返回 1
+    python replay.py run DIR --baseline a.json b.json c.json   # 与多次结果的中位数比较
+
+样例目录下任意一层只要含 labels.json 即为一段帧流：
+    labels.json   {"resolution": "1920x1080", "extractor": "countdown", "labels": [...]}
+    frames.npy    (N, H, W, C)，以内存映射方式打开，读到哪一帧才读盘
+    frames.npz    压缩帧流，按键名顺序存放若干 (n, H, W, C) 分块，逐块解压
+extractor 省略时为 countdown，与 digit_recognizer.make_corpus 的目录格式兼容。
+
+每帧先拷进预分配缓冲区，只对提取器本身计时；计时重复 --runs 遍，每帧取各遍中最短的耗时
+（调度抢占只会让耗时变长），p50/p99 在这些逐帧最短耗时上统计。
+内存用 tracemalloc 单独跑一遍，记录每帧新分配的峰值字节数（计时时不开 tracemalloc，避免互相干扰）。
+与基线比较时，增量须同时超过相对容差与 NOISE_FLOOR 才算退化。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import RES_GEOMETRY
+from digit_recognizer import DigitRecognizer, make_corpus as make_countdown_corpus, res_slug
+from geometry import bar_geometry
+from hp_sampler import FILL_THRESHOLD, HealthBarSampler
+from perf_stats import compare, load_baseline, percentile
+
+LABELS_FILE = "labels.json"
+HP_TOLERANCE = 1.0      # 血量读数与标注相差不超过此百分点视为正确
+ACCURACY_DROP = 0.005   # 与基线比较时允许的准确率下降
+RUNS = 5                # 计时遍数
+PER_RES = 200           # make-corpus 每种分辨率的帧数
+
+# 越大越差的指标，用于和基线比较
+COMPARED = ("p50_ms", "p99_ms", "alloc_bytes", "peak_bytes")
+# 各单位的绝对噪声下限：同一棵树在不同进程里跑，亚毫秒级提取器的 p50 实测可差 0.2 ms；
+# 识别每秒至多几次，低于 0.25 ms 的变化对实际使用没有影响
+NOISE_FLOOR = {"ms": 0.25, "bytes": 1024}
+
+
+# ---------------- 提取器 ----------------
+class CountdownExtractor:
+    """倒计时裁剪图 → 总秒数。"""
+
+    def __init__(self, res_key):
+        self.recognizer = DigitRecognizer(res_key)
+
+    def __call__(self, frame):
+        r = self.recognizer.read(frame)
+        return None if r is None else r.seconds
+
+    @staticmethod
+    def correct(value, label) -> bool:
+        return value == label
+
+
+class HpExtractor:
+    """血条中间一行像素 → 血量百分比。"""
+
+    def __init__(self, res_key):
+        self.sampler = HealthBarSampler(bar_geometry(res_key)[2])
+
+    def __call__(self, frame):
+        return self.sampler.measure(frame)
+
+    @staticmethod
+    def correct(value, label) -> bool:
+        return abs(value - label) <= HP_TOLERANCE
+
+
+EXTRACTORS = {
+    "countdown": CountdownExtractor,
+    "hp": HpExtractor,
+}
+
+
+# ---------------- 帧流 ----------------
+class FrameStream:
+    """一段带标注的录制帧。"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, LABELS_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.resolution = meta["resolution"]
+        self.extractor = meta.get("extractor", "countdown")
+        self.labels = meta["labels"]
+
+        npy, npz = os.path.join(path, "frames.npy"), os.path.join(path, "frames.npz")
+        if os.path.isfile(npy):
+            self._npy = np.load(npy, mmap_mode="r")
+            self._npz = None
+            self.shape = tuple(self._npy.shape[1:])
+        elif os.path.isfile(npz):
+            self._npy = None
+            self._npz = npz
+            with np.load(npz) as data:
+                self.shape = tuple(data[sorted(data.files)[0]].shape[1:])
+        else:
+            raise ValueError(f"没有帧文件：{path}")
+
+    def __iter__(self):
+        """逐帧产出 (帧, 标注)；帧可能是只读的内存映射视图。"""
+        if self._npy is not None:
+            yield from zip(self._npy, self.labels)
+            return
+        labels = iter(self.labels)
+        with np.load(self._npz) as data:
+            for key in sorted(data.files):
+                for frame in data[key]:     # 每次只解压一个分块
+                    label = next(labels, None)
+                    if label is None:
+                        return
+                    yield frame, label
+
+
+def find_streams(src):
+    """src 下所有含 labels.json 的目录，按路径排序。"""
+    found = []
+    for root, dirs, files in os.walk(src):
+        dirs.sort()
+        if LABELS_FILE in files:
+            found.append(FrameStream(root))
+    return found
+
+
+# ---------------- 评测 ----------------
+def _time_stream(stream, extractor, buf):
+    """计时一遍：返回 (正确帧数, 按帧顺序的单帧耗时)。"""
+    ok, times = 0, []
+    for frame, label in stream:
+        np.copyto(buf, frame)
+        t = time.perf_counter()
+        value = extractor(buf)
+        times.append(time.perf_counter() - t)
+        ok += value is not None and extractor.correct(value, label)
+    return ok, times
+
+
+class _Job:
+    """一段帧流的评测状态：计时遍之间保留逐帧最短耗时。"""
+
+    def __init__(self, stream, extractor):
+        self.stream = stream
+        self.extractor = extractor
+        self.buf = np.empty(stream.shape, dtype=np.uint8)
+        self.ok = 0
+        self.best = None
+
+    def time_once(self):
+        self.ok, times = _time_stream(self.stream, self.extractor, self.buf)
+        self.best = times if self.best is None else list(map(min, self.best, times))
+
+    def result(self, runs):
+        """计时结果 + tracemalloc 一遍的内存指标。"""
+        stream, extractor, buf = self.stream, self.extractor, self.buf
+        allocs = []
+        tracemalloc.start()
+        try:
+            for frame, _ in stream:
+                np.copyto(buf, frame)
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                extractor(buf)
+                allocs.append(tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+
+        n = len(allocs)
+        best = sorted(self.best or ())
+        return {
+            "n": n,
+            "runs": runs,
+            "accuracy": round(self.ok / n, 4) if n else 0.0,
+            "p50_ms": round(percentile(best, 50) * 1000, 4) if n else 0.0,
+            "p99_ms": round(percentile(best, 99) * 1000, 4) if n else 0.0,
+            "alloc_bytes": round(sum(allocs) / n) if n else 0,
+            "peak_bytes": max(allocs, default=0),
+        }
+
+
+def run(src, only=None, runs=RUNS):
+    """results[提取器][分辨率] = 指标；RES_GEOMETRY 中没有样例的分辨率列在 missing 里。
+
+    各遍在所有帧流之间交错进行，一段短暂的整机变慢只会落在每段帧流的某一遍里，被逐帧取最短耗时滤掉。
+    """
+    jobs = []
+    for stream in find_streams(src):
+        name = stream.extractor
+        if name not in EXTRACTORS or (only and name not in only):
+            continue
+        if stream.resolution not in RES_GEOMETRY:
+            print(f"跳过未知分辨率：{stream.path} ({stream.resolution})", file=sys.stderr)
+            continue
+        jobs.append((name, _Job(stream, EXTRACTORS[name](stream.resolution))))
+
+    runs = max(1, runs)
+    for _ in range(runs):
+        for _, job in jobs:
+            job.time_once()
+
+    results = {}
+    for name, job in jobs:
+        results.setdefault(name, {})[job.stream.resolution] = job.result(runs)
+    for name, per_res in results.items():
+        missing = [k for k in RES_GEOMETRY if k not in per_res]
+        if missing:
+            per_res["missing"] = missing
+    return results
+
+
+# ---------------- 样例集 ----------------
+def render_hp_row(res_key, hp, rng, noise=12):
+    """合成一行血条像素 (1, W, 4)（BGRA，与 mss 截图一致）。"""
+    w = bar_geometry(res_key)[2]
+    filled = int(round(w * hp / 100.0))
+    row = rng.integers(20, 80, size=(w, 3), dtype=np.int16)
+    row[:filled] = (40, 40, rng.integers(FILL_THRESHOLD + 40, 255))
+    row += rng.integers(-noise, noise + 1, size=row.shape, dtype=np.int16)
+    out = np.full((1, w, 4), 255, dtype=np.uint8)
+    out[0, :, :3] = np.clip(row, 0, 255)
+    return out
+
+
+def make_corpus(dest, per_res=PER_RES, chunk=16, seed=0):
+    """dest/countdown/<分辨率>/frames.npy 与 dest/hp/<分辨率>/frames.npz（压缩、按 chunk 帧分块）。"""
+    make_countdown_corpus(os.path.join(dest, "countdown"), per_res, seed)
+    rng = np.random.default_rng(seed)
+    for res_key in RES_GEOMETRY:
+        labels = [round(float(v), 1) for v in rng.uniform(0, 100, size=per_res)]
+        frames = np.stack([render_hp_row(res_key, v, rng) for v in labels])
+        out = os.path.join(dest, "hp", res_slug(res_key))
+        os.makedirs(out, exist_ok=True)
+        chunks = {f"c{i:05d}": frames[i:i + chunk] for i in range(0, len(frames), chunk)}
+        np.savez_compressed(os.path.join(out, "frames.npz"), **chunks)
+        with open(os.path.join(out, LABELS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"resolution": res_key, "extractor": "hp", "labels": labels}, f, ensure_ascii=False)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="录制帧回放评测")
+    ap.add_argument("command", choices=("make-corpus", "run"))
+    ap.add_argument("dir")
+    ap.add_argument("--per-res", type=int, default=PER_RES, help="make-corpus：每种分辨率的帧数")
+    ap.add_argument("--only", nargs="*", choices=tuple(EXTRACTORS))
+    ap.add_argument("--out", help="结果 JSON 路径（默认输出到 stdout）")
+    ap.add_argument("--baseline", nargs="+", help="与该 JSON（多个时取中位数）比较，退化超过容差时返回 1")
+    ap.add_argument("--runs", type=int, default=RUNS, help="run：计时遍数，每帧取各遍中最短的耗时")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="耗时与内存允许的相对退化")
+    args = ap.parse_args(argv)
+
+    if args.command == "make-corpus":
+        make_corpus(args.dir, args.per_res)
+        return 0
+
+    results = run(args.dir, args.only, args.runs)
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "corpus": os.path.abspath(args.dir),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        old = load_baseline(args.baseline)
+        regressions = compare(results, old, args.tolerance, COMPARED, NOISE_FLOOR, {"accuracy": ACCURACY_DROP})
+        for p, a, b in regressions:
+            print(f"退化：{p} {a} → {b}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
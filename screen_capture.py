@@ -0,0 +1,193 @@
+# screen_capture.py
+"""屏幕小区域采集（可选功能，依赖 numpy；实时采集另需 mss）。
+
+只截取画面中很小的一块（如缩圈倒计时），在工作线程里运行：
+  - 帧缓冲预先分配，循环复用；
+  - 与上一帧逐像素比较，没有变化的帧直接跳过；
+  - 采集间隔由 interval_fn 决定，可按时间轴在相位边界附近加密、其余时间放稀。
+帧来源可替换为 DirectorySource，从磁盘上录好的帧回放，无需运行游戏。
+"""
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    import mss
+except ImportError:     # 仅回放录制帧时不需要
+    mss = None
+
+from config import COUNTDOWN_ROI
+
+DENSE_INTERVAL = 0.25   # 相位边界附近的采集间隔（秒）
+SPARSE_INTERVAL = 2.0   # 其余时间
+IDLE_INTERVAL = 1.0     # 尚未同步时
+BOUNDARY_WINDOW = 3.0   # 距相位边界多少秒内算“附近”
+
+
+def countdown_roi(geometry):
+    """由 RES_GEOMETRY 的血条矩形换算缩圈倒计时所在区域 (x, y, w, h)。"""
+    bx, by, bw, bh = geometry
+    fx, fy, fw, fh = COUNTDOWN_ROI
+    return (
+        int(round(bx + fx * bw)), int(round(by + fy * bh)),
+        max(1, int(round(fw * bw))), max(1, int(round(fh * bh))),
+    )
+
+
+def schedule_interval(timeline, now, dense=DENSE_INTERVAL, sparse=SPARSE_INTERVAL,
+                      idle=IDLE_INTERVAL, window=BOUNDARY_WINDOW):
+    """按 MatchTimeline 给出下一次采集前的等待秒数：相位边界前后 window 秒内加密。"""
+    if timeline is None or not timeline.is_synced:
+        return idle
+    st = timeline.state_at(now)
+    if st is None:
+        return sparse
+    into = timeline.ends[st.index] - timeline.starts[st.index] - st.remaining
+    if st.remaining <= window or into <= window:
+        return dense
+    # 稀疏采集时也不要越过下一段加密窗口
+    return max(dense, min(sparse, st.remaining - window))
+
+
+# ---------------- 帧来源 ----------------
+class MssSource:
+    """实时截屏（BGRA）。mss 对象与线程绑定，因此在首次 read() 时才创建。"""
+
+    def __init__(self, region):
+        if mss is None:
+            raise RuntimeError("实时采集需要安装 mss")
+        x, y, w, h = region
+        self.shape = (h, w, 4)
+        self._monitor = {"left": x, "top": y, "width": w, "height": h}
+        self._sct = None
+
+    def read(self, out) -> bool:
+        if self._sct is None:
+            self._sct = mss.mss()
+        shot = self._sct.grab(self._monitor)
+        np.copyto(out, np.frombuffer(shot.raw, dtype=np.uint8).reshape(self.shape))
+        return True
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+class DirectorySource:
+    """从磁盘回放录制的帧：单个 (N, H, W, C) 的 .npy，或目录下按文件名排序的多个 .npy。
+
+    .npy 以内存映射方式打开，只在读到某一帧时才真正读盘。
+    """
+
+    def __init__(self, path, loop=False):
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, "*.npy")))
+            self._frames = [np.load(f, mmap_mode="r") for f in files]
+        else:
+            self._frames = np.load(path, mmap_mode="r")
+        if not len(self._frames):
+            raise ValueError(f"没有可回放的帧：{path}")
+        self.shape = tuple(self._frames[0].shape)
+        self.loop = loop
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def read(self, out) -> bool:
+        if self._pos >= len(self._frames):
+            if not self.loop:
+                return False
+            self._pos = 0
+        np.copyto(out, self._frames[self._pos])
+        self._pos += 1
+        return True
+
+    def close(self):
+        self._frames = []
+
+
+def record_frames(source, path, count, interval=0.0):
+    """从 source 连续录 count 帧，保存为一个 (N, H, W, C) 的 .npy。"""
+    frames = np.empty((count, *source.shape), dtype=np.uint8)
+    n = 0
+    while n < count and source.read(frames[n]):
+        n += 1
+        if interval:
+            time.sleep(interval)
+    np.save(path, frames[:n])
+    return n
+
+
+# ---------------- 采集管线 ----------------
+class CapturePipeline:
+    """采集 → 去重 → 回调。
+
+    on_frame(frame, t) 在采集线程上同步调用，frame 是复用的缓冲区，回调返回后即可能被覆盖，
+    需要保留时请自行拷贝。interval_fn(t) 返回下一次采集前的等待秒数。
+    """
+
+    def __init__(self, source, on_frame, interval_fn=None, clock=time.monotonic):
+        self.source = source
+        self.on_frame = on_frame
+        self.interval_fn = interval_fn or (lambda t: IDLE_INTERVAL)
+        self.clock = clock
+
+        self._cur = np.zeros(source.shape, dtype=np.uint8)
+        self._prev = np.zeros(source.shape, dtype=np.uint8)
+        self._diff = np.zeros(source.shape, dtype=bool)
+        self._has_prev = False
+
+        self.captured = 0       # 采集的帧数
+        self.skipped = 0        # 与上一帧相同而跳过的帧数
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- 同步驱动（回放/测试用） ----
+    def step(self) -> bool:
+        """采集并处理一帧；来源耗尽时返回 False。"""
+        if not self.source.read(self._cur):
+            return False
+        self.captured += 1
+        if self._has_prev:
+            np.not_equal(self._cur, self._prev, out=self._diff)
+            if not self._diff.any():
+                self.skipped += 1
+                return True
+        self._cur, self._prev = self._prev, self._cur
+        self._has_prev = True
+        self.on_frame(self._prev, self.clock())
+        return True
+
+    # ---- 后台线程 ----
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="screen-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.source.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = self.clock()
+            if not self.step():
+                break
+            wait = self.interval_fn(started) - (self.clock() - started)
+            if wait > 0:
+                self._stop.wait(wait)
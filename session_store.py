@@ -0,0 +1,73 @@
+# session_store.py
+"""对局会话持久化：崩溃或重启后立即恢复计时。
+
+同步、重新同步、相位切换、语音触发时把重建计时所需的最少状态写入 session.json：
+时间轴零点（换算成 Unix 时间，跨进程有效）、已触发的语音、容错模式等。
+写入方式为“临时文件 + os.replace”，任何时刻文件要么是旧版本、要么是新版本；
+不调用 fsync，每次写入只有几百字节，且不在每秒的刷新路径上。
+"""
+import json
+import os
+import tempfile
+import time
+
+from app_paths import user_dir
+
+SESSION_FILE = "session.json"
+VERSION = 1
+MAX_AGE = 2 * 3600      # 超过此秒数未更新的会话视为失效
+
+
+def default_path() -> str:
+    return os.path.join(user_dir("data"), SESSION_FILE)
+
+
+def _wall_offset() -> float:
+    """单调时钟 → Unix 时间的差值。"""
+    return time.time() - time.monotonic()
+
+
+class SessionStore:
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+
+    def save(self, anchor: float, fired=(), **extra):
+        """anchor 为单调时钟下的时间轴零点；extra 为其它需要恢复的面板状态。"""
+        data = {"version": VERSION, "saved_at": time.time(),
+                "wall_anchor": anchor + _wall_offset(), "fired": sorted(fired), **extra}
+        fd, tmp = tempfile.mkstemp(prefix=".session-", dir=os.path.dirname(self.path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def load(self):
+        """读取仍然有效的会话；返回的 anchor 已换算回本进程的单调时钟。无效时返回 None。"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            return None
+        try:
+            if time.time() - float(data["saved_at"]) > MAX_AGE:
+                return None
+            data["anchor"] = float(data.pop("wall_anchor")) - _wall_offset()
+            data["fired"] = {int(i) for i in data.get("fired", ())}
+        except (KeyError, TypeError, ValueError):
+            return None
+        return data
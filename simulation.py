@@ -0,0 +1,200 @@
+# simulation.py
+"""虚拟时钟模拟：用假面板驱动真实的 ZoneTimer 跑完整局。
+
+    python simulation.py                    # 瞬时跑完，打印事件
+    python simulation.py --speed 100        # 在事件循环里以 100 倍速运行
+    python simulation.py --stage 4 --seconds 30 --out events.json
+
+记录每次文字变化、圈等级变化、覆盖层刷新请求与语音提示，时间戳为虚拟时间（秒）。
+"""
+import argparse
+import json
+import sys
+
+from PyQt5.QtCore import QCoreApplication, QObject, QTimer
+
+from config import ZONE_TIMINGS
+from zone_timer import ZoneTimer
+
+
+class VirtualClock:
+    """可手动推进的时钟，接口与 time.monotonic 相同（直接调用返回秒数）。"""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance_to(self, t: float):
+        self.now = max(self.now, t)
+
+
+class _Recorder:
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []    # [(虚拟时间, 类型, 值)]
+
+    def add(self, kind, value):
+        self.events.append((round(self.clock(), 3), kind, value))
+
+
+class _Label:
+    def __init__(self, rec):
+        self._rec = rec
+        self._text = ""
+
+    def setText(self, text):
+        self._text = text
+        self._rec.add("label", text)
+
+    def text(self):
+        return self._text
+
+
+class _Overlay:
+    countdown_visible = False
+
+    def __init__(self, rec):
+        self._rec = rec
+
+    def refresh(self):
+        self._rec.add("overlay", None)
+
+    def set_countdown(self, value):
+        pass
+
+
+class _Voice:
+    def __init__(self, rec):
+        self._rec = rec
+
+    def play(self, filename, speech_at=None):
+        self._rec.add("voice", filename)
+
+    def latency(self, filename):
+        return 0.0
+
+    def reset(self):
+        pass
+
+
+class SimulatedPanel(QObject):
+    """ZoneTimer 需要的面板接口，全部记录到 events。"""
+
+    def __init__(self, clock, minimized=False):
+        super().__init__()
+        self.recorder = _Recorder(clock)
+        self.info_label = _Label(self.recorder)
+        self.linked_overlay = _Overlay(self.recorder)
+        self.voice = _Voice(self.recorder)
+        self.minimized = minimized
+        self.hp_percent = None
+        self.is_synced = True
+        self._zone_level = 1
+
+    @property
+    def zone_level(self):
+        return self._zone_level
+
+    @zone_level.setter
+    def zone_level(self, value):
+        if value != self._zone_level:
+            self.recorder.add("zone_level", value)
+        self._zone_level = value
+
+    @property
+    def events(self):
+        return self.recorder.events
+
+    def set_status_text(self, text):
+        self.info_label.setText(text)
+
+    def isMinimized(self):
+        return self.minimized
+
+    def isVisible(self):
+        return not self.minimized
+
+
+def build(stage_idx=0, countdown=None, minimized=False):
+    clock = VirtualClock()
+    panel = SimulatedPanel(clock, minimized)
+    timer = ZoneTimer(panel, clock=clock, autorun=False)
+    if countdown is None:
+        countdown = ZONE_TIMINGS[stage_idx][1]
+    return clock, panel, timer, countdown
+
+
+def run_instant(stage_idx=0, countdown=None, minimized=False, max_steps=1_000_000):
+    """不等待真实时间，直接从一个唤醒点跳到下一个，返回事件列表。"""
+    clock, panel, timer, countdown = build(stage_idx, countdown, minimized)
+    timer.start(stage_idx, countdown)
+    steps = 0
+    while timer.next_deadline is not None and steps < max_steps:
+        clock.advance_to(timer.next_deadline)
+        timer._on_timeout()
+        steps += 1
+    return panel.events
+
+
+class SimulationRunner(QObject):
+    """在 Qt 事件循环里按 speed 倍速推进虚拟时钟。"""
+
+    def __init__(self, speed=100.0, stage_idx=0, countdown=None, minimized=False, on_finished=None):
+        super().__init__()
+        self.speed = float(speed)
+        self.clock, self.panel, self.timer, countdown = build(stage_idx, countdown, minimized)
+        self.on_finished = on_finished
+        self._qt_timer = QTimer(self)
+        self._qt_timer.setSingleShot(True)
+        self._qt_timer.timeout.connect(self._step)
+        self.timer.start(stage_idx, countdown)
+        self._schedule()
+
+    def _schedule(self):
+        if self.timer.next_deadline is None:
+            if self.on_finished:
+                self.on_finished(self.panel.events)
+            return
+        wait = (self.timer.next_deadline - self.clock()) / self.speed
+        self._qt_timer.start(max(0, int(wait * 1000)))
+
+    def _step(self):
+        self.clock.advance_to(self.timer.next_deadline)
+        self.timer._on_timeout()
+        self._schedule()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="虚拟时钟整局模拟")
+    ap.add_argument("--stage", type=int, default=1, help="从第几阶段开始（1‑9）")
+    ap.add_argument("--seconds", type=float, help="距开始缩圈的秒数，默认为该阶段完整等待时间")
+    ap.add_argument("--speed", type=float, help="倍速运行；不指定则瞬时完成")
+    ap.add_argument("--minimized", action="store_true", help="模拟面板最小化")
+    ap.add_argument("--out", help="事件 JSON 输出路径（默认打印）")
+    args = ap.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    stage_idx = args.stage - 1
+
+    def finish(events):
+        text = json.dumps(events, ensure_ascii=False, indent=1)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            print(text)
+        app.quit()
+
+    if args.speed:
+        runner = SimulationRunner(args.speed, stage_idx, args.seconds, args.minimized, on_finished=finish)
+        app.exec_()
+        del runner
+    else:
+        finish(run_instant(stage_idx, args.seconds, args.minimized))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
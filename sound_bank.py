@@ -0,0 +1,333 @@
+# sound_bank.py
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import wave
+from array import array
+from collections import deque
+
+from PyQt5.QtCore import QIODevice, QObject, QUrl, pyqtSignal
+
+log = logging.getLogger(__name__)
+
+# 语音包（build_voice_pack.py 生成）：
+#   MAGIC | 版本 u32 | 索引长度 u32 | 索引 JSON | 填充到 PACK_ALIGN | PCM 数据
+# 索引记录统一的采样率/声道/位深、数据区的 sha256，以及 {cue_key: {offset, length, lead_in}}，
+# offset 相对数据区起点。
+PACK_FILE = "voice.pack"
+PACK_MAGIC = b"OTZVPACK"
+PACK_VERSION = 1
+PACK_ALIGN = 64
+PACK_HEADER = struct.Struct("<8sII")
+
+
+def cue_key(filename: str) -> str:
+    """音频文件名 → 索引键：去掉扩展名及两端空白（兼容“阶段9锁定开始 .wav”这类文件名）。"""
+    stem, _ = os.path.splitext(os.path.basename(filename))
+    return stem.strip()
+
+
+def find_voice_file(voice_dir: str, filename: str):
+    """按 cue_key 在目录中查找实际文件路径，找不到时返回 None。"""
+    path = os.path.join(voice_dir, filename)
+    if os.path.isfile(path):
+        return path
+    key = cue_key(filename)
+    try:
+        for name in os.listdir(voice_dir):
+            if cue_key(name) == key and name.lower().endswith(".wav"):
+                return os.path.join(voice_dir, name)
+    except OSError:
+        pass
+    return None
+
+
+def is_riff_wave(path: str) -> bool:
+    """文件头是否为 RIFF/WAVE（扩展名是 .wav、实际是 AAC/MP4 的录音 QSoundEffect 无法播放）。"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+    except OSError:
+        return False
+    return len(head) == 12 and head[:4] == b"RIFF" and head[8:] == b"WAVE"
+
+
+def wav_lead_in(path: str, threshold=0.02, max_seconds=1.0) -> float:
+    """WAV 开头静音的时长（秒）。只看前 max_seconds 秒，仅支持 16 位 PCM，其他格式返回 0。"""
+    try:
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != 2:
+                return 0.0
+            rate, channels = w.getframerate(), w.getnchannels()
+            samples = array("h", w.readframes(int(rate * max_seconds)))
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+    return pcm_lead_in(samples, rate, channels, threshold)
+
+
+def pcm_lead_in(samples, rate: int, channels: int, threshold=0.02) -> float:
+    """16 位交错 PCM 样本开头静音的时长（秒）。"""
+    limit = int(threshold * 32767)
+    for i, v in enumerate(samples):
+        if v > limit or v < -limit:
+            return i // channels / rate
+    return len(samples) // channels / rate
+
+
+# ------------ 语音包 ------------
+class PackError(ValueError):
+    pass
+
+
+class VoicePack:
+    """只读内存映射的语音包。clip() 返回数据区上的 memoryview，不拷贝。"""
+
+    def __init__(self, path: str, verify=True):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, size = PACK_HEADER.unpack_from(self._mm)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise PackError(f"不是可识别的语音包：{path}")
+            start = PACK_HEADER.size
+            index = json.loads(self._mm[start:start + size].decode("utf-8"))
+            start = -(-(start + size) // PACK_ALIGN) * PACK_ALIGN
+            self.rate = int(index["rate"])
+            self.channels = int(index["channels"])
+            self.sample_width = int(index["sample_width"])
+            self._clips = index["clips"]
+            self.data = memoryview(self._mm)[start:start + int(index["data_size"])]
+        except (struct.error, KeyError, TypeError, ValueError) as e:
+            self._mm.close()
+            raise PackError(f"语音包损坏：{path}（{e}）") from None
+        if verify and hashlib.sha256(self.data).hexdigest() != index.get("sha256"):
+            raise PackError(f"语音包校验失败：{path}")
+
+    def keys(self):
+        return self._clips.keys()
+
+    def __contains__(self, key):
+        return key in self._clips
+
+    def clip(self, key: str) -> memoryview:
+        c = self._clips[key]
+        return self.data[c["offset"]:c["offset"] + c["length"]]
+
+    def lead_in(self, key: str) -> float:
+        return float(self._clips[key].get("lead_in", 0.0))
+
+
+_packs = {}
+_packs_lock = threading.Lock()
+
+
+def open_voice_pack(voice_dir: str):
+    """voice 目录下的语音包（每个进程只打开并校验一次）；没有或损坏时返回 None。"""
+    path = os.path.join(voice_dir, PACK_FILE)
+    with _packs_lock:
+        if path not in _packs:
+            pack = None
+            if os.path.isfile(path):
+                try:
+                    pack = VoicePack(path)
+                except (OSError, PackError) as e:
+                    log.warning("语音包不可用，改用散装 WAV：%s", e)
+            _packs[path] = pack
+        return _packs[path]
+
+
+class ClipDevice(QIODevice):
+    """把一段 PCM（memoryview）作为只读 QIODevice 交给 QAudioOutput 拉取。"""
+
+    def __init__(self, clip, parent=None):
+        super().__init__(parent)
+        self._clip = clip
+        self._pos = 0
+        self.open(QIODevice.ReadOnly)
+
+    def rewind(self):
+        self._pos = 0
+
+    def readData(self, maxlen):
+        chunk = self._clip[self._pos:self._pos + maxlen]
+        self._pos += len(chunk)
+        return chunk.tobytes()
+
+    def writeData(self, data):
+        return -1
+
+    def bytesAvailable(self):
+        return len(self._clip) - self._pos + super().bytesAvailable()
+
+
+class PackEffect(QObject):
+    """语音包里一条语音的播放实例，接口与 QSoundEffect 中 AudioWorker 用到的部分一致。"""
+
+    playingChanged = pyqtSignal()
+
+    def __init__(self, clip, fmt, parent=None):
+        super().__init__(parent)
+        from PyQt5.QtMultimedia import QAudioOutput
+
+        self._out = QAudioOutput(fmt, self)
+        self._out.stateChanged.connect(self._on_state)
+        self._device = ClipDevice(clip, self)
+        self._playing = False
+
+    def setLoopCount(self, n):
+        pass
+
+    def setVolume(self, v):
+        self._out.setVolume(v)
+
+    def isPlaying(self):
+        return self._playing
+
+    def play(self):
+        self._out.stop()
+        self._device.rewind()
+        self._out.start(self._device)
+
+    def stop(self):
+        self._out.stop()
+
+    def _on_state(self, state):
+        from PyQt5.QtMultimedia import QAudio
+
+        if state == QAudio.IdleState:
+            self._out.stop()        # 数据读完即播完
+            return
+        playing = state == QAudio.ActiveState
+        if playing != self._playing:
+            self._playing = playing
+            self.playingChanged.emit()
+
+
+def pack_format(pack):
+    """语音包的 QAudioFormat；默认输出设备不支持时返回 None。"""
+    from PyQt5.QtMultimedia import QAudioDeviceInfo, QAudioFormat
+
+    fmt = QAudioFormat()
+    fmt.setSampleRate(pack.rate)
+    fmt.setChannelCount(pack.channels)
+    fmt.setSampleSize(pack.sample_width * 8)
+    fmt.setCodec("audio/pcm")
+    fmt.setByteOrder(QAudioFormat.LittleEndian)
+    fmt.setSampleType(QAudioFormat.SignedInt)
+    if not QAudioDeviceInfo.defaultOutputDevice().isFormatSupported(fmt):
+        log.warning("输出设备不支持语音包格式（%d Hz / %d 声道），改用散装 WAV；"
+                    "可用 build_voice_pack.py --rate device 重新生成", pack.rate, pack.channels)
+        return None
+    return fmt
+
+
+class SoundBank(QObject):
+    """预加载的音效池。
+
+    voice 目录下有语音包时，每条语音直接播放包内已是设备格式的 PCM（内存映射，无需解码）；
+    包里没有的语音，或没有语音包时，为散装 WAV 建立少量可复用的 QSoundEffect，
+    QSoundEffect 在 setSource 后会在后台完成解码，播报时直接取用已就绪的实例。
+    文件头不是 RIFF/WAVE、或解码出错（status 变为 Error）的语音计入 missing，播报时跳过。
+    """
+
+    POOL_SIZE = 2   # 每条语音的可复用实例数
+
+    def __init__(self, voice_dir: str, expected=(), pool_size: int = POOL_SIZE, parent=None):
+        super().__init__(parent)
+        self.voice_dir = voice_dir
+        self.expected = tuple(expected)
+        self.pool_size = max(1, int(pool_size))
+
+        self._pools = {}          # {cue_key: deque[QSoundEffect]}
+        self.missing = []         # 期望存在但未找到的文件名
+        self.loaded = False
+
+    # ------------ 加载 ------------
+    def load(self):
+        """扫描并预解码全部语音；重复调用无副作用。"""
+        if self.loaded:
+            return
+        self.loaded = True
+
+        pack = open_voice_pack(self.voice_dir)
+        fmt = self._pack_format(pack) if pack is not None else None
+        if fmt is not None:
+            for key in pack.keys():
+                clip = pack.clip(key)
+                self._pools[key] = deque(self._make_pack_effect(clip, fmt) for _ in range(self.pool_size))
+
+        try:
+            names = sorted(os.listdir(self.voice_dir))
+        except OSError:
+            names = []
+
+        for name in names:
+            if not name.lower().endswith(".wav"):
+                continue
+            path = os.path.join(self.voice_dir, name)
+            key = cue_key(name)
+            if key in self._pools or not os.path.isfile(path):
+                continue
+            if not is_riff_wave(path):
+                log.warning("不是 RIFF/WAVE 文件，无法播放：%s", name)
+                continue
+            url = QUrl.fromLocalFile(path)
+            pool = self._pools[key] = deque(self._make_effect(url) for _ in range(self.pool_size))
+            for eff in pool:
+                if hasattr(eff, "statusChanged"):
+                    eff.statusChanged.connect(lambda eff=eff, key=key: self._on_status_changed(eff, key))
+
+        self.missing = [f for f in self.expected if cue_key(f) not in self._pools]
+        if self.missing:
+            log.warning("语音资源缺失（%s）：%s", self.voice_dir, "，".join(self.missing))
+
+    def _on_status_changed(self, eff, key):
+        """QSoundEffect 在后台解码失败（头部是 RIFF 但内容损坏等）：整条语音按缺失处理。"""
+        from PyQt5.QtMultimedia import QSoundEffect
+
+        if eff.status() != QSoundEffect.Error or self._pools.pop(key, None) is None:
+            return
+        self.missing += [f for f in self.expected if cue_key(f) == key]
+        log.warning("语音解码失败，按缺失处理：%s", eff.source().toLocalFile())
+
+    def _pack_format(self, pack):
+        return pack_format(pack)
+
+    def _make_pack_effect(self, clip, fmt):
+        return PackEffect(clip, fmt, self)
+
+    def _make_effect(self, url: QUrl):
+        from PyQt5.QtMultimedia import QSoundEffect
+
+        eff = QSoundEffect(self)
+        eff.setSource(url)
+        eff.setLoopCount(1)
+        return eff
+
+    # ------------ 取用 ------------
+    def has(self, filename: str) -> bool:
+        return cue_key(filename) in self._pools
+
+    def acquire(self, filename: str):
+        """取出一个空闲实例；全部在播时复用最早的那个。未知语音返回 None。"""
+        pool = self._pools.get(cue_key(filename))
+        if not pool:
+            return None
+        for _ in range(len(pool)):
+            eff = pool[0]
+            pool.rotate(-1)
+            if not eff.isPlaying():
+                return eff
+        eff = pool[0]
+        pool.rotate(-1)
+        eff.stop()
+        return eff
+
+    def effects(self):
+        for pool in self._pools.values():
+            yield from pool
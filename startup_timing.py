@@ -0,0 +1,39 @@
+# startup_timing.py
+"""启动耗时打点。
+
+main.py 最先导入本模块作为计时零点，各阶段调用 mark() 记录；
+设置环境变量 OTZ_STARTUP_REPORT=1 或加命令行参数 --startup-report 时，在首帧后把报告打印到 stderr。
+需要细看导入耗时可配合 ``python -X importtime main.py``。
+"""
+import os
+import sys
+import time
+
+T0 = time.perf_counter()
+_marks = []     # [(名称, 距离 T0 的秒数)]
+
+
+def mark(name: str):
+    _marks.append((name, time.perf_counter() - T0))
+
+
+def enabled() -> bool:
+    return bool(os.environ.get("OTZ_STARTUP_REPORT")) or "--startup-report" in sys.argv
+
+
+def marks():
+    return list(_marks)
+
+
+def as_dict():
+    return {name: round(t * 1000, 3) for name, t in _marks}
+
+
+def report(stream=None):
+    stream = stream or sys.stderr
+    prev = 0.0
+    print("启动耗时（ms）   累计     本段", file=stream)
+    for name, t in _marks:
+        print(f"  {t * 1000:9.1f} {(t - prev) * 1000:8.1f}  {name}", file=stream)
+        prev = t
+    stream.flush()
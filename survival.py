@@ -0,0 +1,81 @@
+# survival.py
+"""圈外可坚持时间表。
+
+把圈伤害视作每秒扣除 zone_damage[圈等级]% 血量（与 calculate_thresholds 的“伤害 × 6 秒打药时间”一致），
+“必须开始打药”即血量降到当时圈等级的无药线。对时间轴上每一秒 k 记
+    D[k] = 从开局到 k 秒的累计伤害，G[k] = D[k] + 无药线(k)，
+从 k 秒、血量 h 出发可坚持的秒数就是第一个满足 G[m] ≥ h + D[k] 的 m 减去 k。
+G 取前缀最大值后单调不减，可用二分查找。同步或切换容错模式时先算出 D、G（约 1 ms），
+再按相位把 (血量档, 相位内秒数) 的结果预先算好存进扁平数组：当前相位立即计算，
+之后每进入一个相位顺带算好下一个，覆盖层每次读取只是一次下标运算。
+"""
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, repeat
+from operator import sub
+
+HP_BUCKETS = 101        # 血量按 1% 分档：0‑100
+FOREVER = 0xFFFF        # 整局结束前都不必打药
+
+
+class SurvivalTable:
+
+    def __init__(self, timeline, thresholds):
+        self.timeline = timeline
+        self.thresholds = thresholds        # ThresholdStore
+        self.key = None                     # (容错模式, 阈值表版本)
+        self._cum = self._g = None
+        self._base = []                     # 各相位起点（整秒）
+        self._rows = {}                     # {相位序号: array('H')}，下标 血量档 × 相位秒数 + 相位内秒数
+
+    def prepare(self, mode: str, index: int = None):
+        """按容错模式（及当前阈值表）编译，并确保相位 index 及其下一个相位的表已就绪。"""
+        key = (mode, self.thresholds.version)
+        if key != self.key:
+            self._compile(mode)
+            self.key = key
+        if index is not None:
+            for i in (index, index + 1):
+                if i < len(self._base) - 1 and i not in self._rows:
+                    self._rows[i] = self._build_phase(i)
+
+    def _compile(self, mode):
+        tl = self.timeline
+        damage = self.thresholds.zone_damage
+
+        # 按秒展开：每秒的圈等级 → 伤害与无药线
+        rate, line = [], []
+        self._base = [0]
+        for i in range(len(tl)):
+            level = tl.zone_levels[i]
+            lines = self.thresholds.lookup(level, mode)
+            n = int(round(tl.ends[i] - tl.starts[i]))
+            rate += [damage.get(level, 0)] * n
+            line += [lines[0] if lines else 0.0] * n
+            self._base.append(self._base[-1] + n)
+        self._cum = [0.0, *accumulate(rate)]                                # D[0..total]
+        self._g = list(accumulate((d + l for d, l in zip(self._cum, line)), max))
+        self._rows = {}
+
+    def _build_phase(self, i):
+        # m = bisect_left(G, h + D[k], lo=k)；m == total 表示整局都不必打药，存为 total - k
+        g, cum = self._g, self._cum
+        ks = range(self._base[i], self._base[i + 1])
+        row = array("H")
+        for h in range(HP_BUCKETS):
+            hits = map(bisect_left, repeat(g), [h + cum[k] for k in ks], ks)
+            row.extend(map(sub, hits, ks))
+        return row
+
+    def seconds(self, st, hp: float):
+        """TimelineState + 当前血量 → 还能坚持的整秒数（FOREVER 表示不必打药）；表未就绪时为 None。"""
+        if st is None or hp is None:
+            return None
+        row = self._rows.get(st.index)
+        if row is None:
+            return None
+        n = self._base[st.index + 1] - self._base[st.index]
+        into = min(n - 1, max(0, int(n - st.remaining)))
+        h = min(HP_BUCKETS - 1, max(0, int(hp)))
+        v = row[h * n + into]
+        return FOREVER if self._base[st.index] + into + v >= len(self._g) else v
@@ -0,0 +1,18 @@
+# tests/conftest.py
+"""测试环境：无显示器运行 Qt，配置与数据写进临时目录，不碰用户自己的 OTZ_HOME。"""
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["OTZ_HOME"] = tempfile.mkdtemp(prefix="otz-test-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,114 @@
+# tests/test_broadcast.py
+"""广播服务器只用本机回环客户端测试。"""
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+
+from broadcast import BroadcastServer, encode
+
+TIMEOUT = 2.0
+
+
+@pytest.fixture
+def server():
+    srv = BroadcastServer(port=0)
+    srv.start()
+    yield srv
+    srv.stop()
+
+
+class Client:
+    """阻塞式回环订阅者，逐行读取 JSON 消息。"""
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=TIMEOUT)
+        self.file = self.sock.makefile("rb")
+
+    def next(self):
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def _wait_clients(srv, n):
+    end = time.monotonic() + TIMEOUT
+    while srv.client_count != n and time.monotonic() < end:
+        time.sleep(0.01)
+    assert srv.client_count == n
+
+
+def test_snapshot_then_diffs(server):
+    server.publish({"synced": True, "stage": 4, "phase": "countdown", "remaining": 50, "mode": "正常"})
+    client = Client(server.port)
+    try:
+        msg = client.next()
+        assert msg == {"type": "snapshot",
+                       "state": {"synced": True, "stage": 4, "phase": "countdown", "remaining": 50, "mode": "正常"}}
+
+        server.publish({"synced": True, "stage": 4, "remaining": 49, "mode": "正常"})
+        server.publish({"remaining": 49})                        # 没有变化：不发送
+        server.publish({"phase": "shrinking", "remaining": 80})
+        assert client.next() == {"type": "diff", "state": {"remaining": 49}}
+        assert client.next() == {"type": "diff", "state": {"phase": "shrinking", "remaining": 80}}
+    finally:
+        client.close()
+
+
+def test_fans_out_to_every_subscriber(server):
+    clients = [Client(server.port) for _ in range(5)]
+    try:
+        for c in clients:
+            assert c.next() == {"type": "snapshot", "state": {}}
+        _wait_clients(server, 5)
+        server.publish({"stage": 9, "zone_level": 9})
+        for c in clients:
+            assert c.next() == {"type": "diff", "state": {"stage": 9, "zone_level": 9}}
+
+        clients.pop().close()
+        _wait_clients(server, 4)
+        server.publish({"remaining": 10})
+        for c in clients:
+            assert c.next() == {"type": "diff", "state": {"remaining": 10}}
+    finally:
+        for c in clients:
+            c.close()
+
+
+def test_slow_subscriber_gets_a_fresh_snapshot():
+    srv = BroadcastServer(port=0, queue_size=2)
+    srv.state = {"remaining": 3}
+    q = asyncio.Queue(2)
+    for msg in (encode("diff", {"remaining": 5}), encode("diff", {"remaining": 4})):
+        srv._offer(q, msg)
+    srv._offer(q, encode("diff", {"remaining": 3}))              # 队列已满：丢弃积压，改发快照
+    assert q.qsize() == 1
+    assert json.loads(q.get_nowait()) == {"type": "snapshot", "state": {"remaining": 3}}
+
+
+def test_panel_publishes_timer_state(qapp):
+    from ui_panel import ControlPanel
+
+    panel = ControlPanel()
+    try:
+        server = panel.enable_broadcast(port=0)
+        client = Client(server.port)
+        try:
+            snap = client.next()
+            assert snap["type"] == "snapshot"
+            assert snap["state"]["synced"] is False and snap["state"]["stage"] is None
+
+            panel.apply_sync(3, 50)
+            diff = client.next()["state"]
+            assert diff["synced"] is True
+            assert (diff["stage"], diff["phase"], diff["remaining"]) == (4, "countdown", 50)
+            assert diff["zone_level"] == 4
+        finally:
+            client.close()
+            server.stop()
+    finally:
+        panel.voice.shutdown()
@@ -0,0 +1,55 @@
+# tests/test_digit_recognizer.py
+import numpy as np
+import pytest
+
+from auto_sync import MIN_CONFIDENCE
+from config import RES_GEOMETRY
+from digit_recognizer import DigitRecognizer, is_calibrated, render_crop
+
+PER_RES = 60
+
+
+def _corpus(res_key, n, seed):
+    rng = np.random.default_rng(seed)
+    labels = [int(v) for v in rng.integers(0, 270, size=n)]
+    return [render_crop(res_key, v, rng) for v in labels], labels
+
+
+def _read_all(rec, frames, labels):
+    readings = [rec.read(f) for f in frames]
+    ok = sum(r is not None and r.seconds == label for r, label in zip(readings, labels))
+    confs = [r.confidence for r in readings if r is not None]
+    return ok / len(labels), float(np.mean(confs)) if confs else 0.0
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    """每个用例用独立的模板缓存，校准结果不会带进别的用例。"""
+    monkeypatch.setenv("OTZ_HOME", str(tmp_path))
+
+
+@pytest.mark.parametrize("res_key", list(RES_GEOMETRY))
+def test_default_templates_read_another_font(qapp, res_key):
+    frames, labels = _corpus(res_key, PER_RES, seed=0)
+    accuracy, _ = _read_all(DigitRecognizer(res_key), frames, labels)
+    assert accuracy >= 0.95
+
+
+@pytest.mark.parametrize("res_key", ["1920x1080", "5120x2160 (21:9 4K)"])
+def test_calibrated_templates_pass_auto_sync_threshold(qapp, res_key):
+    rec = DigitRecognizer(res_key)
+    assert not is_calibrated(res_key)
+    train, train_labels = _corpus(res_key, PER_RES, seed=1)
+    assert rec.calibrate(train, train_labels) == []
+    assert is_calibrated(res_key)
+
+    frames, labels = _corpus(res_key, PER_RES, seed=2)       # 与校准用的帧不重叠
+    accuracy, mean_conf = _read_all(DigitRecognizer(res_key), frames, labels)
+    assert accuracy >= 0.98
+    assert mean_conf >= MIN_CONFIDENCE
+
+
+def test_blank_crop_is_not_read(qapp):
+    rec = DigitRecognizer("1920x1080")
+    frames, _ = _corpus("1920x1080", 1, seed=3)
+    assert rec.read(np.full_like(frames[0], 40)) is None
@@ -0,0 +1,58 @@
+# tests/test_hp_sampler.py
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from config import RES_GEOMETRY
+from hp_sampler import HealthBarSampler
+from replay import render_hp_row
+
+ALLOC_BOUND = 512   # 每次采样允许的临时分配（字节），与血条宽度无关
+
+
+@pytest.mark.parametrize("res_key", list(RES_GEOMETRY))
+def test_reads_synthetic_rows(res_key):
+    rng = np.random.default_rng(0)
+    for hp in (0.0, 3.0, 37.5, 99.0, 100.0):
+        row = render_hp_row(res_key, hp, rng)
+        w = row.shape[1]
+        assert abs(HealthBarSampler(w).measure(row) - hp) <= 100.0 / w + 1e-9
+
+
+def test_masked_columns_follow_neighbours():
+    w = 400
+    row = np.zeros((1, w, 4), dtype=np.uint8)
+    row[0, :120, 2] = 220                     # 30% 血
+    row[0, 200:204, :3] = 255                 # 亮色辅助线画在空血的部分
+    sampler = HealthBarSampler(w)
+    assert sampler.measure(row) == pytest.approx(51.0)
+    sampler.set_ignored([(199 / w, 205 / w)])
+    assert sampler.measure(row) == pytest.approx(30.0)
+
+    row[0, 116:124, :3] = 0                   # 黑色辅助线盖住血量边缘：读数取线的左缘
+    sampler.set_ignored([(116 / w, 124 / w), (199 / w, 205 / w)])
+    assert sampler.measure(row) == pytest.approx(29.0)
+
+
+@pytest.mark.parametrize("res_key", ["1920x1080", "5120x2160 (21:9 4K)"])
+def test_measure_allocation_is_bounded(res_key):
+    rng = np.random.default_rng(1)
+    frames = [render_hp_row(res_key, hp, rng) for hp in (0.0, 50.0, 100.0)]
+    sampler = HealthBarSampler(frames[0].shape[1])
+    sampler.set_ignored([(0.2, 0.21), (0.5, 0.52)])
+    buf = np.empty_like(frames[0])
+    sampler.measure(buf)                      # 首次调用建立通道视图
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for frame in frames * 10:
+            np.copyto(buf, frame)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            sampler.measure(buf)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    assert max(peaks) <= ALLOC_BOUND
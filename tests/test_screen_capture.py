@@ -0,0 +1,114 @@
+# tests/test_screen_capture.py
+"""采集管线用磁盘上录好的帧测试，不需要 mss 或游戏画面。"""
+import time
+
+import numpy as np
+import pytest
+
+from config import RES_GEOMETRY, ZONE_TIMINGS
+from digit_recognizer import render_crop
+from screen_capture import (DENSE_INTERVAL, IDLE_INTERVAL, SPARSE_INTERVAL, CapturePipeline,
+                            DirectorySource, countdown_roi, record_frames, schedule_interval)
+from timeline import MatchTimeline
+
+
+def _frames(values, shape=(4, 6, 4)):
+    """每个值一帧，整帧填充该值。"""
+    return np.stack([np.full(shape, v, dtype=np.uint8) for v in values])
+
+
+@pytest.mark.parametrize("res_key", list(RES_GEOMETRY))
+def test_roi_lies_on_screen(res_key):
+    x, y, w, h = countdown_roi(RES_GEOMETRY[res_key])
+    sw, sh = (int(v) for v in res_key.split()[0].split("x"))
+    assert 0 <= x and x + w <= sw and 0 <= y and y + h <= sh
+    assert w > h > 0
+
+
+def test_pipeline_skips_unchanged_frames(tmp_path):
+    for i, v in enumerate((0, 0, 1, 1, 1, 2, 0)):      # 目录回放：每个 .npy 一帧，按文件名排序
+        np.save(tmp_path / f"{i:03d}.npy", _frames([v])[0])
+    seen, buffers = [], set()
+
+    def on_frame(frame, t):
+        seen.append(int(frame[0, 0, 0]))
+        buffers.add(id(frame))
+
+    pipeline = CapturePipeline(DirectorySource(str(tmp_path)), on_frame)
+    while pipeline.step():
+        pass
+    assert seen == [0, 1, 2, 0]
+    assert (pipeline.captured, pipeline.skipped) == (7, 3)
+    assert len(buffers) <= 2                            # 只在两块预分配缓冲区之间轮换
+
+
+def test_record_and_replay(tmp_path):
+    np.save(tmp_path / "in.npy", _frames(range(5)))
+    src = DirectorySource(str(tmp_path / "in.npy"))
+    assert record_frames(src, str(tmp_path / "out.npy"), 10) == 5
+    replay = DirectorySource(str(tmp_path / "out.npy"), loop=True)
+    out = np.empty(replay.shape, dtype=np.uint8)
+    values = []
+    for _ in range(7):
+        assert replay.read(out)
+        values.append(int(out[0, 0, 0]))
+    assert values == [0, 1, 2, 3, 4, 0, 1]
+
+
+def test_worker_thread_drains_source(tmp_path):
+    np.save(tmp_path / "f.npy", _frames(range(20)))
+    seen = []
+    pipeline = CapturePipeline(DirectorySource(str(tmp_path / "f.npy")), lambda f, t: seen.append(int(f[0, 0, 0])),
+                               interval_fn=lambda t: 0.0)
+    pipeline.start()
+    deadline = time.monotonic() + 5
+    while len(seen) < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+    assert seen == list(range(20))
+    assert not pipeline.running
+
+
+def test_schedule_is_dense_near_phase_boundaries():
+    timeline = MatchTimeline(ZONE_TIMINGS)
+    assert schedule_interval(timeline, 0.0) == IDLE_INTERVAL
+    timeline.sync(0, 240, 0.0)                          # 阶段 1 倒计时 240 秒，240 秒时开始缩圈
+    assert schedule_interval(timeline, 1.0) == DENSE_INTERVAL       # 刚进入相位
+    assert schedule_interval(timeline, 100.0) == SPARSE_INTERVAL
+    assert schedule_interval(timeline, 238.5) == DENSE_INTERVAL     # 边界前
+    assert schedule_interval(timeline, 241.0) == DENSE_INTERVAL     # 边界后
+    # 稀疏采集不会越过边界前的加密窗口
+    assert schedule_interval(timeline, 236.0) == pytest.approx(1.0)
+
+
+def test_auto_sync_from_recorded_frames(qapp, tmp_path, monkeypatch):
+    """录制的倒计时画面 → 识别 → 两次读数吻合后自动同步。"""
+    monkeypatch.setenv("OTZ_HOME", str(tmp_path))
+    from auto_sync import AutoSync
+    from digit_recognizer import DigitRecognizer
+    from ui_panel import ControlPanel
+
+    res_key = "1920x1080"
+    rng = np.random.default_rng(0)
+    labels = [int(v) for v in rng.integers(0, 270, size=40)]
+    DigitRecognizer(res_key).calibrate([render_crop(res_key, v, rng) for v in labels], labels)
+
+    wait = ZONE_TIMINGS[0][1]
+    first, second = (render_crop(res_key, s, rng) for s in (wait - 30, wait - 31))
+    np.save(tmp_path / "countdown.npy", np.stack([first, first, second]))     # 中间一帧没有变化
+
+    panel = ControlPanel()
+    try:
+        panel.update_resolution(res_key)
+        sync = AutoSync(panel, source=DirectorySource(str(tmp_path / "countdown.npy")))
+        now = time.monotonic()
+        sync.pipeline.clock = iter((now - 1.0, now)).__next__  # 两次送去识别的采集时刻，与读数一致地相隔 1 秒
+        while sync.pipeline.step():
+            pass
+        assert sync.pipeline.skipped == 1
+        assert panel.is_synced
+        st = panel.zone_timer.state()
+        assert (st.stage_idx, st.phase) == (0, "countdown")
+        assert st.remaining == pytest.approx(wait - 31, abs=1.0)
+    finally:
+        panel.voice.shutdown()
@@ -0,0 +1,61 @@
+# tests/test_zone_timer.py
+"""用虚拟时钟驱动真实的 ZoneTimer 跑完整局，核对语音提示与结束时刻。"""
+import pytest
+
+from config import VOICE_CUES, ZONE_TIMINGS
+from simulation import SimulatedPanel, VirtualClock, build, run_instant
+from zone_timer import ZoneTimer
+
+# 从阶段 1 开局（倒计时 240 秒）起算的虚拟时刻
+CUE_TIMES = [1072, 1232, 1352, 1452, 1542, 1550, 1570]
+MATCH_END = 1640
+
+
+def _voice(events):
+    return [(t, name) for t, kind, name in events if kind == "voice"]
+
+
+@pytest.mark.parametrize("minimized", [False, True])
+def test_full_match_cues_and_end(qapp, minimized):
+    events = run_instant(minimized=minimized)
+    assert _voice(events) == list(zip(CUE_TIMES, [cue[3] for cue in VOICE_CUES]))
+    t, kind, text = events[-1]
+    assert (t, kind, text) == (MATCH_END, "label", "阶段 10 已结束")
+
+
+def test_full_match_timeline(qapp):
+    clock, panel, timer, countdown = build()
+    finished = []
+    timer.finished.connect(lambda: finished.append(clock()))
+    timer.start(0, countdown)
+    while timer.next_deadline is not None:
+        clock.advance_to(timer.next_deadline)
+        timer._on_timeout()
+
+    assert finished == [MATCH_END]
+    assert MATCH_END == sum(wait + shrink for _, wait, shrink in ZONE_TIMINGS)
+    levels = [value for _, kind, value in panel.events if kind == "zone_level"]
+    assert levels == list(range(2, 10))
+    # 面板可见时每个显示秒都刷新一次文字，且不会重复写入同样的文字
+    labels = [value for _, kind, value in panel.events if kind == "label"]
+    assert len(labels) == len(set(labels))
+
+
+def test_start_mid_match_skips_earlier_cues(qapp):
+    stage5 = sum(wait + shrink for _, wait, shrink in ZONE_TIMINGS[:4])
+    events = run_instant(stage_idx=4, countdown=30)
+    shift = stage5 + ZONE_TIMINGS[4][1] - 30        # 此次同步时刻对应的整局时刻
+    assert [t + shift for t, _ in _voice(events)] == CUE_TIMES[1:]
+    assert events[-1][0] + shift == MATCH_END
+
+
+def test_cues_fire_early_by_voice_latency(qapp):
+    clock = VirtualClock()
+    panel = SimulatedPanel(clock)
+    panel.voice.latency = lambda filename: 0.5
+    timer = ZoneTimer(panel, clock=clock, autorun=False)
+    timer.start(0, ZONE_TIMINGS[0][1])
+    while timer.next_deadline is not None:
+        clock.advance_to(timer.next_deadline)
+        timer._on_timeout()
+    assert [t for t, _ in _voice(panel.events)] == [t - 0.5 for t in CUE_TIMES]
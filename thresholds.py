@@ -0,0 +1,162 @@
+# thresholds.py
+"""辅助线阈值表。
+
+容错方案与毒圈伤害可以由用户 JSON 文件覆盖（默认取 config 中的 ZONE_DAMAGE / TOLERANCE_MAP），
+加载时校验，并一次性编译成以 (容错模式, 圈等级) 为键的扁平表，绘制时 O(1) 读取。
+文件用 QFileSystemWatcher 监视，修改后原地重载，无需重启。
+
+文件格式（tolerance_profiles.json，位于用户配置目录）：
+    {
+      "zone_damage": {"1": 0.4, "2": 0.6, ...},          // 可省略
+      "profiles": {
+        "正常": {"stages_back": [0, 2], "extra": 2},    // 容错 = Σ 伤害(等级 - k) + extra
+        "老师傅": {"extra": 0}
+      }
+    }
+"""
+import json
+import logging
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, pyqtSignal
+
+from app_paths import user_dir
+from config import ZONE_DAMAGE, TOLERANCE_MAP
+
+log = logging.getLogger(__name__)
+
+PROFILE_FILE = "tolerance_profiles.json"
+ZONE_LEVELS = range(1, 10)
+
+
+class ProfileError(ValueError):
+    """容错方案文件内容不合法。"""
+
+
+def calculate_thresholds(zl, x, damage):
+    """(无药线, 一级线, 二级线|None, 容错线)，均为血量百分比。"""
+    base = damage.get(zl, 0)
+    p1 = damage.get(max(1, zl - 1), 0)
+    p2 = damage.get(max(1, zl - 2), 0)
+    return (
+        base * 6 + x,
+        (base + p2) * 6 + x,
+        (base + p1 + p2) * 6 + x if zl < 8 else None,
+        x,
+    )
+
+
+def _profile_fn(spec, damage):
+    """JSON 方案 → 等级到容错值的函数。"""
+    back = spec.get("stages_back", [])
+    extra = spec.get("extra", 0)
+    return lambda lvl: sum(damage.get(max(1, lvl - k), 0) for k in back) + extra
+
+
+def validate(data):
+    """校验并返回 (伤害表, {模式名: 等级 → 容错值})。"""
+    if not isinstance(data, dict):
+        raise ProfileError("顶层必须是对象")
+
+    damage = dict(ZONE_DAMAGE)
+    raw_damage = data.get("zone_damage", {})
+    if not isinstance(raw_damage, dict):
+        raise ProfileError("zone_damage 必须是对象")
+    for k, v in raw_damage.items():
+        try:
+            lvl = int(k)
+        except ValueError:
+            raise ProfileError(f"zone_damage 的键必须是等级数字：{k!r}") from None
+        if lvl not in ZONE_LEVELS or not isinstance(v, (int, float)) or v < 0:
+            raise ProfileError(f"zone_damage[{k}] 不合法：{v!r}")
+        damage[lvl] = float(v)
+
+    profiles = data.get("profiles")
+    if not isinstance(profiles, dict) or not profiles:
+        raise ProfileError("profiles 必须是非空对象")
+    fns = {}
+    for name, spec in profiles.items():
+        if not isinstance(spec, dict):
+            raise ProfileError(f"方案 {name!r} 必须是对象")
+        back = spec.get("stages_back", [])
+        extra = spec.get("extra", 0)
+        if not isinstance(back, list) or not all(isinstance(k, int) and 0 <= k < 9 for k in back):
+            raise ProfileError(f"方案 {name!r} 的 stages_back 必须是 0‑8 的整数列表")
+        if not isinstance(extra, (int, float)):
+            raise ProfileError(f"方案 {name!r} 的 extra 必须是数字")
+        fns[name] = _profile_fn(spec, damage)
+    return damage, fns
+
+
+def compile_table(damage, profiles):
+    """{(模式, 等级): 阈值元组}"""
+    table = {}
+    for name, x in profiles.items():
+        for zl in ZONE_LEVELS:
+            table[(name, zl)] = calculate_thresholds(zl, x(zl) if callable(x) else x, damage)
+    return table
+
+
+class ThresholdStore(QObject):
+    """当前生效的阈值表；文件变化时重载并发出 changed。"""
+
+    changed = pyqtSignal()
+
+    def __init__(self, path=None, parent=None):
+        super().__init__(parent)
+        self.path = path or os.path.join(user_dir("config"), PROFILE_FILE)
+        self.version = 0
+        self.error = None
+        self.from_file = False      # 当前表是否来自用户文件
+        self._watcher = None
+        self._set(dict(ZONE_DAMAGE), dict(TOLERANCE_MAP))
+        self.reload()
+
+    def _set(self, damage, profiles):
+        self.zone_damage = damage
+        self.modes = list(profiles)
+        self.table = compile_table(damage, profiles)
+        self.version += 1
+
+    def lookup(self, zl, mode):
+        """(无药线, 一级线, 二级线|None, 容错线)；未知模式返回 None。"""
+        return self.table.get((mode, zl))
+
+    def reload(self) -> bool:
+        """读取用户文件；文件不存在时使用默认表。内容不合法时保留原表并返回 False。"""
+        if not os.path.isfile(self.path):
+            self.error = None
+            if self.from_file:
+                self.from_file = False
+                self._set(dict(ZONE_DAMAGE), dict(TOLERANCE_MAP))
+            return True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                damage, profiles = validate(json.load(f))
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            log.warning("容错方案文件无效（%s）：%s", self.path, e)
+            return False
+        self.error = None
+        self.from_file = True
+        self._set(damage, profiles)
+        return True
+
+    # ---- 热重载 ----
+    def watch(self):
+        if self._watcher is not None:
+            return
+        self._watcher = QFileSystemWatcher(self)
+        # 同时监视目录：许多编辑器以“写临时文件再替换”的方式保存
+        self._watcher.addPath(os.path.dirname(self.path))
+        if os.path.isfile(self.path):
+            self._watcher.addPath(self.path)
+        self._watcher.fileChanged.connect(self._on_fs_change)
+        self._watcher.directoryChanged.connect(self._on_fs_change)
+
+    def _on_fs_change(self, _path):
+        if os.path.isfile(self.path) and self.path not in self._watcher.files():
+            self._watcher.addPath(self.path)
+        old = self.table
+        if self.reload() and self.table != old:
+            self.changed.emit()
@@ -0,0 +1,80 @@
+# timeline.py
+from bisect import bisect_right
+from collections import namedtuple
+
+from config import ZONE_TIMINGS
+
+COUNTDOWN, SHRINKING = "countdown", "shrinking"
+
+# index: 相位序号；stage_idx: 0‑based 阶段索引；zone_level: 圈等级；remaining: 本相位剩余秒数
+TimelineState = namedtuple("TimelineState", "stage_idx zone_level phase remaining index")
+
+
+class MatchTimeline:
+    """整局时间轴（不依赖 Qt）。
+
+    由 ZONE_TIMINGS 一次性展开成按时间排序的相位数组，时间偏移以“阶段1倒计时开始”为 0。
+    同步只是确定这个零点对应的时钟读数（anchor），之后任意时刻的状态都用二分查找得出，
+    前后跳转与重新锚定都不需要回放中间状态。
+    """
+
+    def __init__(self, timings=ZONE_TIMINGS):
+        self.timings = tuple(timings)
+        self.starts, self.ends = [], []
+        self.stage_idx, self.zone_levels, self.phases = [], [], []
+
+        t = 0.0
+        for idx, (level, wait, shrink) in enumerate(self.timings):
+            for phase, dur in ((COUNTDOWN, wait), (SHRINKING, shrink)):
+                self.starts.append(t)
+                t += dur
+                self.ends.append(t)
+                self.stage_idx.append(idx)
+                self.zone_levels.append(level)
+                self.phases.append(phase)
+
+        self.duration = t
+        self.anchor = None
+
+    def __len__(self):
+        return len(self.ends)
+
+    # ---- 锚定 ----
+    @property
+    def is_synced(self) -> bool:
+        return self.anchor is not None
+
+    def sync(self, stage_idx: int, countdown_seconds: float, now: float):
+        """“now 时刻距阶段 stage_idx 开始缩圈还剩 countdown_seconds 秒”。"""
+        self.anchor = now - (self.ends[self.index_of(stage_idx, COUNTDOWN)] - countdown_seconds)
+
+    def shift(self, seconds: float):
+        """整体前移（正数）或后退（负数）若干秒。"""
+        if self.anchor is not None:
+            self.anchor -= seconds
+
+    def clear(self):
+        self.anchor = None
+
+    # ---- 查询 ----
+    def index_of(self, stage_idx: int, phase: str) -> int:
+        return stage_idx * 2 + (phase == SHRINKING)
+
+    def offset(self, now: float) -> float:
+        return now - self.anchor
+
+    def time_at(self, offset: float) -> float:
+        """时间轴偏移 → 时钟读数。"""
+        return self.anchor + offset
+
+    def state_at(self, now: float):
+        """返回 now 时刻的 TimelineState；整局结束后返回 None。"""
+        return self.state_at_offset(self.offset(now))
+
+    def state_at_offset(self, offset: float):
+        i = bisect_right(self.ends, offset)
+        if i >= len(self.ends):
+            return None
+        return TimelineState(
+            self.stage_idx[i], self.zone_levels[i], self.phases[i], self.ends[i] - offset, i
+        )
@@ -3,15 +3,16 @@ from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QComboBox, QHBoxLayout,
     QPushButton, QLineEdit, QMessageBox, QCheckBox, QSlider,
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QGuiApplication
+from PyQt5.QtCore import Qt, QEvent
+from PyQt5.QtGui import QFont
 
-from config import RES_GEOMETRY, TOLERANCE_MAP, ZONE_TIMINGS
-from voice import VoiceManager
-from zone_timer import ZoneTimer
+from config import RES_GEOMETRY, ZONE_TIMINGS
+from match_state import MatchState
+import startup_timing
 
 
-class ControlPanel(QWidget):
+class ControlPanel(QWidget, MatchState):
+    """控制面板：MatchState 的状态与操作 + 同步输入与选项控件。"""
 
     def __init__(self):
         super().__init__()
@@ -58,34 +59,17 @@ class ControlPanel(QWidget):
             }
         """)
 
-        # --- 状态 ---
-        self.zone_level = 1
-        self.tolerance_mode = "正常"
-        self.resolution_text = "2560x1440 (2K)"
-        self.guides_enabled = True
+        startup_timing.mark("面板：样式表")
 
-        # --- 组件 ---
-        self.voice = VoiceManager(self)
-        self.zone_timer = ZoneTimer(self)
+        self._base_font = base_font
+        self._options_built = False
+        self._init_match_state()
 
-        layout = QVBoxLayout(self)
+        # 首帧只构建同步所需的控件，其余选项在 finish_startup() 中补齐
+        layout = self._layout = QVBoxLayout(self)
         layout.setContentsMargins(40, 40, 40, 40)
         layout.setSpacing(26)
 
-        # 分辨率
-        row1 = QHBoxLayout()
-        row1.addWidget(QLabel("分辨率："))
-        self.res_combo = QComboBox(); self.res_combo.setFont(base_font); self.res_combo.setFixedHeight(60)
-        self.res_combo.addItems(RES_GEOMETRY.keys())
-        # 启动时自动检测并选中
-        autodetected = self.auto_detect_resolution()
-        if autodetected:
-            self.resolution_text = autodetected
-        self.res_combo.setCurrentText(self.resolution_text)
-        self.res_combo.currentTextChanged.connect(self.update_resolution)
-        row1.addWidget(self.res_combo)
-        layout.addLayout(row1)
-
         # 阶段选择
         self.row_stage = QHBoxLayout()
         self.row_stage.addWidget(QLabel("选择阶段："))
@@ -103,15 +87,64 @@ class ControlPanel(QWidget):
         self.row_timer.addWidget(self.second_input); self.row_timer.addWidget(QLabel("秒"))
         layout.addLayout(self.row_timer)
 
+        # 同步按钮
+        btn_row = QHBoxLayout()
+        self.sync_btn = QPushButton("同步"); self.sync_btn.setFont(QFont("微软雅黑", 22)); self.sync_btn.setFixedHeight(64)
+        self.sync_btn.clicked.connect(self.sync)
+        btn_row.addWidget(self.sync_btn)
+
+        self.resync_btn = QPushButton("重新同步"); self.resync_btn.setFont(QFont("微软雅黑", 22)); self.resync_btn.setFixedHeight(64)
+        self.resync_btn.clicked.connect(self.resync); self.resync_btn.hide()
+        btn_row.addWidget(self.resync_btn)
+        layout.addLayout(btn_row)
+
+        # 信息
+        self.info_label = QLabel("当前阶段：未同步"); self.info_label.setFont(QFont("微软雅黑", 20, QFont.Bold))
+        layout.addWidget(self.info_label, alignment=Qt.AlignCenter)
+
+        self._stage_widgets = [w for i in range(self.row_stage.count()) if (w := self.row_stage.itemAt(i).widget())]
+        self._timer_widgets = [w for i in range(self.row_timer.count()) if (w := self.row_timer.itemAt(i).widget())]
+        startup_timing.mark("面板：同步控件")
+
+    def finish_startup(self):
+        """首帧之后补齐其余选项，并在后台加载语音。可重复调用。"""
+        if self._options_built:
+            return
+        self._options_built = True
+        base_font = self._base_font
+        layout = self._layout
+
+        # 分辨率
+        row1 = QHBoxLayout()
+        row1.addWidget(QLabel("分辨率："))
+        self.res_combo = QComboBox(); self.res_combo.setFont(base_font); self.res_combo.setFixedHeight(60)
+        self.res_combo.addItems(RES_GEOMETRY.keys())
+        if self.resolution_text not in RES_GEOMETRY:
+            self.res_combo.addItem(self.resolution_text)     # 表外分辨率按公式计算
+        self.res_combo.setCurrentText(self.resolution_text)
+        self.res_combo.currentTextChanged.connect(self.update_resolution)
+        row1.addWidget(self.res_combo)
+
+        # 多显示器时可选择覆盖层所在屏幕
+        self.screen_combo = QComboBox(); self.screen_combo.setFont(base_font); self.screen_combo.setFixedHeight(60)
+        self.screen_combo.addItems([sc.name() for sc in self.screens.screens()])
+        self.screen_combo.setCurrentText(self.screens.find(self.screen_name).name())
+        self.screen_combo.currentTextChanged.connect(self.set_overlay_screen)
+        self.screen_combo.setVisible(self.screen_combo.count() > 1)
+        row1.addWidget(self.screen_combo)
+        layout.insertLayout(0, row1)
+
         # 容错
         row4 = QHBoxLayout()
         row4.addWidget(QLabel("容错模式："))
         self.mode_combo = QComboBox(); self.mode_combo.setFont(base_font); self.mode_combo.setFixedHeight(60)
-        self.mode_combo.addItems(list(TOLERANCE_MAP.keys()))
+        self.mode_combo.addItems(self.thresholds.modes)
         self.mode_combo.setCurrentText(self.tolerance_mode)
         self.mode_combo.currentTextChanged.connect(self.on_mode_changed)
         row4.addWidget(self.mode_combo)
-        layout.addLayout(row4)
+        layout.insertLayout(3, row4)
+        self.thresholds.changed.connect(self.on_thresholds_changed)
+        self.thresholds.watch()
 
         # 语音 & 音量
         row5 = QHBoxLayout()
@@ -130,76 +163,53 @@ class ControlPanel(QWidget):
         self.volume_slider.setFixedWidth(200)
         self.volume_slider.valueChanged.connect(lambda v: self.voice.set_volume(v / 100.0))
         row5.addWidget(self.volume_slider)
-        layout.addLayout(row5)
+        layout.insertLayout(4, row5)
 
         # 其它选项
         row6 = QHBoxLayout()
         self.guides_chk = QCheckBox("启用辅助线")
-        self.guides_chk.setChecked(True)
+        self.guides_chk.setChecked(self.guides_enabled)
         self.guides_chk.stateChanged.connect(self.on_guides_toggled)
         row6.addWidget(self.guides_chk)
 
+        self.hud_chk = QCheckBox("覆盖层倒计时")
+        self.hud_chk.setChecked(self.countdown_hud)
+        self.hud_chk.stateChanged.connect(lambda st: self.set_countdown_hud(st == Qt.Checked))
+        row6.addWidget(self.hud_chk)
+
         self.auto_min_chk = QCheckBox("同步后自动最小化"); self.auto_min_chk.setChecked(False)
         row6.addWidget(self.auto_min_chk)
-        layout.addLayout(row6)
+        layout.insertLayout(5, row6)
+        startup_timing.mark("面板：其余选项")
 
-        # 同步按钮
-        btn_row = QHBoxLayout()
-        self.sync_btn = QPushButton("同步"); self.sync_btn.setFont(QFont("微软雅黑", 22)); self.sync_btn.setFixedHeight(64)
-        self.sync_btn.clicked.connect(self.sync)
-        btn_row.addWidget(self.sync_btn)
+        self.voice.preload()
 
-        self.resync_btn = QPushButton("重新同步"); self.resync_btn.setFont(QFont("微软雅黑", 22)); self.resync_btn.setFixedHeight(64)
-        self.resync_btn.clicked.connect(self.resync); self.resync_btn.hide()
-        btn_row.addWidget(self.resync_btn)
-        layout.addLayout(btn_row)
+    # -------- 窗口状态 --------
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # 最小化期间计时器只在关键时刻唤醒，恢复时立刻刷新显示
+        if event.type() == QEvent.WindowStateChange:
+            self.zone_timer.wake()
 
-        # 信息
-        self.info_label = QLabel("当前阶段：未同步"); self.info_label.setFont(QFont("微软雅黑", 20, QFont.Bold))
-        layout.addWidget(self.info_label, alignment=Qt.AlignCenter)
-
-        self._stage_widgets = [w for i in range(self.row_stage.count()) if (w := self.row_stage.itemAt(i).widget())]
-        self._timer_widgets = [w for i in range(self.row_timer.count()) if (w := self.row_timer.itemAt(i).widget())]
-
-    # -------- 自动分辨率检测 --------
-    def auto_detect_resolution(self) -> str:
-        """返回匹配到的 RES_GEOMETRY key，否则返回空字符串。"""
-        screen = QGuiApplication.primaryScreen()
-        if not screen:
-            return ""
-        g = screen.geometry()
-        w, h = g.width(), g.height()
-
-        # 以 "WxH" 前缀匹配 keys
-        wanted = f"{w}x{h}"
-        for key in RES_GEOMETRY.keys():
-            if key.startswith(wanted):
-                return key
-        # 没有精确匹配时不改动
-        return ""
+    def showEvent(self, event):
+        super().showEvent(event)
+        # 显示前已恢复的会话：此前按隐藏状态排程，显示后立刻开始逐秒刷新
+        self.zone_timer.wake()
 
     # -------- 交互逻辑 --------
-    def update_resolution(self, text: str):
-        self.resolution_text = text
-        if hasattr(self, "linked_overlay"):
-            self.linked_overlay.setGeometry(*RES_GEOMETRY[self.resolution_text])
-
     def on_mode_changed(self, text: str):
-        self.tolerance_mode = text
+        self.set_mode(text)
         if text == "老师傅":
             QMessageBox.information(self, "温馨提示", "仅为理论极限，切勿卡线打药。")
-        if hasattr(self, "linked_overlay"):
-            self.linked_overlay.update()
 
     def on_guides_toggled(self, state):
-        self.guides_enabled = (state == Qt.Checked)
-        if hasattr(self, "linked_overlay"):
-            self.linked_overlay.update()
+        self.set_guides(state == Qt.Checked)
 
-    def sync(self):
-        # 开始前先清理任何遗留的语音排程，避免串音
-        self.voice.reset()
+    def set_status_text(self, text: str):
+        """面板上的状态文字（计时器只在面板可见时调用）。"""
+        self.info_label.setText(text)
 
+    def sync(self):
         try:
             m = int(self.minute_input.text()); s = int(self.second_input.text())
         except ValueError:
@@ -212,30 +222,42 @@ class ControlPanel(QWidget):
             QMessageBox.warning(self, "倒计时过长", f"阶段 {stage_idx + 1} 最大等待为 {mm} 分 {ss:02d} 秒！")
             return
 
-        self.zone_timer.start(stage_idx, total)
-
-        for w in self._stage_widgets + self._timer_widgets:
-            w.setVisible(False)
-        self.sync_btn.hide(); self.resync_btn.show()
+        self.apply_sync(stage_idx, total)
 
+    def apply_sync(self, stage_idx: int, countdown_seconds: float):
+        self.finish_startup()
+        super().apply_sync(stage_idx, countdown_seconds)
         if self.auto_min_chk.isChecked():
             self.showMinimized()
 
-        self.is_synced = True
-        if hasattr(self, "linked_overlay"):
-            self.linked_overlay.update()
+    def selected_stage(self) -> int:
+        return self.stage_combo.currentIndex()
 
-    def resync(self):
-        # 立刻停止计时与所有语音内部倒计时
-        self.zone_timer.stop()
-        self.voice.reset()
+    # -------- 状态 → 控件 --------
+    def _show_option(self, name: str, value):
+        """把界面之外的修改同步到控件，不触发控件自身的信号。"""
+        if not self._options_built:
+            return
+        widget = {"mode": self.mode_combo, "modes": self.mode_combo,
+                  "guides": self.guides_chk, "screen": self.screen_combo}[name]
+        widget.blockSignals(True)
+        if name == "guides":
+            widget.setChecked(value)
+        elif name == "modes":
+            if value != [widget.itemText(i) for i in range(widget.count())]:
+                widget.clear()
+                widget.addItems(value)
+            widget.setCurrentText(self.tolerance_mode)
+        else:
+            widget.setCurrentText(value)
+        widget.blockSignals(False)
+
+    def _show_synced(self):
+        for w in self._stage_widgets + self._timer_widgets:
+            w.setVisible(False)
+        self.sync_btn.hide(); self.resync_btn.show()
 
+    def _show_unsynced(self):
         for w in self._stage_widgets + self._timer_widgets:
             w.setVisible(True)
         self.resync_btn.hide(); self.sync_btn.show()
-
-        self.info_label.setText("当前阶段：未同步")
-
-        self.is_synced = False
-        if hasattr(self, "linked_overlay"):
-            self.linked_overlay.update()
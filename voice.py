@@ -1,123 +1,234 @@
 # voice.py
-import os
-import sys
-import sip
-from PyQt5.QtCore import QObject, QTimer, QUrl
-from PyQt5.QtMultimedia import QSoundEffect
+import logging
+import time
+from PyQt5.QtCore import QCoreApplication, QObject, QThread, Qt, pyqtSignal, pyqtSlot
 
+from app_paths import resource_path
+from config import VOICE_CUES
+from perf_stats import STATS
+from sound_bank import SoundBank, cue_key, find_voice_file, open_voice_pack, wav_lead_in
 
-def resource_path(relative_path: str) -> str:
-    """兼容 PyInstaller 的资源路径"""
-    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
-    return os.path.join(base_path, relative_path)
+
+# 提示表里用到的全部语音，加载时据此报告缺失文件
+VOICE_FILES = tuple(dict.fromkeys(cue[3] for cue in VOICE_CUES))
+
+log = logging.getLogger(__name__)
+
+MAX_COMMAND_LAG = 1.0   # 播放指令在队列里积压超过此秒数即丢弃，不再“迟到”播报
+DEFAULT_START_LAG = 0.03    # 尚未实测时假定的“投递 → 开始播放”耗时（秒）
+LAG_SMOOTHING = 0.3         # 实测耗时的指数平滑系数
+
+
+class AudioWorker(QObject):
+    """运行在独立音频线程上的播放端。
+
+    QtMultimedia 的导入、音效池的建立、QSoundEffect 的 play/stop 全部在此线程完成，
+    音频设备切换或混音器卡顿不会阻塞 GUI 线程上的计时与绘制。
+    """
+    MAX_ACTIVE = 4    # 同时在播的语音上限
+
+    playback_started = pyqtSignal(str, float)   # 文件名, 开始播放时刻（单调时钟）
+    lead_ins_ready = pyqtSignal(dict)           # {cue_key: 开头静音秒数}，加载时测出
+
+    def __init__(self, voice_dir, owner):
+        super().__init__()
+        self.voice_dir = voice_dir
+        self.owner = owner        # VoiceManager，读取其 generation 判断指令是否已被取消
+        self.bank = None
+        self.unavailable = False
+
+        self._effects = []        # [QSoundEffect]，按开始播放的先后排列
+        self._volume = 1.0
+
+    @pyqtSlot()
+    def load(self):
+        if self.bank is None and not self.unavailable:
+            # 语音包校验与 WAV 读取都在本线程完成，GUI 线程上的 latency() 只查表
+            self.lead_ins_ready.emit(self._measure_lead_ins())
+            bank = SoundBank(self.voice_dir, expected=VOICE_FILES, parent=self)
+            try:
+                bank.load()
+            except ImportError as e:
+                # 缺少 QtMultimedia 或音频后端时降级，计时与覆盖层照常工作
+                log.warning("语音不可用：%s", e)
+                self.unavailable = True
+                return None
+            self.bank = bank
+            for eff in self.bank.effects():
+                eff.setVolume(self._volume)
+                eff.playingChanged.connect(self._on_playing_changed)
+        return self.bank
+
+    def _measure_lead_ins(self):
+        pack = open_voice_pack(self.voice_dir)
+        lead_ins = {}
+        for filename in VOICE_FILES:
+            key = cue_key(filename)
+            if pack is not None and key in pack:
+                lead_ins[key] = pack.lead_in(key)
+            else:
+                path = find_voice_file(self.voice_dir, filename)
+                lead_ins[key] = wav_lead_in(path) if path else 0.0
+        return lead_ins
+
+    @pyqtSlot(str, object, int, float)
+    def handle(self, cmd, arg, generation, queued_at):
+        if cmd == "cancel":
+            self._cancel()
+        elif cmd == "volume":
+            self._volume = arg
+            if self.bank is not None:
+                for eff in self.bank.effects():
+                    eff.setVolume(arg)
+        elif generation != self.owner.generation:
+            return      # reset() 之前排队的播报
+        elif cmd == "play":
+            if time.monotonic() - queued_at <= MAX_COMMAND_LAG:
+                self._play(arg)
+
+    def _cancel(self):
+        for eff in self._effects:
+            eff.stop()
+        self._effects.clear()
+
+    def _play(self, filename: str):
+        bank = self.load()
+        eff = bank.acquire(filename) if bank is not None else None
+        if eff is None:
+            return
+
+        # 清掉已播完的，并限制同时在播的数量
+        self._effects = [e for e in self._effects if e is not eff and e.isPlaying()]
+        while len(self._effects) >= self.MAX_ACTIVE:
+            self._effects.pop(0).stop()
+
+        eff.setVolume(self._volume)
+        eff.setProperty("cue", filename)
+        self._effects.append(eff)
+        eff.play()
+
+    @pyqtSlot()
+    def _on_playing_changed(self):
+        eff = self.sender()
+        if eff is not None and eff.isPlaying():
+            self.playback_started.emit(eff.property("cue") or "", time.monotonic())
 
 
 class VoiceManager(QObject):
+    """语音播报（GUI 线程侧）。
+
+    只负责把播报指令投递到 AudioWorker 所在的音频线程，自身从不触碰音频设备。
+    音频线程在 preload()（首帧之后）或首次播报时启动。
+    """
+
+    _command = pyqtSignal(str, object, int, float)     # 指令, 参数, 代次, 投递时刻
+    playback_started = pyqtSignal(str, float)
+    cue_started = pyqtSignal(str, float)    # 文件名, 语音内容实际响起比计划晚了多少毫秒（负数为提前）
+    latency_changed = pyqtSignal()      # 开头静音测出后发出，已排程的提示需按新的提前量重排
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.voice_dir = resource_path("voice")
-
-        # 正在播放的音效与延迟任务
-        self._effects = set()     # {QSoundEffect}
-        self._delayed = []        # [QTimer]
+        self.generation = 0       # reset() 时递增，音频线程据此丢弃作废的指令
+        self._thread = None
+        self._worker = None
 
         self._enabled = True
         self._volume = 1.0
 
+        self._posted = {}         # {cue_key: 最近一次投递时刻}
+        self._start_lag = {}      # {cue_key: 平滑后的“投递 → 开始播放”耗时}
+        self._lead_in = {}        # {cue_key: 音频开头静音时长}，音频线程加载时测出
+        self._speech_at = {}      # {cue_key: 语音内容应当响起的时刻}
+        self.playback_started.connect(self._on_playback_started)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    # ------------ 音频线程 ------------
+    def preload(self):
+        """启动音频线程并在其中加载 QtMultimedia 与音效池。"""
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        self._thread = QThread(self)
+        self._thread.setObjectName("audio")
+        self._worker = AudioWorker(self.voice_dir, self)
+        self._worker.moveToThread(self._thread)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._thread.started.connect(self._worker.load)
+        self._command.connect(self._worker.handle, Qt.QueuedConnection)
+        self._worker.playback_started.connect(self.playback_started)
+        self._worker.lead_ins_ready.connect(self._on_lead_ins)
+        self._thread.start()
+        self._post("volume", self._volume)
+
+    def shutdown(self, timeout_ms=1000):
+        """停止所有播报并结束音频线程。"""
+        if self._thread is None:
+            return
+        self.reset()
+        self._thread.quit()
+        self._thread.wait(timeout_ms)
+        self._thread = self._worker = None
+
+    def _post(self, cmd, arg=None):
+        self._ensure_worker()
+        self._command.emit(cmd, arg, self.generation, time.monotonic())
+
     # ------------ 外部控制 ------------
     def set_enabled(self, enabled: bool):
         self._enabled = bool(enabled)
 
     def set_volume(self, volume01: float):
         self._volume = max(0.0, min(1.0, volume01))
-        for eff in list(self._effects):
-            try:
-                if not sip.isdeleted(eff):
-                    eff.setVolume(self._volume)
-            except Exception:
-                pass
+        if self._worker is not None:
+            self._post("volume", self._volume)
 
     def reset(self):
-        """立即停止所有正在播放或排程中的语音，并安全清理资源。"""
-        # 1) 取消所有延迟任务（如“10秒倒计时”的预约）
-        for t in self._delayed:
-            try:
-                t.stop()
-                t.deleteLater()
-            except Exception:
-                pass
-        self._delayed.clear()
-
-        # 2) 停止/删除所有正在播放的音效
-        for eff in list(self._effects):
-            try:
-                if sip.isdeleted(eff):
-                    continue
-                # 断开信号，防止回调里再次触发清理
-                try:
-                    eff.playingChanged.disconnect()
-                except Exception:
-                    pass
-                eff.stop()
-                eff.deleteLater()
-            except Exception:
-                pass
-            finally:
-                if eff in self._effects:
-                    self._effects.remove(eff)
-
-    # ------------ 业务播报 ------------
-    def play_pre_stage(self, next_stage: int):
-        """缩圈中：距离进入下一阶段还剩 8 秒的提示。"""
-        if not (5 <= next_stage <= 9):
-            return
-        fname = (
-            "剩余8秒进入阶段9超距锁定.wav"
-            if next_stage == 9 else
-            f"剩余8秒进入阶段{next_stage}.wav"
-        )
-        self._play(fname)
-
-    def play_stage9_start(self):
-        """阶段9开始的提示，同时预约 20 秒后播放“10秒倒计时”。"""
-        self._play("阶段9锁定开始.wav")
-
-        timer = QTimer(self)
-        timer.setSingleShot(True)
-        timer.setInterval(20_000)
-        timer.timeout.connect(lambda: self._play("10秒倒计时.wav"))
-        timer.start()
-        self._delayed.append(timer)
-
-    # ------------ 底层播放 ------------
-    def _play(self, filename: str):
+        """立即停止所有正在播放或排程中的语音：作废已排队的指令，并向音频线程发一条取消消息。"""
+        self.generation += 1
+        if self._worker is not None:
+            self._post("cancel")
+
+    # ------------ 播报 ------------
+    def play(self, filename: str, speech_at: float = None):
+        """播放一条语音。speech_at 为语音内容应当响起的单调时钟时刻，开始播放后据此经 cue_started 报告偏差。"""
         if not self._enabled:
             return
-        path = os.path.join(self.voice_dir, filename)
-        if not os.path.isfile(path):
+        key = cue_key(filename)
+        self._posted[key] = time.monotonic()
+        if speech_at is not None:
+            self._speech_at[key] = speech_at
+        self._post("play", filename)
+
+    def latency(self, filename: str) -> float:
+        """该语音的输出延迟估计：实测开始播放耗时 + 开头静音。提示据此提前触发。
+
+        不做任何磁盘 IO：开头静音在音频线程加载完成前按 0 计，测出后经 latency_changed 通知重排。
+        """
+        key = cue_key(filename)
+        return self._start_lag.get(key, DEFAULT_START_LAG) + self._lead_in.get(key, 0.0)
+
+    @pyqtSlot(dict)
+    def _on_lead_ins(self, lead_ins):
+        self._lead_in.update(lead_ins)
+        self.latency_changed.emit()
+
+    def _on_playback_started(self, filename, t):
+        key = cue_key(filename)
+        posted = self._posted.pop(key, None)
+        if posted is None:
             return
-
-        eff = QSoundEffect(self)
-        eff.setSource(QUrl.fromLocalFile(path))
-        eff.setLoopCount(1)
-        eff.setVolume(self._volume)
-
-        # 用 playingChanged 监听结束并做一次性清理（避免二次 deleteLater）
-        def _on_playing_changed():
-            try:
-                if sip.isdeleted(eff):
-                    return
-                if not eff.isPlaying():
-                    if eff in self._effects:
-                        self._effects.remove(eff)
-                    try:
-                        eff.playingChanged.disconnect(_on_playing_changed)
-                    except Exception:
-                        pass
-                    eff.deleteLater()
-            except Exception:
-                pass
-
-        eff.playingChanged.connect(_on_playing_changed)
-        self._effects.add(eff)
-        eff.play()
+        speech_at = self._speech_at.pop(key, None)
+        if speech_at is not None:
+            late_ms = (t + self._lead_in.get(key, 0.0) - speech_at) * 1000
+            if STATS.enabled:
+                STATS.cue.append(late_ms)
+            self.cue_started.emit(filename, late_ms)
+        lag = t - posted
+        prev = self._start_lag.get(key)
+        self._start_lag[key] = lag if prev is None else prev + LAG_SMOOTHING * (lag - prev)
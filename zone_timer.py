@@ -1,18 +1,42 @@
 # zone_timer.py
-from PyQt5.QtCore import QObject, QTimer, QDateTime
+import math
+import time
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
 from config import ZONE_TIMINGS
+from timeline import MatchTimeline, COUNTDOWN
+from cue_schedule import CueQueue
+from perf_stats import STATS
+
+MINIMIZED_MAX_SLEEP = 30.0  # 最小化时的最长休眠（秒），仅作兜底
 
 
 class ZoneTimer(QObject):
-    """核心计时逻辑。"""
+    """核心计时逻辑。
+
+    阶段推算全部交给 MatchTimeline，这里只负责按单调时钟读取当前状态、驱动界面与语音。
+    每次唤醒后只为下一个有意义的时刻（显示秒数变化、语音播报、相位切换）设置一次单发定时器；
+    秒数同时交给覆盖层的倒计时 HUD 与面板文字；面板隐藏时不碰面板，
+    若覆盖层也不显示倒计时，则不按秒唤醒，只在播报与相位切换时唤醒。
 
-    def __init__(self, panel):
+    clock 为返回秒数的可调用对象，默认 time.monotonic；模拟时换成虚拟时钟。
+    autorun=False 时不启动 Qt 定时器，由外部在 next_deadline 到达时调用 _on_timeout()。
+    """
+
+    finished = pyqtSignal()     # 整局（阶段 10）结束
+
+    def __init__(self, panel, clock=None, autorun=True):
         super().__init__(panel)
         self.panel = panel
+        self._clock = clock or time.monotonic
+        self.autorun = autorun
+        self.timeline = MatchTimeline(ZONE_TIMINGS)
+        self.cues = CueQueue(self.timeline, latency=panel.voice.latency)
 
         self._qt_timer = QTimer(self)
-        self._qt_timer.setInterval(200)
-        self._qt_timer.timeout.connect(self._tick)
+        self._qt_timer.setSingleShot(True)
+        self._qt_timer.setTimerType(Qt.PreciseTimer)
+        self._qt_timer.timeout.connect(self._on_timeout)
 
         self._reset_state()
 
@@ -25,96 +49,181 @@ class ZoneTimer(QObject):
             countdown_seconds: 距离开始缩圈的秒数。
         """
         self._reset_state()
-        self.sync_index = stage_idx
-        self.zone_level = ZONE_TIMINGS[stage_idx][0]
-        self.panel.zone_level = self.zone_level  # Mirror to UI
+        now = self._clock()
+        self.timeline.sync(stage_idx, countdown_seconds, now)
+        self.cues.arm(self.timeline.offset(now))
+        self._tick()
+
+    def resume(self, anchor: float, fired=()):
+        """按已知零点恢复计时（崩溃后恢复会话），fired 中的语音不再播报。"""
+        self._reset_state()
+        self.timeline.anchor = anchor
+        self.cues.fired.update(fired)
+        self.cues.arm(self.timeline.offset(self._clock()))
+        self._tick()
 
-        self.remaining_seconds = countdown_seconds
-        self.sync_time = QDateTime.currentDateTime()
+    def shift(self, seconds: float, save: bool = True):
+        """将时间轴整体前移/后退若干秒，不回放中间状态。
 
-        if hasattr(self.panel, "linked_overlay"):
-            self.panel.linked_overlay.update()
+        零点变了，会话文件随之重写；save=False 时由调用方自行节流（如漂移的平滑校正）。
+        """
+        if not self.timeline.is_synced:
+            return
+        self.timeline.shift(seconds)
+        self.cues.arm(self.timeline.offset(self._clock()))
+        self._qt_timer.stop()
         self._tick()
+        if save:
+            self._save_session()
 
-        self._qt_timer.start()
+    def rearm(self):
+        """提示的提前量变化后（如语音开头静音刚测出），按当前时刻重建提示队列。"""
+        if not self.timeline.is_synced or self.next_deadline is None:
+            return
+        self.cues.arm(self.timeline.offset(self._clock()))
+        self._qt_timer.stop()
+        self._tick()
 
     def stop(self):
         self._qt_timer.stop()
+        self.next_deadline = None
+
+    def wake(self):
+        """立即重新计算并重排下一次唤醒（如面板从最小化恢复时）。"""
+        if self.timeline.is_synced and self.next_deadline is not None:
+            self._qt_timer.stop()
+            self._tick()
 
     def reset(self):
         """完全复位：停止计时并清空内部状态。"""
         self.stop()
         self._reset_state()
+        self._show_countdown(None)
         # 同步面板显示
         self.panel.zone_level = 1
         if hasattr(self.panel, "linked_overlay"):
-            self.panel.linked_overlay.update()
+            self.panel.linked_overlay.refresh()
+
+    def state(self):
+        """当前的 TimelineState；未同步或已结束时为 None。"""
+        if not self.timeline.is_synced:
+            return None
+        return self.timeline.state_at(self._clock())
+
+    @property
+    def hp_percent(self):
+        """血条采样得到的当前血量（未启用采样时为 None）。"""
+        return getattr(self.panel, "hp_percent", None)
 
     # ---- 内部逻辑 ----
+    def _on_timeout(self):
+        if STATS.enabled and self.next_deadline is not None:
+            STATS.tick.append((self._clock() - self.next_deadline) * 1000)
+        self._tick()
+
     def _tick(self):
-        if not self.sync_time:
+        if not self.timeline.is_synced:
+            return
+
+        now = self._clock()
+        offset = self.timeline.offset(now)
+        changed = False     # 已触发语音或相位有变化，需要更新会话文件
+        for cue in self.cues.pop_due(offset):
+            changed = True
+            self.panel.voice.play(cue.file, self.timeline.time_at(cue.at))
+
+        st = self.timeline.state_at_offset(offset)
+        if st is None:
+            # 全流程完成
+            self.stop()
+            self._show_countdown(None)
+            self.panel.set_status_text("阶段 10 已结束")
+            self._last_display = ""
+            self._publish(None)
+            self._save_session()
+            self.finished.emit()
             return
 
-        elapsed = self.sync_time.secsTo(QDateTime.currentDateTime())
-        total = self.remaining_seconds - elapsed
-        int_total = int(total)
-
-        # 仅在“缩圈中”监测 8 秒播报
-        if self.sync_phase == "shrinking":
-            next_stage = self.zone_level + 1
-            if (
-                next_stage not in self._played_pre_stage and
-                self._prev_total is not None and self._prev_total > 8 >= int_total
-            ):
-                self.panel.voice.play_pre_stage(next_stage)
-                self._played_pre_stage.add(next_stage)
-        self._prev_total = int_total
-
-        # 阶段/相位切换判定
-        if total <= 0:
-            if self.sync_phase == "countdown":
-                # 开始缩圈
-                self.sync_phase = "shrinking"
-                self.sync_time = QDateTime.currentDateTime()
-                self.remaining_seconds = ZONE_TIMINGS[self.sync_index][2]
-            else:
-                # 缩圈结束 -> 进入下一阶段倒计时
-                self.sync_index += 1
-                if self.sync_index < len(ZONE_TIMINGS):
-                    self.sync_phase = "countdown"
-                    self.sync_time = QDateTime.currentDateTime()
-                    self.remaining_seconds = ZONE_TIMINGS[self.sync_index][1]
-                    self.zone_level = ZONE_TIMINGS[self.sync_index][0]
-                    self.panel.zone_level = self.zone_level
-
-                    if self.zone_level == 9 and not self._played_stage9_started:
-                        self.panel.voice.play_stage9_start()
-                        self._played_stage9_started = True
-
-                    if hasattr(self.panel, "linked_overlay"):
-                        self.panel.linked_overlay.update()
-                else:
-                    # 全流程完成
-                    self.stop()
-                    self.panel.info_label.setText("阶段 10 已结束")
-                    return
-            total = self.remaining_seconds
-            int_total = int(total)
-
-        m, s = divmod(max(0, int_total), 60)
-        label = "倒计时" if self.sync_phase == "countdown" else "缩圈中"
-        new_txt = f"当前阶段：{self.zone_level}，{label}：{m:02d}:{s:02d}"
-        if new_txt != self._last_display:
-            self.panel.info_label.setText(new_txt)
-            self._last_display = new_txt
+        if st.index != self._index:
+            self._enter(st)
+            changed = True
+        if changed:
+            self._save_session()
+
+        secs = max(0, math.ceil(st.remaining))
+        self._show_countdown((st.zone_level, st.phase, secs))
+        if self._panel_shown():
+            # 面板隐藏或最小化时完全不碰面板；恢复显示时 wake() 会立即补上
+            m, s = divmod(secs, 60)
+            label = "倒计时" if st.phase == COUNTDOWN else "缩圈中"
+            new_txt = f"当前阶段：{st.zone_level}，{label}：{m:02d}:{s:02d}"
+            if new_txt != self._last_display:
+                self.panel.set_status_text(new_txt)
+                self._last_display = new_txt
+        self._publish(st)
+
+        self._arm(st, offset)
+
+    def _enter(self, st):
+        """进入新相位：刷新圈等级。"""
+        self._index = st.index
+        self.sync_index = st.stage_idx
+        self.sync_phase = st.phase
+        history = getattr(self.panel, "history", None)
+        if history is not None:
+            history.record("phase", st.stage_idx, st.phase, st.zone_level)
+
+        if st.zone_level != self.zone_level or self.panel.zone_level != st.zone_level:
+            self.zone_level = st.zone_level
+            self.panel.zone_level = self.zone_level
+            if hasattr(self.panel, "linked_overlay"):
+                self.panel.linked_overlay.refresh()
+
+    def _panel_shown(self) -> bool:
+        return self.panel.isVisible() and not self.panel.isMinimized()
+
+    def _show_countdown(self, value):
+        """把 (圈等级, 相位, 剩余整秒) 交给覆盖层 HUD；None 表示清除。"""
+        overlay = getattr(self.panel, "linked_overlay", None)
+        if overlay is not None:
+            overlay.set_countdown(value)
+
+    def _publish(self, st):
+        """广播已启用时把当前状态交给面板发布（未启用时只多一次属性判断）。"""
+        if getattr(self.panel, "broadcast", None) is not None:
+            self.panel.publish_state(st)
+
+    def _save_session(self):
+        if getattr(self.panel, "session", None) is not None:
+            self.panel.save_session()
+
+    def _next_delay(self, st, offset) -> float:
+        """距离下一个需要处理的时刻还有多少秒。"""
+        total = st.remaining
+        delay = total  # 相位切换
+        cue = self.cues.next_due()
+        if cue is not None:
+            delay = min(delay, cue - offset)
+        overlay = getattr(self.panel, "linked_overlay", None)
+        if not self._panel_shown() and not (overlay is not None and overlay.countdown_visible):
+            return min(delay, MINIMIZED_MAX_SLEEP)
+        # 显示秒数向下跳变的时刻
+        return min(delay, total - (math.ceil(total) - 1))
+
+    def _arm(self, st, offset):
+        # 多等 1 ms，保证醒来时已越过边界
+        delay = max(0.0, self._next_delay(st, offset))
+        self.next_deadline = self._clock() + delay
+        if self.autorun:
+            msec = int(delay * 1000) + 1
+            self._qt_timer.start(max(1, msec))
 
     def _reset_state(self):
-        self.sync_time = None
+        self.timeline.clear()
+        self.next_deadline = None   # 下一次计划唤醒的单调时钟读数
+        self._index = None
         self.sync_index = 0
         self.zone_level = 1
-        self.remaining_seconds = 0
-        self.sync_phase = "countdown"
+        self.sync_phase = COUNTDOWN
         self._last_display = ""
-        self._played_pre_stage = set()
-        self._played_stage9_started = False
-        self._prev_total = None
+        self.cues.clear()